@@ -0,0 +1,179 @@
+"""
+Running the application in several worker processes.
+
+A NiceGUI server runs in a single process, so the public flight search can only ever use one
+core. With `FLYGUY_WORKERS` set, main.py instead starts that many servers on consecutive ports,
+to be put behind a reverse proxy that keeps every browser on the same worker, since a page stays
+connected to the process that served it.
+
+The workers share their data through the SQLite database of the 'sqlite' storage mode, which
+serialises their writes. Every change is also recorded in the `changes` table of the database, in
+the transaction that stores it. Each worker runs a `ChangeFeed` that polls this table and
+refreshes only the changed records of its in-memory collections, so its indexes, tables and
+selectors follow the changes of the other workers within `FLYGUY_SYNC_INTERVAL` seconds. A worker
+that missed changes, because they were forgotten before it checked, loads its collections again.
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+from app import config
+from app.storage import (sqlite_change_position, sqlite_changes, sqlite_changes_missed, sqlite_prepare,
+                         sqlite_prune_changes)
+
+
+class ChangeFeed:
+    """
+    Applies the changes other workers make to the shared database to the collections of a store.
+
+    Recorded changes are forgotten after `keep` seconds, so the table stays small; a worker that
+    does not check for changes for that long misses them, and then reloads every collection of
+    its store with `reload`.
+    """
+
+    def __init__(self, store, interval=None, keep=600):
+        """
+        Args:
+            store (Store): The collections to keep up to date.
+            interval (float, optional): Seconds between two checks for changes; defaults to
+                                        `config.sync_interval`.
+            keep (float): Seconds after which recorded changes are forgotten.
+        """
+        self.store = store
+        self.interval = config.sync_interval if interval is None else interval
+        self.keep = keep
+        # The sequence number of the last change that was applied
+        self.position = None
+        self._pruned = time.monotonic()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def path(self):
+        """Path: The snapshot file of a collection in the shared database."""
+        return self.store.collections()[0].path
+
+    def start(self):
+        """
+        Follow the changes recorded from now on, checking for them on a background thread.
+
+        Must be called before the collections are loaded, so no change made while they load is
+        missed; refreshing a record that was loaded with the change already applied does nothing.
+
+        Returns:
+            None
+        """
+        if self.position is None:
+            self.position = sqlite_change_position(self.path)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+            self._thread.start()
+
+    def poll(self):
+        """
+        Apply the changes the other workers recorded since the last check.
+
+        Returns:
+            int: The number of records that were inserted, updated or removed, or the number of
+                 records loaded if changes were missed.
+        """
+        if self.position is None:
+            self.position = sqlite_change_position(self.path)
+        if sqlite_changes_missed(self.path, self.position):
+            return self.reload()
+        keys, self.position = sqlite_changes(self.path, self.position)
+        collections = {collection.path.stem: collection for collection in self.store.collections()}
+        refreshed = sum(collections[name].refresh(changed) for name, changed in keys.items() if name in collections)
+        if time.monotonic() - self._pruned > self.keep / 10:
+            self._pruned = time.monotonic()
+            sqlite_prune_changes(self.path, self.keep)
+        return refreshed
+
+    def reload(self):
+        """
+        Load every collection of the store again and swap it in, after changes were missed.
+
+        The tables and selectors following a collection through the store move over to the new
+        one. Changes recorded while the collections load, including those of this worker, are
+        applied to the new collections afterwards.
+
+        Returns:
+            int: The number of records loaded.
+        """
+        position = sqlite_change_position(self.path)
+        loaded = 0
+        for name in self.store.names:
+            collection = getattr(self.store, name).reloaded()
+            self.store.replace(name, collection)
+            loaded += len(collection)
+        keys, self.position = sqlite_changes(self.path, position, own=True)
+        collections = {collection.path.stem: collection for collection in self.store.collections()}
+        for name, changed in keys.items():
+            if name in collections:
+                collections[name].refresh(changed)
+        print(f'Changes of other workers were missed, reloaded {loaded} records')
+        return loaded
+
+    def stop(self):
+        """
+        Stop checking for changes.
+
+        Returns:
+            None
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        """Check for changes until the feed is stopped."""
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                traceback.print_exc()
+
+
+def run_workers(store, count, port):
+    """
+    Start the workers, each running this script on its own port, and wait until they stop.
+
+    The workers are stopped when this process is interrupted or terminated.
+
+    The JSON files are imported into the database before the workers start, so no worker can
+    import them again while another one is already changing the tables.
+
+    Args:
+        store (Store): The collections of the application.
+        count (int): The number of workers.
+        port (int): The port of the first worker; the others use the following ports.
+
+    Returns:
+        None
+    """
+    if config.storage_mode != 'sqlite':
+        raise SystemExit('Several workers share their data through SQLite: set FLYGUY_STORAGE_MODE=sqlite')
+    for collection in store.collections():
+        sqlite_prepare(collection.path, collection.key_field)
+
+    workers = []
+    for n in range(count):
+        env = {**os.environ, 'FLYGUY_WORKER': str(n), 'FLYGUY_PORT': str(port + n)}
+        workers.append(subprocess.Popen([sys.executable, *sys.argv], env=env))
+        print(f"Started worker {n} on port {port + n}")
+    # Stop the workers along with this process, also when it is terminated rather than interrupted
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for worker in workers:
+            worker.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
@@ -0,0 +1,67 @@
+"""
+Runtime configuration for the application.
+
+Every setting can be overridden with an environment variable, so the storage behaviour
+can be changed for a deployment without editing the code.
+"""
+import os
+
+# Directory holding the data files; defaults to src/data
+data_dir = os.environ.get('FLYGUY_DATA_DIR')
+
+# Format the JSON files are written in:
+#   'pretty'  - indented, human readable JSON (default)
+#   'compact' - JSON without any whitespace, roughly half the size and write time
+#   'gzip'    - compact JSON compressed with gzip
+#   'lzma'    - compact JSON compressed with lzma, the smallest but slowest to write
+# Files are always loaded whatever format they were written in.
+json_format = os.environ.get('FLYGUY_JSON_FORMAT', 'pretty')
+
+# Seconds the background writer waits for further changes to a data file before rewriting it
+write_delay = float(os.environ.get('FLYGUY_WRITE_DELAY', '0.5'))
+
+# How changes to the collections are persisted:
+#   'json'    - rewrite the whole JSON file after every change (default)
+#   'journal' - append every change to a JSON Lines journal next to the JSON file
+#               and periodically compact the journal into a fresh JSON snapshot
+#   'sqlite'  - store every collection in a table of an SQLite database next to the JSON
+#               files; the JSON files are imported on first use and can be exported again
+storage_mode = os.environ.get('FLYGUY_STORAGE_MODE', 'json')
+
+# Number of journal entries after which a journal is compacted into its snapshot
+journal_compact_threshold = int(os.environ.get('FLYGUY_JOURNAL_COMPACT_THRESHOLD', '1000'))
+
+# File name of the SQLite database used in 'sqlite' storage mode
+sqlite_database = os.environ.get('FLYGUY_SQLITE_DATABASE', 'flyguy.db')
+
+# Number of worker processes used to parse the data files at startup; 0 parses them on the
+# loading threads, which is fastest unless the files are large and the host has spare cores
+startup_processes = int(os.environ.get('FLYGUY_STARTUP_PROCESSES', '0'))
+
+# Number of records a background job, e.g. a cascade delete, processes between two progress
+# updates; a cancelled job stops at the end of its current chunk
+job_chunk_size = int(os.environ.get('FLYGUY_JOB_CHUNK_SIZE', '10000'))
+
+# Number of server processes started by main.py, on consecutive ports from `port`. Several
+# workers share the data through the SQLite database, so they need the 'sqlite' storage mode.
+workers = int(os.environ.get('FLYGUY_WORKERS', '1'))
+
+# Port the server listens on; worker n of several listens on `port + n`
+port = int(os.environ.get('FLYGUY_PORT', '8080'))
+
+# The number of this worker, set by main.py for the processes it starts; None for the process
+# started by the user
+worker = os.environ.get('FLYGUY_WORKER')
+
+# Seconds between two checks of a worker for changes made by the other workers
+sync_interval = float(os.environ.get('FLYGUY_SYNC_INTERVAL', '0.2'))
+
+# Number of rows a bulk import reads and checks at a time, see `app.importer`
+import_batch_size = int(os.environ.get('FLYGUY_IMPORT_BATCH_SIZE', '10000'))
+
+# Whether the server moves the records loaded at startup out of the garbage collector's reach
+# with gc.freeze(), see `app.startup.freeze_loaded_records`. The cyclic garbage collector then no
+# longer walks millions of records, which would otherwise stall the event loop, but it never
+# frees them either: records that are deleted later and are part of a reference cycle stay in
+# memory until the server stops. Records without cycles are still freed when they are deleted.
+gc_freeze = os.environ.get('FLYGUY_GC_FREEZE', '1') != '0'
@@ -0,0 +1,345 @@
+"""
+Bulk import of clients, airlines, bookings and available flights from CSV or JSON Lines files.
+
+Creating records one by one through the forms allocates and persists an ID and writes the
+collection for every record, which does not scale to onboarding hundreds of thousands of them.
+`BulkImport` instead streams the rows of a file in batches of `config.import_batch_size`:
+
+- every batch is checked as a whole: each distinct client or airline it refers to is looked up
+  once, and values already found in an earlier batch are not looked up again
+- rows without an ID get one from a block allocated for the whole batch
+- nothing is written until every row has been read and checked; the records are then added
+  with a single write, in a `Transaction` that holds the referenced collections, so a client or
+  airline deleted in the meantime is noticed and the import is refused
+
+An import is either applied in full or, if any row is invalid, not at all. Its steps run as a
+background job from the dashboard, and as a command from the `src` directory:
+
+    python -m app.importer clients new_clients.csv
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+
+from app import config
+from app.jobs import run_steps
+from app.storage import record_key
+from app.store import Transaction
+
+
+# How the rows of each collection are checked: the fields that must not be empty, the value of
+# the 'Type' field when a row has none, and the fields referring to records of other collections
+schemas = {
+    'clients': {
+        'required': ('Name', 'Address Line 1', 'City', 'Zip Code', 'Country', 'Phone Number'),
+        'type': 'Client',
+        'references': {},
+    },
+    'airlines': {
+        'required': ('Company Name',),
+        'type': 'Airline',
+        'references': {},
+    },
+    'flights': {
+        'required': ('Client_ID', 'Airline_ID'),
+        'type': 'Flight',
+        'references': {'Client_ID': 'clients', 'Airline_ID': 'airlines'},
+    },
+    'available_flights': {
+        'required': ('Airline_ID',),
+        'type': 'Flight',
+        'references': {'Airline_ID': 'airlines'},
+    },
+}
+
+# Fields holding IDs, which CSV files only have as text
+id_fields = ('ID', 'Booking_ID', 'Client_ID', 'Airline_ID', 'Flight_ID')
+
+# The number of invalid rows described in the error of a refused import
+error_limit = 20
+
+
+def read_rows(path):
+    """
+    Read the rows of a CSV file with a header line, or of a JSON Lines file, one at a time.
+
+    Args:
+        path (Path): The file; its suffix selects the format, '.csv' or '.jsonl'.
+
+    Yields:
+        tuple: The line number and the row, a dict, or None if the line is not a JSON object.
+
+    Raises:
+        ValueError: If the file is neither a CSV nor a JSON Lines file.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                # Cells beyond the header are collected under None
+                row.pop(None, None)
+                yield reader.line_num, row
+    elif suffix in ('.jsonl', '.ndjson'):
+        with open(path, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield number, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f'{path.name} is neither a CSV (.csv) nor a JSON Lines (.jsonl) file')
+
+
+def count_rows(path):
+    """
+    Estimate the number of rows of a CSV or JSON Lines file from its lines, without parsing it.
+
+    Blank lines and CSV cells spanning several lines are counted as rows, so the estimate can be
+    slightly too high.
+
+    Args:
+        path (Path): The file.
+
+    Returns:
+        int: The estimated number of rows.
+    """
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            lines += chunk.count(b'\n')
+            last = chunk[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0) if Path(path).suffix.lower() == '.csv' else lines
+
+
+def parse_id(value):
+    """
+    Convert an ID read from a file to a number, accepting zero-padded IDs like '000000012'.
+
+    Args:
+        value (Any): The value.
+
+    Returns:
+        Any: The ID as an int, or the value as it was if it is not a whole number.
+    """
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value
+
+
+class BulkImport:
+    """
+    Imports the rows of a CSV or JSON Lines file into a collection of a store.
+
+    The counters are updated after every batch, so they can be read while the import runs.
+    IDs allocated for an import that is refused or cancelled are not handed out again.
+    """
+
+    def __init__(self, store, name, path, batch_size=None):
+        """
+        Args:
+            store (Store): The collections, also used to check the references of the rows.
+            name (str): The collection to import into, a key of `schemas`.
+            path (Path): The CSV or JSON Lines file.
+            batch_size (int, optional): The number of rows checked at a time; defaults to
+                                        `config.import_batch_size`.
+        """
+        if name not in schemas:
+            raise ValueError(f'Cannot import {name}, only {", ".join(schemas)}')
+        self.store = store
+        self.name = name
+        self.collection = getattr(store, name)
+        self.path = Path(path)
+        self.batch_size = batch_size or config.import_batch_size
+        self.schema = schemas[name]
+        self.rows = 0
+        self.imported = 0
+        self.seconds = 0.0
+        # The number of invalid rows and the descriptions of the first `error_limit` of them
+        self.error_count = 0
+        self.errors = []
+        self._records = []
+        self._keys = set()
+        # field -> referenced IDs already found in the referenced collection
+        self._found = {field: set() for field in self.schema['references']}
+
+    @property
+    def rows_per_second(self):
+        """float: The number of rows read and checked per second so far."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        """
+        Describe the outcome of the import.
+
+        Returns:
+            str: The number of imported records and rows per second.
+        """
+        return (f'Imported {self.imported} of {self.rows} rows into {self.name} in {self.seconds:.2f}s '
+                f'({self.rows_per_second:.0f} rows/s)')
+
+    def steps(self):
+        """
+        Import the file batch by batch, see `app.jobs`.
+
+        Yields:
+            int: The number of rows read by each batch.
+
+        Returns:
+            int: 0, once the records are written by the last step, which cannot be cancelled.
+
+        Raises:
+            ValueError: If a row is invalid; nothing is written then.
+        """
+        start = time.perf_counter()
+        for collection in self.store.collections():
+            collection.ensure_loaded()
+        rows = read_rows(self.path)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self._check(batch)
+            self.rows += len(batch)
+            self.seconds = time.perf_counter() - start
+            yield len(batch)
+        self._refuse_if_invalid()
+
+        referenced = [getattr(self.store, name) for name in self.schema['references'].values()]
+        with Transaction(self.collection, *referenced):
+            # Checked again while the referenced collections are locked, as they may have changed
+            for field, name in self.schema['references'].items():
+                collection = getattr(self.store, name)
+                for value in self._found[field]:
+                    if collection.get(value) is None:
+                        self._error(None, f'{field} {value} has been deleted during the import')
+            self._refuse_if_invalid()
+            self.imported = self.collection.insert_many(self._records)
+        self._records = []
+        self.seconds = time.perf_counter() - start
+        return 0
+
+    def run(self):
+        """
+        Import the whole file.
+
+        Returns:
+            BulkImport: The import, for its counters.
+
+        Raises:
+            ValueError: If a row is invalid; nothing is written then.
+        """
+        run_steps(self.steps())
+        return self
+
+    def _check(self, batch):
+        """Check a batch of rows and keep the valid ones, with IDs for the rows that have none."""
+        key_field = self.collection.key_field
+        valid = []
+        for line, row in batch:
+            if row is None:
+                self._error(line, 'not a JSON object')
+                continue
+            record = {field: parse_id(value) if field in id_fields else value for field, value in row.items()}
+            missing = [field for field in self.schema['required'] if record.get(field) in (None, '')]
+            if missing:
+                self._error(line, f'{", ".join(missing)} missing')
+                continue
+            key = record.get(key_field)
+            if key in (None, ''):
+                record.pop(key_field, None)
+            elif not isinstance(key, int):
+                self._error(line, f'{key_field} {key} is not a number')
+                continue
+            elif record_key(key) in self._keys or self.collection.get(key) is not None:
+                self._error(line, f'{key_field} {key} already exists')
+                continue
+            else:
+                self._keys.add(record_key(key))
+            if not record.get('Type'):
+                record['Type'] = self.schema['type']
+            valid.append((line, record))
+
+        # Every distinct reference of the batch is looked up once
+        for field, name in self.schema['references'].items():
+            collection = getattr(self.store, name)
+            found = self._found[field]
+            missing = {record[field] for _, record in valid if record[field] not in found}
+            found.update(value for value in missing if collection.get(value) is not None)
+            missing.difference_update(found)
+            if missing:
+                for line, record in valid:
+                    if record[field] in missing:
+                        self._error(line, f'{field} {record[field]} does not exist')
+                valid = [(line, record) for line, record in valid if record[field] not in missing]
+
+        records = [record for _, record in valid]
+        given = [record[key_field] for record in records if key_field in record]
+        unnumbered = [record for record in records if key_field not in record]
+        if unnumbered or given:
+            ids = self.collection.reserve_ids(len(unnumbered), max(given, default=0))
+            for record, key in zip(unnumbered, ids):
+                record[key_field] = key
+                self._keys.add(record_key(key))
+        self._records.extend(records)
+
+    def _error(self, line, problem):
+        """Record an invalid row."""
+        self.error_count += 1
+        if len(self.errors) < error_limit:
+            self.errors.append(f'line {line}: {problem}' if line is not None else problem)
+
+    def _refuse_if_invalid(self):
+        """Raise the error refusing the import if any row is invalid."""
+        if self.error_count:
+            self._records = []
+            more = f' (and {self.error_count - len(self.errors)} more)' if self.error_count > len(self.errors) else ''
+            raise ValueError(f'{self.error_count} invalid row(s) in {self.path.name}, nothing imported: '
+                             f'{"; ".join(self.errors)}{more}')
+
+
+def main(argv=None):
+    """
+    Import a file from the command line, printing the progress after every batch.
+
+    Args:
+        argv (list, optional): The command line arguments; defaults to those of the process.
+
+    Returns:
+        int: The exit status, 1 if the import was refused.
+    """
+    parser = argparse.ArgumentParser(prog='python -m app.importer', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('collection', choices=list(schemas), help="the collection to import into; 'flights' holds the bookings")
+    parser.add_argument('file', type=Path, help='a CSV file with a header line, or a JSON Lines file')
+    parser.add_argument('--batch-size', type=int, default=config.import_batch_size,
+                        help='the number of rows checked at a time')
+    args = parser.parse_args(argv)
+
+    # Imported here, as app.startup imports this module for the dashboard
+    from app.startup import store
+
+    bulk_import = BulkImport(store, args.collection, args.file, args.batch_size)
+    try:
+        for count in bulk_import.steps():
+            if count:
+                print(f'Checked {bulk_import.rows} rows ({bulk_import.rows_per_second:.0f} rows/s)')
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+    print(bulk_import.summary())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
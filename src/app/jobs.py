@@ -0,0 +1,269 @@
+"""
+Background jobs for long-running operations.
+
+A cascade that removes hundreds of thousands of bookings takes seconds, and running it inside
+an event handler keeps its dialog hanging until it finishes. Such operations are instead
+submitted as jobs to the `JobQueue`, which runs them one after another on a worker thread.
+
+A job is written as a generator that does its work in chunks and yields the number of items
+it has processed after each chunk. Between two chunks the queue records the progress and checks
+whether the job was cancelled, so a cancelled job stops at a chunk boundary; a job should
+therefore leave the data consistent after every chunk. The last chunk returns its number of
+items instead of yielding it, so once that chunk has started the job can no longer be cancelled:
+a job whose last chunk commits its work is never reported as cancelled after committing it.
+Jobs are kept by the queue, not by the page that submitted them, so their progress can still be
+followed after the page is reloaded.
+"""
+import itertools
+import threading
+import time
+import traceback
+from collections import deque
+
+
+def run_steps(steps):
+    """
+    Run the steps of a job to the end on the calling thread, without a queue.
+
+    Args:
+        steps (Iterator[int]): The steps of the job, see `Job`.
+
+    Returns:
+        int: The total number of items processed.
+    """
+    done = 0
+    while True:
+        try:
+            done += next(steps) or 0
+        except StopIteration as stop:
+            return done + (stop.value or 0)
+
+
+class Job:
+    """
+    A long-running operation queued in a `JobQueue`.
+
+    The state is one of 'queued', 'running', 'done', 'cancelled' or 'failed'.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, title, steps, total=None, cleanup=None):
+        """
+        Args:
+            title (str): Describes the job to the user, e.g. 'Delete airline 7'.
+            steps (Iterator[int]): Performs the job chunk by chunk, yielding the number of items
+                                   processed by each chunk and returning that of the last chunk.
+            total (int, optional): The number of items the job will process, if known.
+            cleanup (Callable, optional): Called once the job has finished in any state, even
+                                          if it was cancelled before it started.
+        """
+        self.id = next(self._ids)
+        self.title = title
+        self.total = total
+        self.done = 0
+        self.state = 'queued'
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._steps = steps
+        self._cleanup = cleanup
+        self._cancelled = threading.Event()
+
+    @property
+    def progress(self):
+        """float: The share of the job that is done, between 0 and 1."""
+        if self.state == 'done':
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(self.done / self.total, 1.0)
+
+    @property
+    def rate(self):
+        """float: The number of items processed per second since the job started."""
+        if self.started is None:
+            return 0.0
+        seconds = (self.finished or time.time()) - self.started
+        return self.done / seconds if seconds > 0 else 0.0
+
+    @property
+    def active(self):
+        """bool: Whether the job is still queued or running."""
+        return self.state in ('queued', 'running')
+
+    def cancel(self):
+        """
+        Ask the job to stop after its current chunk; a queued job never starts.
+
+        Returns:
+            None
+        """
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        """bool: Whether the job was asked to stop."""
+        return self._cancelled.is_set()
+
+
+class JobQueue:
+    """
+    Runs jobs one after another on a worker thread.
+
+    Finished jobs are kept, up to `keep` of them, so their outcome can still be shown.
+    """
+
+    def __init__(self, keep=20):
+        """
+        Args:
+            keep (int): The number of finished jobs kept in `jobs`.
+        """
+        self.keep = keep
+        # Incremented on every change of a job, so views can tell when to redraw
+        self.version = 0
+        self._jobs = []
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def submit(self, title, steps, total=None, cleanup=None):
+        """
+        Queue a job.
+
+        Args:
+            title (str): Describes the job to the user.
+            steps (Iterator[int]): Performs the job chunk by chunk, see `Job`.
+            total (int, optional): The number of items the job will process, if known.
+            cleanup (Callable, optional): Called once the job has finished, see `Job`.
+
+        Returns:
+            Job: The queued job.
+        """
+        job = Job(title, steps, total, cleanup)
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='job-queue', daemon=True)
+                self._thread.start()
+            self._jobs.append(job)
+            finished = [j for j in self._jobs if not j.active]
+            for old in finished[:max(len(finished) - self.keep, 0)]:
+                self._jobs.remove(old)
+            self._pending.append(job)
+            self.version += 1
+            self._condition.notify()
+        return job
+
+    def jobs(self):
+        """
+        Return the queued, running and most recently finished jobs, oldest first.
+
+        Returns:
+            list: The jobs.
+        """
+        with self._condition:
+            return list(self._jobs)
+
+    def wait(self, job, timeout=None):
+        """
+        Wait until a job has finished.
+
+        Args:
+            job (Job): The job.
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if the job has finished.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not job.active, timeout)
+
+    def stop(self):
+        """
+        Cancel every job and stop the worker thread once the running job has stopped.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            self._stopped = True
+            for job in self._jobs:
+                job.cancel()
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _finish(self, job, state, error=None):
+        """Record the outcome of a job, after releasing what its steps hold."""
+        self._release(job)
+        with self._condition:
+            job.state = state
+            job.error = error
+            job.finished = time.time()
+            self.version += 1
+            self._condition.notify_all()
+
+    def _release(self, job):
+        """Close the steps of a job and run its cleanup, reporting a failing cleanup."""
+        if hasattr(job._steps, 'close'):
+            job._steps.close()
+        if job._cleanup is not None:
+            try:
+                job._cleanup()
+            except Exception:
+                traceback.print_exc()
+
+    def _execute(self, job):
+        """Run a job chunk by chunk until it is done, cancelled or fails."""
+        with self._condition:
+            job.state = 'running'
+            job.started = time.time()
+            self.version += 1
+        steps = iter(job._steps)
+        try:
+            while True:
+                try:
+                    count = next(steps)
+                except StopIteration as stop:
+                    # The last chunk has run, so the job is done even if it was cancelled during it
+                    with self._condition:
+                        job.done += stop.value or 0
+                    break
+                with self._condition:
+                    job.done += count or 0
+                    self.version += 1
+                if job.cancelled:
+                    self._finish(job, 'cancelled')
+                    return
+        except Exception as e:
+            traceback.print_exc()
+            self._finish(job, 'failed', str(e))
+            return
+        self._finish(job, 'done')
+
+    def _run(self):
+        """Worker loop running the queued jobs in order."""
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                pending = list(self._pending) if self._stopped else None
+                job = None if self._stopped else self._pending.popleft()
+                if self._stopped:
+                    self._pending.clear()
+            if pending is not None:
+                # Finished outside the lock, so their cleanup does not hold up other threads
+                for job in pending:
+                    self._finish(job, 'cancelled')
+                return
+            if job.cancelled:
+                self._finish(job, 'cancelled')
+            else:
+                self._execute(job)
+
+
+# The queue of the application, shared by all pages
+job_queue = JobQueue()
@@ -0,0 +1,339 @@
+"""
+Server-side pagination, sorting and filtering for the record tables.
+
+A table that is given every record ships the whole collection over the websocket and keeps a
+copy of it in the browser. `TablePager` instead puts the table into Quasar's server-side mode:
+the table only ever holds the rows of the visible page, and every change of page, sort order or
+filter is answered by the server with the next page, built from the collection on demand.
+"""
+import asyncio
+import heapq
+
+from nicegui import background_tasks, core, run
+
+from app.storage import record_key
+
+
+# Page sizes offered by the tables; "All" is deliberately missing
+rows_per_page_options = [10, 25, 50, 100]
+
+# Seconds a sorted or filtered table waits before rebuilding its page again after the records changed
+refresh_delay = 1.0
+
+
+def sort_value(value):
+    """
+    Return a sort key that orders numbers numerically and everything else as text.
+
+    Args:
+        value (Any): A cell value.
+
+    Returns:
+        tuple: The sort key.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value, '')
+    return (1, 0, '' if value is None else str(value).lower())
+
+
+def query_rows(records, to_row, page=1, rows_per_page=10, sort_by=None, descending=False, filter_text='',
+               sort_keys=None):
+    """
+    Build one page of table rows from a collection.
+
+    Without a sort order or filter only the rows of the requested page are built, so the cost
+    does not depend on the size of the collection for the first pages. A sort order or filter
+    reads every record, see `query_page` for its cost.
+
+    Args:
+        records (Sequence[dict]): The records to show, e.g. a `Collection` or a list.
+        to_row (Callable): Turns a record into a table row.
+        page (int): The 1-based page number.
+        rows_per_page (int): The number of rows per page; 0 shows all rows.
+        sort_by (str, optional): The row field to sort by.
+        descending (bool): Whether to sort in descending order.
+        filter_text (str): Only rows with a value containing this text (ignoring case) are shown.
+        sort_keys (dict, optional): Maps a column to a function reading its value from a record,
+                                    so sorting by it does not need the rows, see `query_page`.
+
+    Returns:
+        tuple: The rows of the page and the total number of matching rows.
+    """
+    page_records, total = query_page(records, to_row, page, rows_per_page, sort_by, descending, filter_text,
+                                     sort_keys)
+    return [row for _, row in page_records], total
+
+
+def query_page(records, to_row, page=1, rows_per_page=10, sort_by=None, descending=False, filter_text='',
+               sort_keys=None):
+    """
+    Like `query_rows`, but return every row of the page together with the record it was built from.
+
+    The cost depends on the query:
+
+    - without a sort order or filter, only the rows of the page are built
+    - sorting by a column of `sort_keys` reads one value from every record and keeps the records
+      up to the end of the page in a heap; only the rows of the page are built
+    - a filter, or sorting by any other column, builds the row of every record, including the
+      lookups `to_row` makes, e.g. 1M bookings take seconds
+
+    Anything but the first case grows with the collection, so `TablePager` runs it off the
+    event loop.
+
+    Returns:
+        tuple: A list of (record, row) pairs and the total number of matching rows.
+    """
+    page = max(int(page or 1), 1)
+    start = (page - 1) * rows_per_page if rows_per_page else 0
+
+    if not sort_by and not filter_text:
+        end = start + rows_per_page if rows_per_page else None
+        return [(r, to_row(r)) for r in records[start:end]], len(records)
+
+    if not filter_text and sort_by in (sort_keys or {}):
+        read = sort_keys[sort_by]
+        total = len(records)
+        end = start + rows_per_page if rows_per_page else total
+
+        def key(record):
+            return sort_value(read(record))
+        page_records = (heapq.nlargest(end, records, key) if descending
+                        else heapq.nsmallest(end, records, key))[start:end]
+        return [(r, to_row(r)) for r in page_records], total
+
+    pairs = ((r, to_row(r)) for r in records)
+    if filter_text:
+        needle = filter_text.strip().lower()
+        pairs = [p for p in pairs if any(needle in str(v).lower() for v in p[1].values())]
+    else:
+        pairs = list(pairs)
+    total = len(pairs)
+    end = start + rows_per_page if rows_per_page else total
+
+    if sort_by:
+        def key(pair):
+            return sort_value(pair[1].get(sort_by))
+        pairs = heapq.nlargest(end, pairs, key) if descending else heapq.nsmallest(end, pairs, key)
+    return pairs[start:end], total
+
+
+class TablePager:
+    """
+    Serves the rows of a `ui.table` page by page.
+
+    The table is switched to server-side mode by setting `rowsNumber` in its pagination, so the
+    browser asks for every page, sort order and filter with a 'request' event instead of
+    computing them from a full set of rows.
+
+    A pager can follow the collection it shows, by its name in the store: changes made to the
+    collection, by any session, are applied to the visible page only. An edited record rebuilds
+    just its own row and an insert or delete rebuilds the current page, so the update sent to the
+    browser is one page at most, whatever the size of the collection. An edited row keeps its
+    place until the next page request, even if the edit changes its position in the sort order.
+    When the store replaces the collection, the pager shows the new one.
+
+    A sorted or filtered page reads the whole collection, so it is built on a worker thread, see
+    `refresh`; while the records keep changing, e.g. during a cascade delete, it is rebuilt at
+    most once every `refresh_delay` seconds.
+    """
+
+    def __init__(self, table, store=None, name=None, rows_per_page=10):
+        """
+        Args:
+            table (ui.table): The table to serve.
+            store (Store, optional): The store holding the collection to follow, see `follow`.
+            name (str, optional): The name of the collection to follow in the store.
+            rows_per_page (int): The initial page size.
+        """
+        self.table = table
+        self.records = []
+        self.to_row = dict
+        self.sort_keys = None
+        # The records the rows of the current page were built from
+        self.page_records = []
+        # Incremented whenever another page, sort order or filter is shown, so a page still
+        # being built for an earlier one is dropped
+        self._query_version = 0
+        # Whether the page is being built on a worker thread, and whether it must be built again
+        self._building = False
+        self._stale = False
+        table.pagination = {'page': 1, 'rowsPerPage': rows_per_page, 'sortBy': None,
+                            'descending': False, 'rowsNumber': 0}
+        table.props(remove='hide-pagination')
+        table.props(f':rows-per-page-options="{rows_per_page_options}"')
+        table.on('request', self._handle_request)
+        if store is not None:
+            self.follow(store, name)
+
+    def show(self, records, to_row=dict, sort_keys=None):
+        """
+        Show new records, starting again from the first page.
+
+        Args:
+            records (Sequence[dict]): The records, e.g. a `Collection` or a list.
+            to_row (Callable): Turns a record into a table row.
+            sort_keys (dict, optional): Maps a column to a function reading its value from a
+                                        record, see `query_page`.
+
+        Returns:
+            None
+        """
+        self.records = records
+        self.to_row = to_row
+        self.sort_keys = sort_keys
+        self.table.pagination = {**self.table.pagination, 'page': 1}
+        self._query_version += 1
+        self.refresh()
+
+    def refresh(self):
+        """
+        Rebuild the current page, e.g. after the records changed.
+
+        A page without a sort order or filter is built right away. A sorted or filtered page
+        is built on a worker thread, so the event loop keeps serving every session meanwhile,
+        and the table shows it once it is done. Refreshes requested while a page is being built
+        are coalesced into one more build afterwards, with the latest page, sort and filter.
+
+        Returns:
+            None
+        """
+        self._stale = True
+        if not self._sorted_or_filtered():
+            self._stale = False
+            # Drop a sorted or filtered page that is still being built
+            self._query_version += 1
+            self._show_page(*query_page(*self._query()))
+        elif not self._building:
+            self._building = True
+            background_tasks.create(self._build())
+
+    async def _build(self):
+        """Build the current page on a worker thread until it is up to date, see `refresh`."""
+        try:
+            while self._stale and self._sorted_or_filtered() and not self.table.is_deleted:
+                self._stale = False
+                version = self._query_version
+                result = await run.io_bound(query_page, *self._query())
+                if result is None or self.table.is_deleted:
+                    return
+                if version == self._query_version:
+                    self._show_page(*result)
+                    if self._stale:
+                        # The records changed meanwhile; wait before reading them all again
+                        await asyncio.sleep(refresh_delay)
+        finally:
+            self._building = False
+
+    def _sorted_or_filtered(self):
+        """Whether building the current page reads the whole collection."""
+        return bool(self.table.pagination.get('sortBy') or self.table.filter)
+
+    def _query(self):
+        """Return the arguments of `query_page` building the current page."""
+        pagination = self.table.pagination
+        return (self.records, self.to_row, pagination.get('page', 1), pagination.get('rowsPerPage', 10),
+                pagination.get('sortBy'), pagination.get('descending', False), self.table.filter or '',
+                self.sort_keys)
+
+    def _show_page(self, pairs, total):
+        """Show the rows of a page built by `query_page`."""
+        self.page_records = [record for record, _ in pairs]
+        self.table.rows = [row for _, row in pairs]
+        self.table.pagination = {**self.table.pagination, 'rowsNumber': total}
+
+    def follow(self, store, name):
+        """
+        Apply the changes of the collection shown in the table to the visible page.
+
+        While the table shows the whole collection, inserts and deletes rebuild the current
+        page: at once without a sort order or filter, as only the page is read, and otherwise
+        on a worker thread, at most once every `refresh_delay` seconds while the changes go on.
+        While it shows a search result, deleted records drop out of the result and new
+        records are ignored. Updates rebuild the rows of the updated records on the page. A
+        replaced collection is shown in full instead of the records of the old one.
+
+        Args:
+            store (Store): The store holding the collection.
+            name (str): The name of the collection the shown records belong to.
+
+        Returns:
+            None
+        """
+        def apply(op, records, keys):
+            collection = getattr(store, name)
+            if op == 'update':
+                updated = {id(r) for r in records}
+                self.rebuild_rows(lambda record: id(record) in updated)
+            elif op == 'replace':
+                self.records = collection
+                self.refresh()
+            elif self.records is collection:
+                self.refresh()
+            elif op == 'delete':
+                removed = {id(r) for r in records}
+                if any(id(r) in removed for r in self.records):
+                    self.records = [r for r in self.records if id(r) not in removed]
+                    self.refresh()
+
+        self._subscribe(store, name, apply)
+
+    def follow_related(self, store, name, field):
+        """
+        Rebuild the rows that show data of another collection when that data changes.
+
+        For example, the bookings table shows client names, so it follows the clients with the
+        'Client_ID' field: renaming a client rebuilds the visible rows of that client's bookings.
+
+        Args:
+            store (Store): The store holding the other collection.
+            name (str): The name of the other collection.
+            field (str): The field of the shown records holding the ID of the related record.
+
+        Returns:
+            None
+        """
+        def apply(op, records, keys):
+            if op == 'replace':
+                self.rebuild_rows(lambda record: True)
+                return
+            key_field = getattr(store, name).key_field
+            changed = set(keys) | {record_key(r.get(key_field, '')) for r in records}
+            self.rebuild_rows(lambda record: record_key(record.get(field, '')) in changed)
+
+        self._subscribe(store, name, apply)
+
+    def rebuild_rows(self, predicate):
+        """
+        Rebuild the rows of the visible page whose records match a predicate.
+
+        Args:
+            predicate (Callable): Called with a record, returns True if its row must be rebuilt.
+
+        Returns:
+            None
+        """
+        rows = self.table.rows
+        changed = False
+        for i, record in enumerate(self.page_records):
+            if predicate(record):
+                rows[i] = self.to_row(record)
+                changed = True
+        if changed:
+            self.table.update()
+
+    def _subscribe(self, store, name, apply):
+        """Follow a collection of the store on the UI event loop until the table is deleted, e.g. when its page is closed."""
+        def listener(op, records, keys):
+            if self.table.is_deleted:
+                store.unsubscribe(name, listener)
+                return
+            apply(op, records, keys)
+
+        store.subscribe(name, listener, loop=core.loop)
+
+    def _handle_request(self, e):
+        """Answer a request of the table for another page, sort order or filter."""
+        self.table.pagination = {**self.table.pagination, **e.args.get('pagination', {})}
+        self.table.filter = e.args.get('filter') or ''
+        self._query_version += 1
+        self.refresh()
@@ -0,0 +1,238 @@
+"""
+Compact record types for the collections.
+
+A plain dict carries a hash table sized for its keys, which for records with ten or more fields
+costs several hundred bytes per record before any value is stored. The record types here keep
+every known field in a `__slots__` attribute instead, so a record costs little more than one
+pointer per field. They behave like dicts everywhere the application reads or edits records, and
+are converted back to plain dicts with `dict(record)`, `record.copy()` or `to_dict` wherever a
+record leaves the store, e.g. when it is written as JSON or shown in a table.
+
+Fields with few distinct values, such as cities or the record 'Type', repeat the same strings
+across millions of records. Each value parsed from JSON is a separate string object, so these
+fields are dictionary-encoded: every distinct value is kept once in a `ValuePool` and records
+refer to that shared object. Records still hold ordinary strings, so the encoding is invisible
+to the code reading them.
+"""
+from collections.abc import MutableMapping
+
+# Default of getattr() telling an unset slot apart from a slot holding None
+_missing = object()
+
+
+class ValuePool:
+    """
+    Hands out one shared object for every distinct value of a field.
+
+    The pool stops taking new values once it holds `limit` of them, so a field that turns out
+    to have many distinct values costs no more memory than without the pool.
+    """
+
+    def __init__(self, limit=4096):
+        """
+        Args:
+            limit (int): The maximum number of distinct values kept.
+        """
+        self.limit = limit
+        self.values = {}
+
+    def share(self, value):
+        """
+        Return the shared object equal to the given value.
+
+        Args:
+            value (Any): The field value; only strings are shared.
+
+        Returns:
+            Any: The shared object, or the value itself if it is not shared.
+        """
+        if type(value) is not str:
+            return value
+        shared = self.values.get(value)
+        if shared is not None:
+            return shared
+        if len(self.values) < self.limit:
+            self.values[value] = value
+        return value
+
+
+# Pools of the dictionary-encoded fields, shared by all record types with such a field
+pools = {field: ValuePool() for field in ('Type', 'City', 'Country', 'State', 'Start City', 'End City', 'Date')}
+
+
+class Record(MutableMapping):
+    """
+    Base class of the record types, a mutable mapping of field names to values.
+
+    The fields the record type was created with are stored in slots; any other field is kept in
+    a small dict, so records with unexpected fields still round-trip unchanged. Fields that were never set
+    are absent, exactly like missing keys of a dict.
+    """
+    __slots__ = ('_extra',)
+
+    # Field name -> slot name, and field name -> value pool of the dictionary-encoded fields,
+    # filled in by record_type()
+    _slots = {}
+    _pools = {}
+
+    def __init__(self, data=(), **kwargs):
+        self._extra = None
+        self.update(data, **kwargs)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Convert a dict into a record of this type; records of this type are returned as is.
+
+        Args:
+            data (Mapping): The record as read from JSON or entered in the UI.
+
+        Returns:
+            Record: The record.
+        """
+        if type(data) is cls:
+            return data
+        record = cls.__new__(cls)
+        record._extra = None
+        slots, pools = cls._slots, cls._pools
+        for field, value in data.items():
+            slot = slots.get(field)
+            if slot is not None:
+                pool = pools.get(field)
+                setattr(record, slot, pool.share(value) if pool is not None else value)
+            else:
+                record[field] = value
+        return record
+
+    def __getitem__(self, field):
+        slot = self._slots.get(field)
+        if slot is not None:
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                raise KeyError(field) from None
+        if self._extra is None:
+            raise KeyError(field)
+        return self._extra[field]
+
+    def __setitem__(self, field, value):
+        slot = self._slots.get(field)
+        if slot is not None:
+            pool = self._pools.get(field)
+            setattr(self, slot, pool.share(value) if pool is not None else value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[field] = value
+
+    def __delitem__(self, field):
+        slot = self._slots.get(field)
+        if slot is not None:
+            try:
+                delattr(self, slot)
+            except AttributeError:
+                raise KeyError(field) from None
+        elif self._extra is not None and field in self._extra:
+            del self._extra[field]
+        else:
+            raise KeyError(field)
+
+    def __iter__(self):
+        for field, slot in self._slots.items():
+            if hasattr(self, slot):
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, field):
+        slot = self._slots.get(field)
+        if slot is not None:
+            return hasattr(self, slot)
+        return self._extra is not None and field in self._extra
+
+    def get(self, field, default=None):
+        slot = self._slots.get(field)
+        if slot is not None:
+            return getattr(self, slot, default)
+        return self._extra.get(field, default) if self._extra is not None else default
+
+    def to_dict(self):
+        """
+        Return the record as a plain dict, e.g. to serialize it or to show it in a table.
+
+        Returns:
+            dict: A new dict with the fields of the record.
+        """
+        data = {}
+        for field, slot in self._slots.items():
+            value = getattr(self, slot, _missing)
+            if value is not _missing:
+                data[field] = value
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    copy = to_dict
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self._extra = None
+        self.update(state)
+
+
+def record_type(name, fields, encode=True):
+    """
+    Create a record type storing the given fields in slots.
+
+    Args:
+        name (str): The class name of the record type.
+        fields (list): The field names, e.g. 'Address Line 1'. Field names need not be valid
+                       Python identifiers, every field is stored in a slot named after its position.
+        encode (bool): Whether to dictionary-encode the fields that have a pool in `pools`.
+
+    Returns:
+        type: The new subclass of `Record`.
+    """
+    slots = {field: f'f{i}' for i, field in enumerate(fields)}
+    encoded = {field: pools[field] for field in fields if field in pools} if encode else {}
+    return type(name, (Record,), {'__slots__': tuple(slots.values()), '_slots': slots, '_pools': encoded})
+
+
+def to_dict(record):
+    """
+    Return a record as a plain dict, leaving plain dicts as they are.
+
+    Args:
+        record (Mapping): A record of any type.
+
+    Returns:
+        dict: The record as a dict.
+    """
+    return record.to_dict() if isinstance(record, Record) else record
+
+
+# The fields are listed in the order they are written to the data files
+Client = record_type('Client', [
+    'Name', 'Address Line 1', 'Address Line 2', 'Address Line 3', 'City', 'State',
+    'Zip Code', 'Country', 'Phone Number', 'ID', 'Type',
+])
+Airline = record_type('Airline', ['ID', 'Type', 'Company Name'])
+Booking = record_type('Booking', [
+    'Booking_ID', 'Client_ID', 'Airline_ID', 'Flight_ID', 'Date', 'Start City', 'End City', 'Type',
+])
+AvailableFlight = record_type('AvailableFlight', ['Flight_ID', 'Airline_ID', 'Date', 'Start City', 'End City', 'Type'])
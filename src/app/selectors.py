@@ -0,0 +1,147 @@
+"""
+Search-as-you-type options for the record selectors.
+
+A `ui.select` given an option for every record ships the whole collection to the browser and
+has to be rebuilt in full whenever a record is created or deleted. `OptionSearch` instead keeps
+only the best few matches of what the user has typed in the select, and answers every change of
+the typed text with the next few matches, looked up on the server in the word index the
+collection keeps, so no keystroke scans the collection.
+"""
+from nicegui import core
+
+from app.storage import record_key
+
+
+# The number of options a selector shows at most
+option_limit = 20
+
+
+def search_options(records, label, text='', limit=option_limit):
+    """
+    Return the options of the records matching a search text.
+
+    A record whose key equals the text, e.g. an ID typed in full, is looked up in the key index
+    of the collection and comes first. The other matches are the records with a word starting
+    with every word of the text, ignoring case, found in the word index of the collection with
+    `Collection.search`; a collection without searchable fields is only searched by key. Neither
+    lookup reads the whole collection, so a keystroke costs the same for 1k or 1M records.
+
+    Args:
+        records (Collection): The records to search.
+        label (Callable): Turns a record into the label of its option.
+        text (str): The search text; without one the first records are returned.
+        limit (int): The maximum number of options returned.
+
+    Returns:
+        dict: The options, mapping the key of each matching record to its label.
+    """
+    key_field = records.key_field
+    needle = (text or '').strip().lower()
+    if not needle:
+        return {r[key_field]: label(r) for r in records[:limit]}
+
+    options = {}
+    # IDs are shown zero-padded, so '000000012' finds the record with the ID 12
+    exact = records.get(str(int(needle)) if needle.isdecimal() else needle)
+    if exact is not None:
+        options[exact[key_field]] = label(exact)
+    for record in records.search(needle, limit):
+        if len(options) >= limit:
+            break
+        options.setdefault(record[key_field], label(record))
+    return options
+
+
+class OptionSearch:
+    """
+    Serves the options of a `ui.select` from a search of a collection.
+
+    The select shows an input field; every change of the typed text replaces the options with
+    the matches of `search_options`, so the browser never holds more than `limit` options. The
+    selected record always keeps its option, so searching never clears the selection.
+
+    The options follow the collection, by its name in the store: creating or deleting a record,
+    editing a record that has an option, or replacing the collection repeats the current search,
+    and deleting the selected record clears the selection.
+    """
+
+    def __init__(self, select, store, name, label, limit=option_limit):
+        """
+        Args:
+            select (ui.select): The select to serve; it is switched to showing an input field.
+            store (Store): The store holding the records to choose from.
+            name (str): The name of the collection of the records in the store, e.g. 'clients'.
+            label (Callable): Turns a record into the label of its option.
+            limit (int): The maximum number of options shown.
+        """
+        self.select = select
+        self.store = store
+        self.name = name
+        self.label = label
+        self.limit = limit
+        self.text = ''
+        select.props('use-input fill-input hide-selected input-debounce=0')
+        select.on('input-value', self._handle_input, throttle=0.2, leading_events=False)
+        store.subscribe(name, self._handle_change, loop=core.loop)
+        self.search()
+
+    @property
+    def collection(self):
+        """Collection: The collection the store currently holds under the name of the selector."""
+        return getattr(self.store, self.name)
+
+    def search(self, text=''):
+        """
+        Show the options matching a search text.
+
+        Args:
+            text (str): The search text.
+
+        Returns:
+            None
+        """
+        self.text = text or ''
+        options = search_options(self.collection, self.label, self.text, self.limit)
+        value = self.select.value
+        if value is not None and value != '' and value not in options:
+            selected = self.collection.get(value)
+            if selected is not None:
+                options = {value: self.label(selected), **options}
+        self.select.set_options(options)
+
+    def set_value(self, value):
+        """
+        Select a record by its key, even if it is not among the current options.
+
+        Args:
+            value (Any): The key of the record, or None to clear the selection.
+
+        Returns:
+            None
+        """
+        record = self.collection.get(value) if value not in (None, '') else None
+        if record is None:
+            self.select.set_value(None)
+            return
+        value = record[self.collection.key_field]
+        if value not in self.select.options:
+            self.select.set_options({value: self.label(record), **self.select.options})
+        self.select.set_value(value)
+
+    def _handle_change(self, op, records, keys):
+        """Repeat the current search after records were created, deleted or relabelled, or the collection was replaced."""
+        if self.select.is_deleted:
+            self.store.unsubscribe(self.name, self._handle_change)
+            return
+        keys = set(keys)
+        if op == 'update' and not any(record_key(value) in keys for value in self.select.options):
+            return
+        value = self.select.value
+        if value not in (None, '') and (op == 'delete' and record_key(value) in keys or
+                                        op == 'replace' and self.collection.get(value) is None):
+            self.select.set_value(None)
+        self.search(self.text)
+
+    def _handle_input(self, e):
+        """Answer a change of the text typed in the select."""
+        self.search(e.args if isinstance(e.args, str) else '')
@@ -1,60 +1,428 @@
+import gc
+import tempfile
+import time
 from datetime import datetime
-from nicegui import ui
+from operator import methodcaller
+from nicegui import run, ui
 
-import json
 from pathlib import Path
+from app import config
+from app.storage import load_json, save_json, record_key
+from app.paging import TablePager
+from app.selectors import OptionSearch
+from app.records import Client, Airline, Booking, AvailableFlight
+from app.store import Collection, ConflictError, Store, Transaction, load_parallel
+from app.jobs import job_queue, run_steps
+from app.importer import BulkImport, count_rows
 
 # Paths for data files
-data_dir = Path(__file__).parent.parent / 'data'
+data_dir = Path(config.data_dir) if config.data_dir else Path(__file__).parent.parent / 'data'
 client_file = data_dir / 'clients.json'
 airline_file = data_dir / 'airlines.json'
 flight_file = data_dir / 'flights.json'
 available_flight_file = data_dir / 'available_flights.json'
 
 
-# Helpers to load & save JSON
-def load_json(path, default=list):
+# In-memory records, loaded from storage on first access or by warm_up(). Pages and handlers
+# read the collections through the store whenever they need them, never keeping their own references.
+store = Store(
+    clients=Collection(client_file, 'ID', record_type=Client, search_fields=('Name',)),
+    airlines=Collection(airline_file, 'ID', record_type=Airline, search_fields=('Company Name',)),
+    flights=Collection(flight_file, 'Booking_ID', indexes=('Client_ID', 'Airline_ID', ('Client_ID', 'Airline_ID')),
+                       record_type=Booking),
+    available_flights=Collection(available_flight_file, 'Flight_ID', record_type=AvailableFlight),
+)
+
+
+def check_references():
+    """
+    Check that the bookings and available flights refer to existing clients and airlines.
+
+    Walks the distinct IDs in the booking indexes rather than every booking, so the check stays
+    cheap for large booking files. Must run after all collections have been loaded.
+
+    Returns:
+        list: A description of every dangling reference, empty if there are none.
+    """
+    problems = []
+    references = (('Client_ID', store.clients, 'client'), ('Airline_ID', store.airlines, 'airline'))
+    for field, collection, name in references:
+        for value, bookings in store.flights.indexes[field].items():
+            if value and collection.get(value) is None:
+                problems.append(f"{len(bookings)} booking(s) refer to missing {name} {value}")
+    for flight in store.available_flights:
+        if store.airlines.get(flight.get('Airline_ID', '')) is None:
+            problems.append(f"Available flight {flight.get('Flight_ID')} refers to missing airline {flight.get('Airline_ID')}")
+    return problems
+
+
+def warm_up():
+    """
+    Load all collections from storage before the first page is served.
+
+    Registered with `app.on_startup` so that importing this module stays cheap, while the
+    first visitor does not pay for parsing the data files. The four files are loaded
+    concurrently, and the references between them are checked once all of them are loaded.
+    The per-file and total load times and any dangling references are printed.
+
+    Returns:
+        dict: The load time in seconds per file and in total, and the dangling references.
     """
-    Load JSON data from a file.
+    start = time.perf_counter()
+    timings = load_parallel(store.collections(), config.startup_processes)
+    total = time.perf_counter() - start
+    problems = check_references()
 
-    If the specified path does not exist, return the result of the `default` callable instead.
+    for name, seconds in timings.items():
+        print(f"Loaded {name} in {seconds:.3f}s")
+    print(f"Loaded all data files in {total:.3f}s")
+    for problem in problems:
+        print(f"Warning: {problem}")
+    return {'files': timings, 'total': total, 'problems': problems}
+
+
+def freeze_loaded_records():
+    """
+    Move the records loaded by `warm_up` out of the garbage collector's reach, if `config.gc_freeze` is set.
+
+    Registered by the server after `warm_up`. The records live as long as the app, and a full
+    collection walking millions of them holds the GIL long enough to stall the event loop, even
+    while the work that triggered it runs in a thread. `gc.freeze()` affects the whole process,
+    so tests and the importer, which also load the collections, do not call this.
+
+    Returns:
+        bool: True if the garbage collector was frozen.
+    """
+    if not config.gc_freeze:
+        return False
+    gc.freeze()
+    return True
+
+
+def cascade_steps(collection, key, field, chunk_size):
+    """
+    Delete a client or airline together with all bookings that refer to it, chunk by chunk.
+
+    The bookings are deleted first, `chunk_size` at a time, so a cascade stopped between two
+    chunks never leaves bookings that refer to a deleted record. The last chunk and the client or
+    airline are deleted in one `Transaction`, so they are written together: a crash never keeps
+    the client or airline after its last booking is gone, or its bookings after it is gone.
+    Used as the steps of a background job, see `app.jobs`.
+
+    Args:
+        collection (Collection): The clients or airlines.
+        key (Any): The ID of the client or airline.
+        field (str): The field of the bookings holding that ID, 'Client_ID' or 'Airline_ID'.
+        chunk_size (int): The number of bookings deleted at a time.
+
+    Yields:
+        int: The number of bookings deleted by each chunk.
+
+    Returns:
+        int: The number of bookings deleted by the last chunk, together with the client or airline.
+    """
+    # The matches are taken once and deleted chunk by chunk; the last step finds the bookings
+    # added in the meantime, and bookings moved to another record in the meantime are kept
+    matches = [f['Booking_ID'] for f in store.flights.find(field, key)]
+    for start in range(0, len(matches) - chunk_size, chunk_size):
+        chunk = [booking_id for booking_id in matches[start:start + chunk_size]
+                 if record_key(store.flights.lookup(booking_id, field, None)) == record_key(key)]
+        yield len(store.flights.delete(chunk))
+    with Transaction(store.flights, collection):
+        removed = store.flights.delete([f['Booking_ID'] for f in store.flights.find(field, key)])
+        collection.delete([key])
+    return len(removed)
+
+
+def delete_cascade(collection, key, field):
+    """
+    Delete a client or airline together with all bookings that refer to it, in one go.
+
+    A cascade can remove many thousands of bookings, so callers on the event loop should run
+    this in a worker thread with `run.io_bound`, or submit `cascade_steps` as a background job.
 
     Args:
-        path (Path): The path to the JSON file.
-        default (Callable): A callable that returns a default value if the file does not exist.
-                            Defaults to `list`.
+        collection (Collection): The clients or airlines.
+        key (Any): The ID of the client or airline.
+        field (str): The field of the bookings holding that ID, 'Client_ID' or 'Airline_ID'.
 
     Returns:
-        Any: The parsed JSON data, or the result of `default()` if the file is missing.
+        int: The number of deleted bookings.
     """
+    return run_steps(cascade_steps(collection, key, field, max(len(store.flights), 1)))
+
 
-    if not path.exists():
-        return default()
-    return json.loads(path.read_text())
+def submit_cascade(collection, key, field, title):
+    """
+    Queue the deletion of a client or airline and its bookings as a background job.
 
+    Args:
+        collection (Collection): The clients or airlines.
+        key (Any): The ID of the client or airline.
+        field (str): The field of the bookings holding that ID, 'Client_ID' or 'Airline_ID'.
+        title (str): Describes the job to the user.
 
-def save_json(path, data):
+    Returns:
+        Job: The queued job.
     """
-    Save data as a JSON file.
+    return job_queue.submit(title, cascade_steps(collection, key, field, config.job_chunk_size),
+                            total=len(store.flights.find(field, key)))
 
-    Ensures that the directory for the given path exists before writing the data.
+
+def submit_import(name, path, title, total=None, remove=False):
+    """
+    Queue the bulk import of a CSV or JSON Lines file as a background job, see `app.importer`.
 
     Args:
-        path (Path): The file path where the JSON data will be saved.
-        data (Any): The data to be serialized and saved as JSON.
+        name (str): The collection to import into, e.g. 'clients'.
+        path (Path): The file to import.
+        title (str): Describes the job to the user.
+        total (int, optional): The number of rows of the file; estimated with `count_rows` if not given.
+        remove (bool): Whether to delete the file and its directory once the job has finished,
+                       e.g. an upload saved to a temporary directory, also if it never started.
+
+    Returns:
+        Job: The queued job.
+    """
+    def cleanup():
+        Path(path).unlink(missing_ok=True)
+        Path(path).parent.rmdir()
+
+    return job_queue.submit(title, BulkImport(store, name, path).steps(),
+                            total=count_rows(path) if total is None else total,
+                            cleanup=cleanup if remove else None)
+
+
+def build_job_list():
+    """
+    Show the background jobs with their progress and a button to cancel them.
+
+    The jobs are kept by the job queue, so a reloaded page shows the jobs started before the
+    reload. The list is redrawn by a timer whenever the queue reports a change.
 
     Returns:
         None
     """
-    data_dir.mkdir(exist_ok=True)
-    path.write_text(json.dumps(data, indent=2))
+    shown_version = None
+
+    @ui.refreshable
+    def job_list():
+        jobs = job_queue.jobs()
+        if not jobs:
+            return
+        with ui.card().classes('w-full p-4 shadow'):
+            ui.label('Background Jobs').classes('text-lg font-bold')
+            for job in reversed(jobs):
+                with ui.row().classes('w-full items-center gap-4'):
+                    ui.label(job.title).classes('w-1/3')
+                    ui.linear_progress(value=job.progress, show_value=False).classes('w-1/4')
+                    total = f'/{job.total}' if job.total is not None else ''
+                    rate = f', {job.rate:.0f}/s' if job.started is not None else ''
+                    ui.label(f'{job.state.capitalize()} ({job.done}{total}{rate})')
+                    if job.error:
+                        ui.label(job.error).classes('text-red-600')
+                    if job.active:
+                        ui.button('Cancel', on_click=job.cancel).props('flat dense').classes('text-red')
+
+    def update():
+        nonlocal shown_version
+        if job_queue.version != shown_version:
+            shown_version = job_queue.version
+            job_list.refresh()
+
+    job_list()
+    ui.timer(0.5, update)
+
+
+def edited_fields(record, values):
+    """
+    Keep the values of an edit dialog that differ from those of the record it was opened with.
+
+    The inputs show a missing field as '', so leaving such an input empty is not a change.
+
+    Args:
+        record (dict): A copy of the record, taken when the dialog was opened.
+        values (dict): The values of the editable inputs.
+
+    Returns:
+        dict: The changed fields, empty if the agent changed nothing.
+    """
+    return {field: value for field, value in values.items() if value != record.get(field, '')}
+
+
+def save_edit(dialog, collection, key, version, changes, name):
+    """
+    Save the changes made in an edit dialog, unless the record changed since the dialog opened.
+
+    The update is checked against the version the record had when the dialog was opened, so an
+    edit never overwrites the changes another agent saved in the meantime. The dialog is closed
+    when the changes are saved or the record turns out to be deleted; after a conflict it stays
+    open and the agent is told to reopen the record.
+
+    Args:
+        dialog (ui.dialog): The edit dialog.
+        collection (Collection): The collection of the record.
+        key (Any): The ID the record had when the dialog was opened.
+        version (int): The version the record had when the dialog was opened.
+        changes (dict): The edited fields.
+        name (str): Names the record to the agent, e.g. 'Client 7'.
+
+    Returns:
+        bool: True if the changes were saved.
+    """
+    try:
+        collection.update(key, changes, version=version)
+    except KeyError:
+        ui.notify(f'{name} has been deleted by another agent', type='warning')
+        dialog.close()
+        return False
+    except ConflictError:
+        ui.notify(f'{name} has been changed by another agent since you opened it. '
+                  f'Close this dialog and open it again to see the changes.', type='warning')
+        return False
+    except ValueError:
+        ui.notify(f"{collection.key_field} {changes[collection.key_field]} is already in use", type='warning')
+        return False
+    dialog.close()
+    return True
+
+
+def id_row(record):
+    """
+    Build the table row of a client or airline, with the ID formatted to a 9-digit string.
+
+    Args:
+        record (dict): The client or airline record.
+
+    Returns:
+        dict: The table row.
+    """
+    row = record.copy()
+    row['ID'] = f"{int(row['ID']):09d}"
+    return row
+
+
+def id_sort_keys(fields):
+    """
+    Map the columns of the clients or airlines table to the values they are sorted by, read from the records.
+
+    Args:
+        fields (list): The fields shown as columns.
+
+    Returns:
+        dict: The sort keys of the table, see `query_page`; the 9-digit IDs sort as numbers.
+    """
+    sort_keys = {field: methodcaller('get', field) for field in fields}
+    sort_keys['ID'] = lambda record: int(record['ID'])
+    return sort_keys
+
+
+def flight_row(f):
+    """
+    Build the table row of a booking, resolving the client and airline names through the ID indexes.
+
+    Args:
+        f (dict): The booking record.
+
+    Returns:
+        dict: The table row.
+    """
+    client_id = f.get('Client_ID')
+    airline_id = f.get('Airline_ID')
+    return {
+        'Booking ID': f.get('Booking_ID', ""),
+        'Flight ID': f.get('Flight_ID', ""),
+        'Client ID': client_id,
+        'Client': store.clients.lookup(client_id, 'Name'),
+        'Airline ID': airline_id,
+        'Airline': store.airlines.lookup(airline_id, 'Company Name'),
+        'Date': f.get('Date', ''),
+        'Start City': f.get('Start City', ''),
+        'End City': f.get('End City', '')
+    }
+
+
+# The values the columns of the bookings table are sorted by, read from a booking without building its row
+flight_sort_keys = {
+    'Booking ID': methodcaller('get', 'Booking_ID'),
+    'Flight ID': methodcaller('get', 'Flight_ID'),
+    'Client ID': methodcaller('get', 'Client_ID'),
+    'Client': lambda f: store.clients.lookup(f.get('Client_ID'), 'Name'),
+    'Airline ID': methodcaller('get', 'Airline_ID'),
+    'Airline': lambda f: store.airlines.lookup(f.get('Airline_ID'), 'Company Name'),
+    'Date': methodcaller('get', 'Date'),
+    'Start City': methodcaller('get', 'Start City'),
+    'End City': methodcaller('get', 'End City'),
+}
+
+
+def client_label(c):
+    """Return the option label of a client: its name and its 9-digit ID."""
+    return f"{c['Name']} {int(c['ID']):09d}"
+
+
+def airline_label(a):
+    """Return the option label of an airline: its company name and its 9-digit ID."""
+    return f"{a['Company Name']} {int(a['ID']):09d}"
+
+
+def available_flight_label(f):
+    """Return the option label of an available flight: its 9-digit flight ID."""
+    return f"{int(f['Flight_ID']):09d}"
+
+
+def available_flight_row(f):
+    """
+    Build the table row of an available flight, resolving the airline name.
 
+    Args:
+        f (dict): The available flight record.
+
+    Returns:
+        dict: The table row.
+    """
+    row = {field: f.get(field, '') for field in ['Flight_ID', 'Airline_ID', 'Date', 'Start City', 'End City']}
+    row['Airline'] = store.airlines.lookup(f.get('Airline_ID'), 'Company Name')
+    return row
+
+
+# The values the columns of the available flights table are sorted by, read from a flight
+available_flight_sort_keys = {
+    **{field: methodcaller('get', field) for field in ['Flight_ID', 'Airline_ID', 'Date', 'Start City', 'End City']},
+    'Airline': lambda f: store.airlines.lookup(f.get('Airline_ID'), 'Company Name'),
+}
+
+
+def lazy_tab_panel(panels, tab, build):
+    """
+    Add a tab panel to `panels` whose content is only built the first time its tab is selected.
+
+    Args:
+        panels (ui.tab_panels): The tab panels to add the panel to.
+        tab (ui.tab): The tab that shows the panel.
+        build (Callable): Builds the content of the panel, called inside the panel.
+
+    Returns:
+        ui.tab_panel: The panel.
+    """
+    with panels:
+        panel = ui.tab_panel(tab)
+    built = False
+
+    def build_if_selected(_=None):
+        nonlocal built
+        value = panels.value
+        if isinstance(value, ui.tab):
+            value = value.props['name']
+        if not built and value == tab.props['name']:
+            built = True
+            with panel:
+                build()
+
+    panels.on_value_change(build_if_selected)
+    build_if_selected()
+    return panel
 
-# Initialize in-memory records
-clients = load_json(client_file)
-airlines = load_json(airline_file)
-flights = load_json(flight_file)
-available_flights = load_json(available_flight_file)
 
 def build_agent_view():
     """Builds the main agent view with tabs for managing clients, airlines, and flights."""
@@ -77,15 +445,15 @@ def build_agent_view():
 
     # Define flight fields
     flight_manage_columns = [
-        {'name': 'Booking ID', 'label': 'Booking ID', 'field': 'Booking ID'},
-        {'name': 'Flight ID', 'label': 'Flight ID', 'field': 'Flight ID'},
-        {'name': 'Client ID', 'label': 'Client ID', 'field': 'Client ID'},
-        {'name': 'Client', 'label': 'Client Name', 'field': 'Client'},
-        {'name': 'Airline ID', 'label': 'Airline ID', 'field': 'Airline ID'},
-        {'name': 'Airline', 'label': 'Airline Name', 'field': 'Airline'},
-        {'name': 'Date', 'label': 'Date', 'field': 'Date'},
-        {'name': 'Start City', 'label': 'Start City', 'field': 'Start City'},
-        {'name': 'End City', 'label': 'End City', 'field': 'End City'}
+        {'name': 'Booking ID', 'label': 'Booking ID', 'field': 'Booking ID', 'sortable': True},
+        {'name': 'Flight ID', 'label': 'Flight ID', 'field': 'Flight ID', 'sortable': True},
+        {'name': 'Client ID', 'label': 'Client ID', 'field': 'Client ID', 'sortable': True},
+        {'name': 'Client', 'label': 'Client Name', 'field': 'Client', 'sortable': True},
+        {'name': 'Airline ID', 'label': 'Airline ID', 'field': 'Airline ID', 'sortable': True},
+        {'name': 'Airline', 'label': 'Airline Name', 'field': 'Airline', 'sortable': True},
+        {'name': 'Date', 'label': 'Date', 'field': 'Date', 'sortable': True},
+        {'name': 'Start City', 'label': 'Start City', 'field': 'Start City', 'sortable': True},
+        {'name': 'End City', 'label': 'End City', 'field': 'End City', 'sortable': True}
     ]
 
     #Define available flight fields
@@ -97,57 +465,49 @@ def build_agent_view():
         """
         Generate the next available client ID.
 
-        Returns the next client ID by finding the maximum existing ID and adding 1.
-        If no clients exist, returns 1.
+        Allocates the ID from the persisted sequence of the collection, which is O(1) and never
+        hands out the same ID twice, even to concurrent sessions.
 
         Returns:
             int: The next available client ID.
         """
-        if clients:
-            return max(int(c.get('ID', 0)) for c in clients) + 1
-        return 1
+        return store.clients.next_id()
 
     def get_next_airline_id():
         """
         Generate the next available airline ID.
 
-        Returns the next airline ID by finding the maximum existing ID and adding 1.
-        If no clients exist, returns 1.
+        Allocates the ID from the persisted sequence of the collection, which is O(1) and never
+        hands out the same ID twice, even to concurrent sessions.
 
         Returns:
             int: The next available airline ID.
         """
-        if airlines:
-            return max(int(a.get('ID', 0)) for a in airlines) + 1
-        return 1
+        return store.airlines.next_id()
 
     def get_next_available_flight_id():
         """
         Generate the next available flight ID.
 
-        Returns the next available flight ID by finding the maximum existing ID and adding 1.
-        If no clients exist, returns 1.
+        Allocates the ID from the persisted sequence of the collection, which is O(1) and never
+        hands out the same ID twice, even to concurrent sessions.
 
         Returns:
             int: The next available flight ID.
         """
-        if available_flights:
-            return max(int(f.get('Flight_ID', 0)) for f in available_flights) + 1
-        return 1
+        return store.available_flights.next_id()
 
     def get_next_booking_id():
         """
         Generate the next available Booking ID.
 
-        Returns the next available Booking ID by finding the maximum existing ID and adding 1.
-        If no clients exist, returns 1.
+        Allocates the ID from the persisted sequence of the collection, which is O(1) and never
+        hands out the same ID twice, even to concurrent sessions.
 
         Returns:
             int: The next available Booking ID.
         """
-        if flights:
-            return max(int(f.get('Booking_ID', 0)) for f in flights) + 1
-        return 1
+        return store.flights.next_id()
 
 
     def create_client():
@@ -179,19 +539,12 @@ def build_agent_view():
         record['ID'] = new_id
         record['Type'] = 'Client'
 
-        clients.append(record)
-        save_json(client_file, clients)
-
-        # Update the client dropdown's options.
-        new_client_options = {c['ID']: f"{c['Name']} {int(c['ID']):09d}" for c in clients}
-        client_select.set_options(new_client_options)
-        flight_delete_client_select.set_options(new_client_options)
+        store.clients.insert(record)
 
         ui.notify(f'Client created with ID {new_id:09d}')
 
         for inp in inputs.values():
             inp.value = ''
-        load_clients()
         # Switch to the view tab after creation
         client_ops.set_value(tab_client_manage)
 
@@ -225,17 +578,11 @@ def build_agent_view():
             'Company Name': airline_input.value
         }
 
-        airlines.append(record)
-        save_json(airline_file, airlines)
-
-        # Update the airline dropdown's options.
-        new_airline_options = {a['ID']: f"{a['Company Name']} {int(a['ID']):09d}" for a in airlines}
-        airline_select.set_options(new_airline_options)
+        store.airlines.insert(record)
 
         ui.notify(f'Airline created with ID {new_id:09d}')
 
         airline_input.value = ''
-        load_airlines()
         # Switch to the view tab after creation
         airline_ops.set_value(tab_airline_manage)
 
@@ -286,8 +633,7 @@ def build_agent_view():
             'Type': 'Flight'
         }
 
-        flights.append(record)
-        save_json(flight_file, flights)
+        store.flights.insert(record)
 
         ui.notify('Flight booking created')
 
@@ -297,7 +643,6 @@ def build_agent_view():
         # Reset date input to current time
         flight_form_inputs['date_input'].value = datetime.now().strftime('%Y-%m-%dT%H:%M')
 
-        load_flights()
         flight_ops.set_value(tab_flight_manage)
 
     def create_available_flight():
@@ -345,8 +690,7 @@ def build_agent_view():
             'End City': end_city_input.value
         }
 
-        available_flights.append(record)
-        save_json(available_flight_file, available_flights)
+        store.available_flights.insert(record)
 
         ui.notify('Available flight created')
 
@@ -356,7 +700,6 @@ def build_agent_view():
         # Reset date input to current time
         date_input.value = datetime.now().strftime('%Y-%m-%dT%H:%M')
 
-        load_available_flights()
         available_flight_ops.set_value(tab_available_flights)
 
     def load_clients():
@@ -367,8 +710,8 @@ def build_agent_view():
         This function:
         - Retrieves and trims the client ID entered in the search input.
         - Filters the clients list for records matching the given ID.
-        - Formats the ID to a 9-digit string for display.
-        - Updates the table with the matching results.
+        - Hands the matches to the table pager, which formats the ID to a 9-digit string
+          and sends only the visible page of rows to the browser.
 
         Returns:
             None
@@ -376,13 +719,12 @@ def build_agent_view():
         q = client_manage_search_id.value.strip()
         # If search query is empty, get all clients, otherwise filter by the query
         if not q:
-            matched = [c.copy() for c in clients]
+            matched = store.clients
         else:
-            matched = [c.copy() for c in clients if str(c.get('ID', '')).strip() == q]
+            client = store.clients.get(q)
+            matched = [client] if client else []
 
-        for r in matched:
-            r['ID'] = f"{int(r['ID']):09d}"
-        table_clients.rows = matched
+        clients_pager.show(matched, id_row, id_sort_keys(client_fields))
 
     def load_airlines():
         """
@@ -392,8 +734,8 @@ def build_agent_view():
         This function:
         - Retrieves and trims the airline ID entered in the search input.
         - Filters the airlines list for records matching the given ID.
-        - Formats the ID to a 9-digit string for display.
-        - Updates the table with the matching results.
+        - Hands the matches to the table pager, which formats the ID to a 9-digit string
+          and sends only the visible page of rows to the browser.
 
         Returns:
             None
@@ -401,13 +743,12 @@ def build_agent_view():
         q = airline_manage_search_id.value.strip()
         # If search query is empty, get all airlines, otherwise filter by the query
         if not q:
-            matched = [a.copy() for a in airlines]
+            matched = store.airlines
         else:
-            matched = [a.copy() for a in airlines if str(a.get('ID', '')).strip() == q]
+            airline = store.airlines.get(q)
+            matched = [airline] if airline else []
 
-        for r in matched:
-            r['ID'] = f"{int(r['ID']):09d}"
-        table_airlines.rows = matched
+        airlines_pager.show(matched, id_row, id_sort_keys(airline_fields))
 
     def load_flights():
         """
@@ -416,41 +757,18 @@ def build_agent_view():
 
         This function:
         - Retrieves and trims the client ID entered in the search input.
-        - Filters the flights list for records matching the given client ID.
-        - Resolves the corresponding client and airline names.
-        - Constructs simplified flight records with client name, airline name, date, and cities.
-        - Updates the table with the matching results.
+        - Looks up the flights booked by the given client ID through the Client_ID index.
+        - Hands the matches to the table pager, which builds the simplified flight rows with
+          client name, airline name, date, and cities for the visible page only.
 
         Returns:
             None
         """
         q = flight_booking_manage_search_id.value.strip()
         # If search query is empty, use all flights, otherwise filter by the query
-        source_flights = flights if not q else [f for f in flights if str(f.get('Client_ID', '')).strip() == q]
-
-        matched = []
-        for f in source_flights:
-            client_id = f.get('Client_ID')
-            airline_id = f.get('Airline_ID')
-
-            # Match using integers
-            client = next((c for c in clients if c.get('ID') == client_id), {})
-            airline = next((a for a in airlines if a.get('ID') == airline_id), {})
-
-            record = {
-                'Booking ID': f.get('Booking_ID', ""),
-                'Flight ID': f.get('Flight_ID', ""),
-                'Client ID': client_id,
-                'Client': client.get('Name', ''),
-                'Airline ID': airline_id,
-                'Airline': airline.get('Company Name', ''),
-                'Date': f.get('Date', ''),
-                'Start City': f.get('Start City', ''),
-                'End City': f.get('End City', '')
-            }
-            matched.append(record)
-
-        table_flights.rows = matched
+        source_flights = store.flights if not q else store.flights.find('Client_ID', q)
+
+        flights_pager.show(source_flights, flight_row, flight_sort_keys)
 
     def load_available_flights():
         """
@@ -460,29 +778,22 @@ def build_agent_view():
         This function:
         - Retrieves and trims the flight ID entered in the search input.
         - Filters the available_flights list for records matching the given flight ID.
-        - Resolves the corresponding airline name.
-        - Constructs simplified flight records using the available_flight_fields list.
-        - Updates the table with the matching results.
+        - Hands the matches to the table pager, which builds the rows with the resolved
+          airline name for the visible page only.
 
         Returns:
             None
         """
-        available_flight_fields = ['Flight_ID', 'Airline_ID', 'Date', 'Start City', 'End City']
         q = flight_manage_search_id.value.strip()
 
         # If search query is empty, use all available flights, otherwise filter by Flight_ID
-        source_flights = available_flights if not q else [
-            f for f in available_flights if str(f.get('Flight_ID', '')).strip() == q
-        ]
-
-        matched = []
-        for f in source_flights:
-            airline = next((a for a in airlines if a['ID'] == f.get('Airline_ID')), {})
-            record = {field: f.get(field, '') for field in available_flight_fields}
-            record['Airline'] = airline.get('Company Name', '')
-            matched.append(record)
+        if not q:
+            source_flights = store.available_flights
+        else:
+            flight = store.available_flights.get(q)
+            source_flights = [flight] if flight else []
 
-        table_available_flights.rows = matched
+        available_flights_pager.show(source_flights, available_flight_row, available_flight_sort_keys)
 
     edit_inputs = {}
     edit_airline_inputs = {}
@@ -505,10 +816,12 @@ def build_agent_view():
             None
         """
         q = client_edit_search_id.value.strip()
-        client = next((c for c in clients if str(c.get('ID', '')).strip() == q), None)
+        client = store.clients.get(q)
         if not client:
             ui.notify('Client not found', type='warning')
             return
+        key, version = client['ID'], store.clients.version(client['ID'])
+        original = dict(client)
         edit_inputs.clear()
         with ui.dialog() as dialog, ui.card():
             ui.label(f"Edit Client ID: {int(client['ID']):09d}").classes("text-lg font-bold mb-2")
@@ -525,17 +838,17 @@ def build_agent_view():
 
                 Collects current values from the edit input fields, updates the client object,
                 saves the full clients list to the JSON file, refreshes the client table in the UI,
-                displays a success notification, and closes the edit dialog.
+                displays a success notification, and closes the edit dialog. If another agent
+                changed or deleted the client since the dialog was opened, nothing is saved.
 
                 Returns:
                     None
                 """
-                for field in client_fields:
-                    client[field] = edit_inputs[field].value
-                save_json(client_file, clients)
-                load_clients()
-                ui.notify('Client updated successfully', type='positive')
-                dialog.close()
+                # The read-only ID and Type are shown as text, and are not saved
+                changes = edited_fields(original, {field: edit_inputs[field].value for field in client_fields
+                                                    if field not in ['ID', 'Type']})
+                if save_edit(dialog, store.clients, key, version, changes, f'Client {q}'):
+                    ui.notify('Client updated successfully', type='positive')
 
             with ui.row().classes('w-full justify-end'):
                 ui.button('Cancel', on_click=dialog.close).classes(
@@ -559,10 +872,12 @@ def build_agent_view():
             None
         """
         q = airline_edit_search_id.value.strip()
-        airline = next((a for a in airlines if str(a.get('ID', '')).strip() == q), None)
+        airline = store.airlines.get(q)
         if not airline:
             ui.notify('Airline not found', type='warning')
             return
+        key, version = airline['ID'], store.airlines.version(airline['ID'])
+        original = dict(airline)
         edit_airline_inputs.clear()
         with ui.dialog() as dialog, ui.card():
             ui.label(f"Edit Airline ID: {int(airline['ID']):09d}").classes("text-lg font-bold mb-2")
@@ -580,17 +895,17 @@ def build_agent_view():
 
                 Retrieves updated values from input fields, modifies the corresponding airline record,
                 saves the entire airlines list to the JSON file, refreshes the airline table in the UI,
-                displays a success notification, and closes the dialog.
+                displays a success notification, and closes the dialog. If another agent changed
+                or deleted the airline since the dialog was opened, nothing is saved.
 
                 Returns:
                     None
                 """
-                for field in airline_fields:
-                    airline[field] = edit_airline_inputs[field].value
-                save_json(airline_file, airlines)
-                load_airlines()
-                ui.notify('Airline updated successfully', type='positive')
-                dialog.close()
+                # The read-only ID and Type are shown as text, and are not saved
+                changes = edited_fields(original, {field: edit_airline_inputs[field].value for field in airline_fields
+                                                    if field not in ['ID', 'Type']})
+                if save_edit(dialog, store.airlines, key, version, changes, f'Airline {q}'):
+                    ui.notify('Airline updated successfully', type='positive')
 
             with ui.row().classes('w-full justify-end'):
                 ui.button('Cancel', on_click=dialog.close).classes(
@@ -613,10 +928,12 @@ def build_agent_view():
             None
         """
         q = flight_edit_search_id.value.strip()
-        flight = next((f for f in flights if str(f.get('Booking_ID', '')).strip() == q), None)
+        flight = store.flights.get(q)
         if not flight:
             ui.notify('Flight not found', type='warning')
             return
+        key, version = flight['Booking_ID'], store.flights.version(flight['Booking_ID'])
+        original = dict(flight)
         edit_flight_inputs.clear()
         with ui.dialog() as dialog, ui.card():
             ui.label(f"Edit Flight for Client ID: {flight.get('Client_ID')}").classes("text-lg font-bold mb-2")
@@ -631,28 +948,27 @@ def build_agent_view():
 
                 Collects updated values from input fields, validates and modifies the corresponding flight record,
                 saves the updated flights list to a JSON file, refreshes the flight table in the UI,
-                displays a success notification, and closes the dialog.
+                displays a success notification, and closes the dialog. If another agent changed
+                or deleted the booking since the dialog was opened, nothing is saved.
 
                 Returns:
                     None
                 """
+                changes = {}
                 for field in flight_fields:
                     value = edit_flight_inputs[field].value
                     if 'ID' in field:
                         try:
-                            flight[field] = int(value)
+                            changes[field] = int(value)
                         except ValueError:
                             ui.notify(f'{field} must be a number', type='warning')
                             return
                     else:
-                        flight[field] = value
+                        changes[field] = value
 
-                #for field in flight_fields:
-                #    flight[field] = edit_flight_inputs[field].value
-                save_json(flight_file, flights)
-                load_flights()
-                ui.notify('Flight updated successfully', type='positive')
-                dialog.close()
+                changes = edited_fields(original, changes)
+                if save_edit(dialog, store.flights, key, version, changes, f'Booking {q}'):
+                    ui.notify('Flight updated successfully', type='positive')
 
             with ui.row().classes('w-full justify-end'):
                 ui.button('Cancel', on_click=dialog.close).classes(
@@ -678,10 +994,12 @@ def build_agent_view():
         #available_flight_fields = ['Flight_ID', 'Airline_ID', 'Date', 'Start City', 'End City']
         q = available_flight_edit_search_id.value.strip()
 
-        flight = next((f for f in available_flights if str(f.get('Flight_ID', '')).strip() == q), None)
+        flight = store.available_flights.get(q)
         if not flight:
             ui.notify('Flight not found', type='warning')
             return
+        key, version = flight['Flight_ID'], store.available_flights.version(flight['Flight_ID'])
+        original = dict(flight)
 
         edit_available_flights_inputs.clear()
         with ui.dialog() as dialog, ui.card():
@@ -698,26 +1016,27 @@ def build_agent_view():
 
                 Collects updated values from input fields, validates and modifies the corresponding flight record,
                 saves the updated flights list to a JSON file, refreshes the available flights table,
-                shows a success notification, and closes the dialog.
+                shows a success notification, and closes the dialog. If another agent changed or
+                deleted the flight since the dialog was opened, nothing is saved.
 
                 Returns:
                     None
                 """
+                changes = {}
                 for field in available_flight_fields:
                     value = edit_available_flights_inputs[field].value
                     if 'ID' in field:
                         try:
-                            flight[field] = int(value)
+                            changes[field] = int(value)
                         except ValueError:
                             ui.notify(f'{field} must be a number', type='warning')
                             return
                     else:
-                        flight[field] = value
+                        changes[field] = value
 
-                save_json(available_flight_file, available_flights)
-                load_available_flights()
-                ui.notify('Available Flight updated successfully', type='positive')
-                dialog.close()
+                changes = edited_fields(original, changes)
+                if save_edit(dialog, store.available_flights, key, version, changes, f'Flight {q}'):
+                    ui.notify('Available Flight updated successfully', type='positive')
 
             with ui.row().classes('w-full justify-end'):
                 ui.button('Cancel', on_click=dialog.close).classes(
@@ -739,7 +1058,7 @@ def build_agent_view():
             None
         """
         q = client_delete_search_id.value.strip()
-        client_to_delete = next((c for c in clients if str(c.get('ID', '')).strip() == q), None)
+        client_to_delete = store.clients.get(q)
 
         if not client_to_delete:
             ui.notify('Client not found', type='warning')
@@ -749,34 +1068,27 @@ def build_agent_view():
             """
            Asynchronously deletes the selected client and all associated flights.
 
-           Removes the client identified by `client_to_delete` from the clients list and
-           deletes all flights linked to that client. Updates the stored JSON files, reloads
-           client and flight data, refreshes related dropdown options, and clears the search input.
-           Displays a success notification and closes the confirmation dialog.
+           Queues the removal of the client identified by `client_to_delete` and all flights
+           linked to that client as a background job, closes the confirmation dialog and clears
+           the search input. The job's progress is shown in the job list; the open tables and
+           dropdowns follow the change. A notification is displayed once the job has finished.
 
            Returns:
                None
            """
-            global clients, flights
-            client_id_to_delete = client_to_delete['ID']
-            clients = [c for c in clients if c['ID'] != client_id_to_delete]
-            flights = [f for f in flights if f.get('Client_ID') != client_id_to_delete]
-
-            save_json(client_file, clients)
-            save_json(flight_file, flights)
-
-            load_clients()
-            load_flights()
-
-            # Update the client dropdown's options.
-            new_client_options = {c['ID']: f"{c['Name']} {int(c['ID']):09d}" for c in clients}
-            client_select.set_options(new_client_options)
-            flight_delete_client_select.set_options(new_client_options)
-
-            ui.notify(f'Client {q} and all associated flights have been deleted.', type='positive')
+            job = submit_cascade(store.clients, client_to_delete['ID'], 'Client_ID', f'Delete client {q}')
             dialog.close()
             client_delete_search_id.value = ''
 
+            await run.io_bound(job_queue.wait, job)
+            if dialog.is_deleted:
+                # The page was closed or reloaded meanwhile; the job list shows the outcome
+                return
+            if job.state == 'done':
+                ui.notify(f'Client {q} and all associated flights have been deleted.', type='positive')
+            else:
+                ui.notify(f'Deleting client {q} was {job.state}.', type='warning')
+
         with ui.dialog() as dialog, ui.card():
             ui.label(f"Are you sure you want to delete client {q} and all their flights?")
             with ui.row().classes('w-full justify-end'):
@@ -799,7 +1111,7 @@ def build_agent_view():
             None
         """
         q = airline_delete_search_id.value.strip()
-        airline_to_delete = next((a for a in airlines if str(a.get('ID', '')).strip() == q), None)
+        airline_to_delete = store.airlines.get(q)
 
         if not airline_to_delete:
             ui.notify('Airline not found', type='warning')
@@ -809,33 +1121,27 @@ def build_agent_view():
             """
             Asynchronously deletes the selected airline and all associated flights.
 
-            Removes the selected airline from the airlines list and deletes all flights
-            linked to that airline. Updates the stored JSON files, reloads airline and flight
-            data, refreshes the airline dropdown options, and clears the input field. A success
-            notification is displayed, and the confirmation dialog is closed.
+            Queues the removal of the selected airline and all flights linked to that airline
+            as a background job, closes the confirmation dialog and clears the input field. The
+            job's progress is shown in the job list; the open tables and dropdowns follow the
+            change. A notification is displayed once the job has finished.
 
             Returns:
                 None
             """
-            global airlines, flights
-            airline_id_to_delete = airline_to_delete['ID']
-            airlines = [a for a in airlines if a['ID'] != airline_id_to_delete]
-            flights = [f for f in flights if f.get('Airline_ID') != airline_id_to_delete]
-
-            save_json(airline_file, airlines)
-            save_json(flight_file, flights)
-
-            load_airlines()
-            load_flights()
-
-            # Update the airline dropdown's options.
-            new_airline_options = {a['ID']: f"{a['Company Name']} {int(a['ID']):09d}" for a in airlines}
-            airline_select.set_options(new_airline_options)
-
-            ui.notify(f'Airline {q} and all associated flights have been deleted.', type='positive')
+            job = submit_cascade(store.airlines, airline_to_delete['ID'], 'Airline_ID', f'Delete airline {q}')
             dialog.close()
             airline_delete_search_id.value = ''
 
+            await run.io_bound(job_queue.wait, job)
+            if dialog.is_deleted:
+                # The page was closed or reloaded meanwhile; the job list shows the outcome
+                return
+            if job.state == 'done':
+                ui.notify(f'Airline {q} and all associated flights have been deleted.', type='positive')
+            else:
+                ui.notify(f'Deleting airline {q} was {job.state}.', type='warning')
+
         with ui.dialog() as dialog, ui.card():
             ui.label(f"Are you sure you want to delete airline {q} and all associated flights?")
             with ui.row().classes('w-full justify-end'):
@@ -857,18 +1163,14 @@ def build_agent_view():
         """
         q = available_flight_delete_search_id.value.strip()
 
-        flight_to_delete = next((f for f in available_flights if str(f.get('Flight_ID', '')).strip() == q), None)
+        flight_to_delete = store.available_flights.get(q)
 
         if not flight_to_delete:
             ui.notify('Flight not found', type='warning')
             return
 
         async def perform_delete():
-            global available_flights
-            available_flights = [f for f in available_flights if f.get('Flight_ID') != int(q)]
-
-            save_json(available_flight_file, available_flights)
-            load_available_flights()
+            await run.io_bound(store.available_flights.delete, [flight_to_delete['Flight_ID']])
 
             ui.notify(f'Flight {q} has been deleted from available flights.', type='positive')
             dialog.close()
@@ -899,26 +1201,23 @@ def build_agent_view():
             """
             Asynchronously deletes the selected flight and updates the UI and data storage.
 
-            Removes the specified flight from the in-memory flights list, saves the updated list
-            to the JSON file, refreshes the main flight table and deletable flights list,
-            and closes the confirmation dialog. A success notification is displayed.
+            Removes the specified flight in a worker thread, refreshes the deletable flights
+            list, and closes the confirmation dialog. A success notification is displayed.
 
             Returns:
                 None
             """
-            flights.remove(flight_to_delete)
-            save_json(flight_file, flights)
+            await run.io_bound(store.flights.delete, [flight_to_delete['Booking_ID']])
             ui.notify('Flight deleted successfully.')
-            # Refresh the main table and the dynamic list in the delete tab
-            load_flights()
+            # Refresh the dynamic list in the delete tab; the bookings table follows the change itself
             update_deletable_flights_list(flight_to_delete['Client_ID'])
             dialog.close()
 
         with ui.dialog() as dialog, ui.card():
-            airline = next((a for a in airlines if a['ID'] == flight_to_delete['Airline_ID']), {})
+            airline_name = store.airlines.lookup(flight_to_delete['Airline_ID'], 'Company Name', 'N/A')
             ui.label(f"Are you sure you want to delete this flight?")
             ui.label(f"To: {flight_to_delete['End City']} on {flight_to_delete['Date']}")
-            ui.label(f"Airline: {airline.get('Company Name', 'N/A')}")
+            ui.label(f"Airline: {airline_name}")
             with ui.row().classes('w-full justify-end'):
                 ui.button('Cancel', on_click=dialog.close).classes(
                                 'border border-black text-black bg-white'
@@ -940,7 +1239,7 @@ def build_agent_view():
         if not client_id:
             return
 
-        client_flights = [f for f in flights if f.get('Client_ID') == client_id]
+        client_flights = store.flights.find('Client_ID', client_id)
 
         with deletable_flights_container:
             if not client_flights:
@@ -950,253 +1249,366 @@ def build_agent_view():
             ui.label(f'Flights for Client {client_id}:').classes('text-md font-bold mt-4')
             with ui.list().props('bordered separator'):
                 for f in client_flights:
-                    airline = next((a for a in airlines if a['ID'] == f['Airline_ID']), {})
+                    airline_name = store.airlines.lookup(f['Airline_ID'], 'Company Name', 'N/A')
                     with ui.item():
                         with ui.item_section():
                             ui.item_label(f"To: {f.get('End City', 'N/A')} on {f.get('Date', 'N/A')}")
-                            ui.item_label(f"Airline: {airline.get('Company Name', 'N/A')}").props('caption')
+                            ui.item_label(f"Airline: {airline_name}").props('caption')
                         with ui.item_section().props('side'):
                             # The f=f in lambda captures the current flight for the on_click event
                             ui.button(icon='delete', on_click=lambda f=f: confirm_delete_single_flight(f),
                                       color='red').props('flat dense')
 
+    # Elements of the tab panels used by the handlers above, created when their panel is first opened
+    client_ops = tab_client_manage = inputs = clients_pager = None
+    client_manage_search_id = client_edit_search_id = client_delete_search_id = None
+    airline_ops = tab_airline_manage = airline_input = airlines_pager = None
+    airline_manage_search_id = airline_edit_search_id = airline_delete_search_id = None
+    flight_ops = tab_flight_manage = flight_select = client_select = flights_pager = None
+    flight_booking_manage_search_id = flight_edit_search_id = deletable_flights_container = None
+    available_flight_ops = airline_select = date_input = start_city_input = end_city_input = None
+    available_flights_pager = flight_manage_search_id = None
+    available_flight_edit_search_id = available_flight_delete_search_id = None
+
+    def build_client_create():
+        nonlocal inputs
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            inputs = {}
+            for field in client_fields:
+                if field not in ['ID', 'Type']:
+                    inp = ui.input(label=field).classes('w-full mb-2')
+                    if field in required_client_fields:
+                        inp.validation = {
+                            'This field is required': lambda value: bool(value and value.strip())}
+                    inputs[field] = inp
+            ui.button('Create Client', on_click=create_client).classes(
+                'w-full border border-black text-black bg-white'
+            )
+
+    def build_client_manage():
+        nonlocal client_manage_search_id, clients_pager
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            client_manage_search_id = ui.input(label='Client ID').classes('w-full mb-2')
+            table_clients = ui.table(
+                columns=[{'name': f, 'label': f, 'field': f, 'sortable': True} for f in client_fields],
+                rows=[], row_key='ID').classes('w-full mb-4')
+            clients_pager = TablePager(table_clients, store, 'clients')
+            ui.input(label='Filter clients').bind_value(table_clients, 'filter').classes('w-full mb-2')
+            ui.button('Search', on_click=load_clients).classes('w-full').classes(
+                'w-full border border-black text-black bg-white'
+            )
+            load_clients()
+
+    def build_client_edit():
+        nonlocal client_edit_search_id
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            client_edit_search_id = ui.input(label='Client ID').classes('w-full mb-2')
+            ui.button('Edit', on_click=edit_clients).classes('w-full').classes(
+                'w-full border border-black text-black bg-white'
+            )
+
+    def build_client_delete():
+        nonlocal client_delete_search_id
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            client_delete_search_id = ui.input(label='Client ID').classes('w-full mb-2')
+            ui.button('Delete Client', on_click=delete_client).classes(
+                'w-full border border-red text-red bg-white'
+            )
+
+    def build_clients():
+        nonlocal client_ops, tab_client_manage
+        with ui.row().classes('w-full justify-center mb-4'):
+            ui.label('Client Records').classes('text-xl')
+        with ui.tabs().classes('w-full') as client_ops:
+            tab_client_create = ui.tab('Create Client')
+            tab_client_manage = ui.tab('View Client')
+            tab_client_edit = ui.tab('Edit Client')
+            tab_client_delete = ui.tab('Delete Client')
+        client_panels = ui.tab_panels(client_ops).classes('w-full')
+        lazy_tab_panel(client_panels, tab_client_create, build_client_create)
+        lazy_tab_panel(client_panels, tab_client_manage, build_client_manage)
+        lazy_tab_panel(client_panels, tab_client_edit, build_client_edit)
+        lazy_tab_panel(client_panels, tab_client_delete, build_client_delete)
+
+    def build_airline_create():
+        nonlocal airline_input
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            airline_input = ui.input(label='Company Name').classes('w-full mb-2')
+            airline_input.validation = {
+                'This field is required': lambda value: bool(value and value.strip())}
+            ui.button('Create Airline', on_click=create_airline).classes('mt-2 w-full').classes(
+                'w-full border border-black text-black bg-white'
+            )
+
+    def build_airline_manage():
+        nonlocal airline_manage_search_id, airlines_pager
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            airline_manage_search_id = ui.input(label='Airline ID').classes('w-full mb-2')
+            table_airlines = ui.table(
+                columns=[{'name': n, 'label': n, 'field': n, 'sortable': True} for n in airline_fields],
+                rows=[], row_key='ID').classes('w-full mb-4')
+            airlines_pager = TablePager(table_airlines, store, 'airlines')
+            ui.input(label='Filter airlines').bind_value(table_airlines, 'filter').classes('w-full mb-2')
+            ui.button('Search', on_click=load_airlines).classes('w-full').classes(
+                'w-full border border-black text-black bg-white'
+            )
+            load_airlines()
+
+    def build_airline_edit():
+        nonlocal airline_edit_search_id
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            airline_edit_search_id = ui.input(label='Airline ID').classes('w-full mb-2')
+            ui.button('Edit', on_click=edit_airlines).classes('w-full').classes(
+                'w-full border border-black text-black bg-white'
+            )
+
+    def build_airline_delete():
+        nonlocal airline_delete_search_id
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            airline_delete_search_id = ui.input(label='Airline ID').classes('w-full mb-2')
+            ui.button('Delete Airline', on_click=delete_airline).classes(
+                'w-full border border-red text-red bg-white'
+            )
+
+    def build_airlines():
+        nonlocal airline_ops, tab_airline_manage
+        with ui.row().classes('w-full justify-center mb-4'):
+            ui.label('Airline Records').classes('text-xl')
+        with ui.tabs().classes('w-full') as airline_ops:
+            tab_airline_create = ui.tab('Create Airline')
+            tab_airline_manage = ui.tab('View Airline')
+            tab_airline_edit = ui.tab('Edit Airline')
+            tab_airline_delete = ui.tab('Delete Airline')
+        airline_panels = ui.tab_panels(airline_ops).classes('w-full')
+        lazy_tab_panel(airline_panels, tab_airline_create, build_airline_create)
+        lazy_tab_panel(airline_panels, tab_airline_manage, build_airline_manage)
+        lazy_tab_panel(airline_panels, tab_airline_edit, build_airline_edit)
+        lazy_tab_panel(airline_panels, tab_airline_delete, build_airline_delete)
+
+    def build_flight_create():
+        nonlocal flight_select, client_select
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            # Container for dynamic flight form fields
+            flight_form_container = ui.column().classes('w-full')
+            flight_form_inputs.clear()
+            def populate_flight_fields(e):
+                flight_form_container.clear()
+                with flight_form_container:
+                    # Create inputs and store in shared dictionary
+                    flight_form_inputs['airline_select'] = ui.select(
+                        {}, label='Airline', clearable=True
+                    ).classes('w-full mb-2')
+                    airline_search = OptionSearch(flight_form_inputs['airline_select'], store, 'airlines', airline_label)
+                    flight_form_inputs['airline_select'].validation = {'This field is required': bool}
+
+                    flight_form_inputs['date_input'] = ui.input(label='Date').props(
+                        'type="datetime-local"').classes('w-full mb-2')
+
+                    flight_form_inputs['start_city'] = ui.input(label='Start City').classes(
+                        'w-full mb-2')
+                    flight_form_inputs['start_city'].validation = {
+                        'This field is required': lambda value: bool(value and value.strip())}
+
+                    flight_form_inputs['end_city'] = ui.input(label='End City').classes('w-full mb-2')
+                    flight_form_inputs['end_city'].validation = {
+                        'This field is required': lambda value: bool(value and value.strip())}
+
+                selected_id = str(e.value)
+
+                selected_flight = store.available_flights.get(selected_id)
+
+                if selected_flight:
+                    flight_form_inputs['date_input'].set_value(selected_flight.get('Date', ''))
+                    flight_form_inputs['start_city'].set_value(selected_flight.get('Start City', ''))
+                    flight_form_inputs['end_city'].set_value(selected_flight.get('End City', ''))
+                    airline_search.set_value(selected_flight.get('Airline_ID'))
+
+            # Initial UI elements
+            flight_select = ui.select(
+                {}, label='Select Flight', on_change=populate_flight_fields, clearable=True
+            ).classes('w-full mb-2')
+            OptionSearch(flight_select, store, 'available_flights', available_flight_label)
+            flight_select.validation = {'This field is required': bool}
+
+            client_select = ui.select({}, label='Client', clearable=True).classes('w-full mb-2')
+            OptionSearch(client_select, store, 'clients', client_label)
+            client_select.validation = {'This field is required': bool}
+
+            ui.button('Create Booking', on_click=create_flight).classes(
+                'mt-2 w-full w-full border border-black text-black bg-white'
+            )
+
+    def build_flight_manage():
+        nonlocal flight_booking_manage_search_id, flights_pager
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            flight_booking_manage_search_id = ui.input(label='Client ID').classes('w-full mb-2')
+            table_flights = ui.table(columns=flight_manage_columns, rows=[], row_key='Booking ID').classes(
+                'w-full mb-4')
+            flights_pager = TablePager(table_flights, store, 'flights')
+            flights_pager.follow_related(store, 'clients', 'Client_ID')
+            flights_pager.follow_related(store, 'airlines', 'Airline_ID')
+            ui.input(label='Filter bookings').bind_value(table_flights, 'filter').classes('w-full mb-2')
+            ui.button('Search', on_click=load_flights).classes(
+                'w-full border border-black text-black bg-white'
+            )
+            load_flights()
+
+    def build_flight_edit():
+        nonlocal flight_edit_search_id
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            flight_edit_search_id = ui.input(label='Booking ID').classes('w-full mb-2')
+            ui.button('Edit', on_click=edit_flights).classes(
+                'w-full border border-black text-black bg-white'
+            )
+
+    def build_flight_delete():
+        nonlocal deletable_flights_container
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            flight_delete_client_select = ui.select(
+                {}, label='Select Client to see their flights', clearable=True,
+                on_change=lambda e: update_deletable_flights_list(e.value)
+            ).classes('w-full mb-2')
+            OptionSearch(flight_delete_client_select, store, 'clients', client_label)
+            deletable_flights_container = ui.column().classes('w-full')
+
+    def build_flights():
+        nonlocal flight_ops, tab_flight_manage
+        with ui.row().classes('w-full justify-center mb-4'):
+            ui.label('Flight Records').classes('text-xl')
+        with ui.tabs().classes('w-full') as flight_ops:
+            tab_flight_create = ui.tab('Create Booking')
+            tab_flight_manage = ui.tab('View Bookings')
+            tab_flight_edit = ui.tab('Edit Bookings')
+            tab_flight_delete = ui.tab('Delete Bookings')
+        flight_panels = ui.tab_panels(flight_ops).classes('w-full')
+        lazy_tab_panel(flight_panels, tab_flight_create, build_flight_create)
+        lazy_tab_panel(flight_panels, tab_flight_manage, build_flight_manage)
+        lazy_tab_panel(flight_panels, tab_flight_edit, build_flight_edit)
+        lazy_tab_panel(flight_panels, tab_flight_delete, build_flight_delete)
+
+    def build_available_flight_create():
+        nonlocal airline_select, date_input, start_city_input, end_city_input
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            airline_select = ui.select({}, label='Airline', clearable=True).classes('w-full mb-2')
+            OptionSearch(airline_select, store, 'airlines', airline_label)
+            airline_select.validation = {'This field is required': bool}
+            default_date = datetime.now().strftime('%Y-%m-%dT%H:%M')
+
+            date_input = ui.input(label='Date', value=default_date).props(
+                'type="datetime-local"').classes('w-full mb-2')
+            date_input.validation = {'This field is required': bool}
+
+            start_city_input = ui.input(label='Start City').classes('w-full mb-2')
+            start_city_input.validation = {
+                'This field is required': lambda value: bool(value and value.strip())}
+
+            end_city_input = ui.input(label='End City').classes('w-full mb-2')
+            end_city_input.validation = {
+                'This field is required': lambda value: bool(value and value.strip())}
+
+            ui.button('Create Flight', on_click=create_available_flight).classes(
+                'mt-2 w-full border border-black text-black bg-white'
+            )
+
+    def build_available_flight_manage():
+        nonlocal flight_manage_search_id, available_flights_pager
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            flight_manage_search_id = ui.input(label='Flight ID').classes('w-full mb-2')
+            table_available_flights = ui.table(
+                columns=[{'name': n, 'label': n, 'field': n, 'sortable': True}
+                         for n in available_flight_fields],
+                rows=[], row_key='Flight_ID').classes('w-full mb-4')
+            available_flights_pager = TablePager(table_available_flights, store, 'available_flights')
+            available_flights_pager.follow_related(store, 'airlines', 'Airline_ID')
+            ui.input(label='Filter flights').bind_value(table_available_flights, 'filter').classes(
+                'w-full mb-2')
+            ui.button('Search', on_click=load_available_flights).classes('w-full').classes(
+                'w-full border border-black text-black bg-white'
+            )
+            load_available_flights()
+
+    def build_available_flight_edit():
+        nonlocal available_flight_edit_search_id
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            available_flight_edit_search_id = ui.input(label='Flight ID').classes('w-full mb-2')
+            ui.button('Edit', on_click=edit_available_flights).classes(
+                'w-full border border-black text-black bg-white'
+            )
+
+    def build_available_flight_delete():
+        nonlocal available_flight_delete_search_id
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            available_flight_delete_search_id = ui.input(label='Flight ID').classes('w-full mb-2')
+            ui.button('Delete Available Flight', on_click=delete_available_flights).classes(
+                'w-full border border-red text-red bg-white'
+            )
+
+    def build_available_flights():
+        nonlocal available_flight_ops
+        with ui.row().classes('w-full justify-center mb-4'):
+            ui.label('Available Flights').classes('text-xl')
+        with ui.tabs().classes('w-full') as available_flight_ops:
+            tab_available_flight_create = ui.tab('Create Available Flight')
+            tab_available_flight_manage = ui.tab('View Available Flight')
+            tab_available_flight_edit = ui.tab('Edit Available Flight')
+            tab_available_flight_delete = ui.tab('Delete Available Flight')
+        available_flight_panels = ui.tab_panels(available_flight_ops).classes('w-full')
+        lazy_tab_panel(available_flight_panels, tab_available_flight_create, build_available_flight_create)
+        lazy_tab_panel(available_flight_panels, tab_available_flight_manage, build_available_flight_manage)
+        lazy_tab_panel(available_flight_panels, tab_available_flight_edit, build_available_flight_edit)
+        lazy_tab_panel(available_flight_panels, tab_available_flight_delete, build_available_flight_delete)
+
+    async def import_file(e):
+        """
+        Save an uploaded file and queue its import into the chosen collection as a background job.
+
+        Returns:
+            None
+        """
+        suffix = Path(e.file.name).suffix.lower()
+        if suffix not in ('.csv', '.jsonl', '.ndjson'):
+            ui.notify('Please choose a CSV or JSON Lines file.', type='warning')
+            return
+        # Saved under its own name, which the errors of the import refer to
+        path = Path(tempfile.mkdtemp(prefix='flyguy-import-')) / Path(e.file.name).name
+        await e.file.save(path)
+        total = await run.io_bound(count_rows, path)
+        name = import_target.value
+        submit_import(name, path, f'Import {e.file.name} into {import_targets[name]}', total, remove=True)
+        ui.notify(f'Importing {e.file.name}, see Background Jobs for the progress')
+
+    import_targets = {'clients': 'Clients', 'airlines': 'Airlines', 'flights': 'Bookings',
+                      'available_flights': 'Available Flights'}
+    import_target = None
+
+    def build_import():
+        nonlocal import_target
+        with ui.row().classes('w-full justify-center mb-4'):
+            ui.label('Bulk Import').classes('text-xl')
+        with ui.card().classes('mx-auto w-full p-4 shadow'):
+            ui.label('Import records from a CSV file with a header line, or from a JSON Lines file. '
+                     'Rows without an ID get a new one. Nothing is imported if any row is invalid.')
+            import_target = ui.select(import_targets, value='clients', label='Import into').classes('w-full mb-2')
+            ui.upload(label='CSV or JSON Lines file', auto_upload=True, on_upload=import_file).props(
+                'accept=".csv,.jsonl,.ndjson"').classes('w-full')
+
+    build_job_list()
+
+    # Only the tabs are built up front; every panel is built the first time it is opened
     with ui.column().classes('w-full'):
         with ui.tabs().classes('w-full') as main_tabs:
             tab_clients = ui.tab('Clients')
             tab_airlines = ui.tab('Airlines')
             tab_flights_bookings = ui.tab('Flights Bookings')
             tab_available_flights = ui.tab('Available Flights')
-        with ui.tab_panels(main_tabs, value=tab_clients).classes('w-full'):
-            with ui.tab_panel(tab_clients):
-                with ui.row().classes('w-full justify-center mb-4'):
-                    ui.label('Client Records').classes('text-xl')
-                with ui.tabs().classes('w-full') as client_ops:
-                    tab_client_create = ui.tab('Create Client')
-                    tab_client_manage = ui.tab('View Client')
-                    tab_client_edit = ui.tab('Edit Client')
-                    tab_client_delete = ui.tab('Delete Client')
-                with ui.tab_panels(client_ops).classes('w-full'):
-                    with ui.tab_panel(tab_client_create):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            inputs = {}
-                            for field in client_fields:
-                                if field not in ['ID', 'Type']:
-                                    inp = ui.input(label=field).classes('w-full mb-2')
-                                    if field in required_client_fields:
-                                        inp.validation = {
-                                            'This field is required': lambda value: bool(value and value.strip())}
-                                    inputs[field] = inp
-                            ui.button('Create Client', on_click=create_client).classes(
-                                'w-full border border-black text-black bg-white'
-                            )
-                    with ui.tab_panel(tab_client_manage):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            client_manage_search_id = ui.input(label='Client ID').classes('w-full mb-2')
-                            table_clients = ui.table(
-                                columns=[{'name': f, 'label': f, 'field': f} for f in client_fields], rows=[],
-                                row_key='ID').classes('w-full mb-4')
-                            ui.button('Search', on_click=load_clients).classes('w-full').classes(
-                                'w-full border border-black text-black bg-white'
-                            )
-                            load_clients()
-                    with ui.tab_panel(tab_client_edit):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            client_edit_search_id = ui.input(label='Client ID').classes('w-full mb-2')
-                            ui.button('Edit', on_click=edit_clients).classes('w-full').classes(
-                                'w-full border border-black text-black bg-white'
-                            )
-                    with ui.tab_panel(tab_client_delete):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            client_delete_search_id = ui.input(label='Client ID').classes('w-full mb-2')
-                            ui.button('Delete Client', on_click=delete_client).classes(
-                                'w-full border border-red text-red bg-white'
-                            )
-
-            with ui.tab_panel(tab_airlines):
-                with ui.row().classes('w-full justify-center mb-4'):
-                    ui.label('Airline Records').classes('text-xl')
-                with ui.tabs().classes('w-full') as airline_ops:
-                    tab_airline_create = ui.tab('Create Airline')
-                    tab_airline_manage = ui.tab('View Airline')
-                    tab_airline_edit = ui.tab('Edit Airline')
-                    tab_airline_delete = ui.tab('Delete Airline')
-                with ui.tab_panels(airline_ops).classes('w-full'):
-                    with ui.tab_panel(tab_airline_create):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            airline_input = ui.input(label='Company Name').classes('w-full mb-2')
-                            airline_input.validation = {
-                                'This field is required': lambda value: bool(value and value.strip())}
-                            ui.button('Create Airline', on_click=create_airline).classes('mt-2 w-full').classes(
-                                'w-full border border-black text-black bg-white'
-                            )
-                    with ui.tab_panel(tab_airline_manage):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            airline_manage_search_id = ui.input(label='Airline ID').classes('w-full mb-2')
-                            table_airlines = ui.table(
-                                columns=[{'name': n, 'label': n, 'field': n} for n in airline_fields], rows=[],
-                                row_key='ID').classes('w-full mb-4')
-                            ui.button('Search', on_click=load_airlines).classes('w-full').classes(
-                                'w-full border border-black text-black bg-white'
-                            )
-                            load_airlines()
-                    with ui.tab_panel(tab_airline_edit):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            airline_edit_search_id = ui.input(label='Airline ID').classes('w-full mb-2')
-                            ui.button('Edit', on_click=edit_airlines).classes('w-full').classes(
-                                'w-full border border-black text-black bg-white'
-                            )
-                    with ui.tab_panel(tab_airline_delete):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            airline_delete_search_id = ui.input(label='Airline ID').classes('w-full mb-2')
-                            ui.button('Delete Airline', on_click=delete_airline).classes(
-                                'w-full border border-red text-red bg-white'
-                            )
-
-            with ui.tab_panel(tab_flights_bookings):
-                with ui.row().classes('w-full justify-center mb-4'):
-                    ui.label('Flight Records').classes('text-xl')
-                with ui.tabs().classes('w-full') as flight_ops:
-                    tab_flight_create = ui.tab('Create Booking')
-                    tab_flight_manage = ui.tab('View Bookings')
-                    tab_flight_edit = ui.tab('Edit Bookings')
-                    tab_flight_delete = ui.tab('Delete Bookings')
-
-                with ui.tab_panels(flight_ops).classes('w-full'):
-                    with ui.tab_panel(tab_flight_create):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            # Container for dynamic flight form fields
-                            flight_form_container = ui.column().classes('w-full')
-                            flight_form_inputs = {}
-                            def populate_flight_fields(e):
-                                flight_form_container.clear()
-                                with flight_form_container:
-                                    # Create inputs and store in shared dictionary
-                                    flight_form_inputs['airline_select'] = ui.select(
-                                        {a['ID']: f"{a['Company Name']} {int(a['ID']):09d}" for a in airlines},
-                                        label='Airline'
-                                    ).props('searchable true clearable').classes('w-full mb-2')
-                                    flight_form_inputs['airline_select'].validation = {'This field is required': bool}
-
-                                    flight_form_inputs['date_input'] = ui.input(label='Date').props(
-                                        'type="datetime-local"').classes('w-full mb-2')
-
-                                    flight_form_inputs['start_city'] = ui.input(label='Start City').classes(
-                                        'w-full mb-2')
-                                    flight_form_inputs['start_city'].validation = {
-                                        'This field is required': lambda value: bool(value and value.strip())}
-
-                                    flight_form_inputs['end_city'] = ui.input(label='End City').classes('w-full mb-2')
-                                    flight_form_inputs['end_city'].validation = {
-                                        'This field is required': lambda value: bool(value and value.strip())}
-
-                                selected_id = str(e.value)
-
-                                selected_flight = next(
-                                    (f for f in available_flights if str(f['Flight_ID']) == selected_id), None
-                                )
-
-                                if selected_flight:
-                                    flight_form_inputs['date_input'].set_value(selected_flight.get('Date', ''))
-                                    flight_form_inputs['start_city'].set_value(selected_flight.get('Start City', ''))
-                                    flight_form_inputs['end_city'].set_value(selected_flight.get('End City', ''))
-                                    flight_form_inputs['airline_select'].value = selected_flight.get('Airline_ID', '')
-
-                            # Initial UI elements
-                            flight_select = ui.select(
-                                {f['Flight_ID']: f"{f['Flight_ID']:09d}" for f in available_flights},
-                                label='Select Flight', on_change=populate_flight_fields
-                            ).props('clearable').classes('w-full mb-2')
-                            flight_select.validation = {'This field is required': bool}
-
-                            client_select = ui.select(
-                                {c['ID']: f"{c['Name']} {int(c['ID']):09d}" for c in clients},
-                                label='Client'
-                            ).props('searchable true clearable').classes('w-full mb-2')
-                            client_select.validation = {'This field is required': bool}
-
-                            ui.button('Create Booking', on_click=create_flight).classes(
-                                'mt-2 w-full w-full border border-black text-black bg-white'
-                            )
+            tab_import = ui.tab('Import')
+        main_panels = ui.tab_panels(main_tabs, value=tab_clients).classes('w-full')
+        lazy_tab_panel(main_panels, tab_clients, build_clients)
+        lazy_tab_panel(main_panels, tab_airlines, build_airlines)
+        lazy_tab_panel(main_panels, tab_flights_bookings, build_flights)
+        lazy_tab_panel(main_panels, tab_available_flights, build_available_flights)
+        lazy_tab_panel(main_panels, tab_import, build_import)
 
-                    with ui.tab_panel(tab_flight_manage):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            flight_booking_manage_search_id = ui.input(label='Client ID').classes('w-full mb-2')
-                            table_flights = ui.table(columns=flight_manage_columns, rows=[], row_key='Client ID').classes(
-                                'w-full mb-4')
-                            ui.button('Search', on_click=load_flights).classes(
-                                'w-full border border-black text-black bg-white'
-                            )
-                            load_flights()
-                    with ui.tab_panel(tab_flight_edit):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            flight_edit_search_id = ui.input(label='Booking ID').classes('w-full mb-2')
-                            ui.button('Edit', on_click=edit_flights).classes(
-                                'w-full border border-black text-black bg-white'
-                            )
-                    with ui.tab_panel(tab_flight_delete):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            flight_delete_client_select = ui.select(
-                                {c['ID']: f"{c['Name']} {int(c['ID']):09d}" for c in clients},
-                                label='Select Client to see their flights',
-                                on_change=lambda e: update_deletable_flights_list(e.value)
-                            ).props('searchable true clearable').classes('w-full mb-2')
-                            deletable_flights_container = ui.column().classes('w-full')
-
-            with ui.tab_panel(tab_available_flights):
-                with ui.row().classes('w-full justify-center mb-4'):
-                    ui.label('Available Flights').classes('text-xl')
-                with ui.tabs().classes('w-full') as available_flight_ops:
-                    tab_available_flight_create = ui.tab('Create Available Flight')
-                    tab_available_flight_manage = ui.tab('View Available Flight')
-                    tab_available_flight_edit = ui.tab('Edit Available Flight')
-                    tab_available_flight_delete = ui.tab('Delete Available Flight')
-                with ui.tab_panels(available_flight_ops).classes('w-full'):
-                    with ui.tab_panel(tab_available_flight_create):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            airline_select = ui.select(
-                                {a['ID']: f"{a['Company Name']} {int(a['ID']):09d}" for a in airlines},
-                                label='Airline'
-                            ).props('searchable true clearable').classes('w-full mb-2')
-                            airline_select.validation = {'This field is required': bool}
-                            default_date = datetime.now().strftime('%Y-%m-%dT%H:%M')
-
-                            date_input = ui.input(label='Date', value=default_date).props(
-                                'type="datetime-local"').classes('w-full mb-2')
-                            date_input.validation = {'This field is required': bool}
-
-                            start_city_input = ui.input(label='Start City').classes('w-full mb-2')
-                            start_city_input.validation = {
-                                'This field is required': lambda value: bool(value and value.strip())}
-
-                            end_city_input = ui.input(label='End City').classes('w-full mb-2')
-                            end_city_input.validation = {
-                                'This field is required': lambda value: bool(value and value.strip())}
-
-                            ui.button('Create Flight', on_click=create_available_flight).classes(
-                                'mt-2 w-full border border-black text-black bg-white'
-                            )
-                    with ui.tab_panel(tab_available_flight_manage):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            flight_manage_search_id = ui.input(label='Flight ID').classes('w-full mb-2')
-                            table_available_flights = ui.table(
-                                columns=[{'name': n, 'label': n, 'field': n} for n in available_flight_fields], rows=[],
-                                row_key='ID').classes('w-full mb-4')
-                            ui.button('Search', on_click=load_available_flights).classes('w-full').classes(
-                                'w-full border border-black text-black bg-white'
-                            )
-                            load_available_flights()
-                    with ui.tab_panel(tab_available_flight_edit):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            available_flight_edit_search_id = ui.input(label='Flight ID').classes('w-full mb-2')
-                            ui.button('Edit', on_click=edit_available_flights).classes(
-                                'w-full border border-black text-black bg-white'
-                            )
-                    with ui.tab_panel(tab_available_flight_delete):
-                        with ui.card().classes('mx-auto w-full p-4 shadow'):
-                            available_flight_delete_search_id = ui.input(label='Flight ID').classes('w-full mb-2')
-                            ui.button('Delete Available Flight', on_click=delete_available_flights).classes(
-                                'w-full border border-red text-red bg-white'
-                            )
 
 def startup() -> None:
     """
@@ -1212,22 +1624,19 @@ def startup() -> None:
         None. The function modifies UI elements to build and display the application interface.
     """
 
-    def perform_flight_search(client_input, airline_input, container, all_clients, all_airlines, all_flights):
+    def perform_flight_search(client_input, airline_input, container):
         """
         Searches for flights matching the selected client and airline IDs, and displays results.
 
-        Retrieves values from the client and airline input fields, filters the list of all flights to find matches,
-        and displays a card for each found flight in the provided UI container. If no matching flights are found,
-        an error card is shown.
+        Retrieves values from the client and airline input fields, looks up the matching flights in the
+        (Client_ID, Airline_ID) index of the flights collection, and displays a card for each found flight
+        in the provided UI container. If no matching flights are found, an error card is shown.
+        The collections are read from the store on every search, so results always reflect the current data.
 
         Args:
             client_input: UI input element containing the selected client ID.
             airline_input: UI input element containing the selected airline ID.
             container: UI container where results (flight cards) will be displayed.
-            all_clients: List of all clients (each as a dictionary with keys like 'ID' and 'Name').
-            all_airlines: List of all airlines (each as a dictionary with keys like 'ID' and 'Company Name').
-            all_flights: List of all flights (each as a dictionary with keys like 'Client_ID', 'Airline_ID',
-                         'Date', 'Start City', 'End City').
 
         Returns:
             None. Results are rendered directly in the provided container.
@@ -1235,11 +1644,8 @@ def startup() -> None:
         client_q = client_input.value
         airline_q = airline_input.value
 
-        # Find ALL matching flights and store them in a list
-        found_flights = [
-            f for f in all_flights
-            if str(f.get('Client_ID')) == str(client_q) and str(f.get('Airline_ID')) == str(airline_q)
-        ]
+        # Find ALL matching flights with a single lookup in the (Client_ID, Airline_ID) index
+        found_flights = store.flights.find(('Client_ID', 'Airline_ID'), (client_q, airline_q))
         # Clear previous results
         container.clear()
 
@@ -1248,15 +1654,15 @@ def startup() -> None:
                 ui.label(f'Found {len(found_flights)} matching flight(s):').classes('text-sm text-gray-600 mb-2')
                 # Loop through each found flight and create a card for it
                 for flight in found_flights:
-                    client = next((c for c in all_clients if c['ID'] == flight['Client_ID']), {})
-                    airline = next((a for a in all_airlines if a['ID'] == flight['Airline_ID']), {})
+                    client_name = store.clients.lookup(flight['Client_ID'], 'Name', 'N/A')
+                    airline_name = store.airlines.lookup(flight['Airline_ID'], 'Company Name', 'N/A')
 
                     with ui.card().classes('w-full p-4 bg-gray-100 mb-4'):
                         ui.label(f'Your flight to {flight.get("End City", "your destination")}').classes(
                             'text-lg font-bold text-gray-700 mb-2')
                         with ui.column().classes('gap-1'):
-                            ui.label(f'Client: {client.get("Name", "N/A")} ({flight.get("Client_ID")})')
-                            ui.label(f'Airline: {airline.get("Company Name", "N/A")} ({flight.get("Airline_ID")})')
+                            ui.label(f'Client: {client_name} ({flight.get("Client_ID")})')
+                            ui.label(f'Airline: {airline_name} ({flight.get("Airline_ID")})')
                             ui.label(f'Date: {flight.get("Date", "N/A")}')
                             ui.label(f'From: {flight.get("Start City", "N/A")}')
                             ui.label(f'To: {flight.get("End City", "N/A")}')
@@ -1266,6 +1672,8 @@ def startup() -> None:
                     ui.label('⚠️ No matching flights found. Please check the details and try again.').classes('text-sm')
 
     agent_dashboard = None
+    agent_view = None
+    agent_view_built = False
 
     def handle_login(username_input, password_input):
         """
@@ -1273,7 +1681,9 @@ def startup() -> None:
 
         If the provided username and password match the expected credentials,
         a success notification is shown, the welcome screen is hidden, and
-        the agent dashboard is displayed. Otherwise, an error notification is shown.
+        the agent dashboard is displayed. The agent view is built on the first
+        successful login only, so visitors of the public flight search never pay
+        for it. Otherwise, an error notification is shown.
 
         Args:
             username_input: UI input element containing the entered username.
@@ -1282,8 +1692,13 @@ def startup() -> None:
         Returns:
             None
         """
+        nonlocal agent_view_built
         if username_input.value == 'admin' and password_input.value == 'admin':
             ui.notify('login successful', type='positive')
+            if not agent_view_built:
+                agent_view_built = True
+                with agent_view:
+                    build_agent_view()
             splitter.set_visibility(False)
             agent_dashboard.set_visibility(True)
         else:
@@ -1329,10 +1744,7 @@ def startup() -> None:
                     ui.button('Search', on_click=lambda: perform_flight_search(
                         client_id_input,
                         airline_id_input,
-                        results_container,
-                        clients,
-                        airlines,
-                        flights
+                        results_container
                     )).classes(
                     'border border-black text-black bg-white hover:bg-gray-100'
                    )
@@ -1341,14 +1753,14 @@ def startup() -> None:
 
     with ui.card().classes('w-full h-screen hidden p-0') as agent_dashboard:
         agent_dashboard.set_visibility(False)
-        with ui.column().classes('w-full items-center gap-4 p-6'):
+        # The agent view is added below the header by handle_login
+        with ui.column().classes('w-full items-center gap-4 p-6') as agent_view:
             with ui.row(wrap=False).classes('w-full justify-between items-center'):
                 ui.label('Agent Dashboard').classes('text-3xl font-bold')
                 ui.button('Logout', on_click=logout).classes(
                     'border border-black text-black bg-white hover:bg-gray-100'
                 )
 
-            build_agent_view()
     # Create a hidden marker for the bound level so it can be captured by the test
     ui.label().bind_text_from(splitter, 'value').classes('splitter-value hidden')
 
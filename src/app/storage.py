@@ -0,0 +1,937 @@
+import gzip
+import json
+import lzma
+import os
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+import jsonlines
+
+from app import config
+from app.records import to_dict
+from app.writer import BackgroundWriter
+
+# Number of entries currently held in each journal, keyed by the snapshot path
+_journal_sizes = {}
+
+# Number of changes made to each collection, and the number that had been made when it was
+# last saved, keyed by the snapshot path; a collection is dirty while the two differ
+_versions = {}
+_saved_versions = {}
+
+# Counters of the snapshot writes performed and avoided, see write_statistics()
+_write_stats = {'writes': 0, 'bytes_written': 0, 'writes_avoided': 0, 'bytes_avoided': 0}
+_stats_lock = threading.Lock()
+
+# Open SQLite connections, keyed by database path, and the lock serialising their use
+_connections = {}
+_sqlite_lock = threading.RLock()
+
+# Record fields stored in their own, indexed SQLite columns
+_sqlite_columns = {'client_id': 'Client_ID', 'airline_id': 'Airline_ID'}
+
+# The running background writer, if any; without one every write is performed immediately
+_writer = None
+
+# Name of the file in the data directory holding the commit record of a running transaction
+transaction_log_name = 'transaction.log'
+
+# Serialises the commits of transactions, which share the transaction log
+_transaction_lock = threading.RLock()
+
+# Leading bytes of compressed JSON files, so a file is loaded whatever format it was saved in
+_compression_magic = {
+    b'\x1f\x8b': gzip,
+    b'\xfd7zXZ\x00': lzma,
+}
+
+
+class ConflictError(Exception):
+    """Raised when a record is saved from a version that has been changed since it was read."""
+
+
+# Helpers to load & save JSON
+def load_json(path, default=list):
+    """
+    Load JSON data from a file.
+
+    If the specified path does not exist, return the result of the `default` callable instead.
+    Files saved in any of the `save_json` formats are detected and loaded transparently.
+
+    Args:
+        path (Path): The path to the JSON file.
+        default (Callable): A callable that returns a default value if the file does not exist.
+                            Defaults to `list`.
+
+    Returns:
+        Any: The parsed JSON data, or the result of `default()` if the file is missing.
+    """
+
+    if not path.exists():
+        return default()
+    content = path.read_bytes()
+    for magic, module in _compression_magic.items():
+        if content.startswith(magic):
+            content = module.decompress(content)
+            break
+    return json.loads(content)
+
+
+def dump_json(data, fmt=None):
+    """
+    Serialize data in one of the supported JSON file formats.
+
+    Args:
+        data (Any): The data to be serialized.
+        fmt (str, optional): 'pretty' (indented), 'compact' (no whitespace), 'gzip' or 'lzma'
+                             (compact and compressed). Defaults to `config.json_format`.
+
+    Returns:
+        bytes: The file content.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    fmt = fmt or config.json_format
+    if fmt == 'pretty':
+        return json.dumps(data, indent=2).encode()
+    content = json.dumps(data, separators=(',', ':')).encode()
+    if fmt == 'compact':
+        return content
+    if fmt == 'gzip':
+        return gzip.compress(content, compresslevel=6, mtime=0)
+    if fmt == 'lzma':
+        return lzma.compress(content, preset=1)
+    raise ValueError(f"Unknown JSON format '{fmt}'")
+
+
+def save_json(path, data, fmt=None):
+    """
+    Save data as a JSON file.
+
+    Ensures that the directory for the given path exists before writing the data. The data is
+    written to a temporary file next to the target, synced to disk and then renamed over the
+    target, so a crash mid-write never leaves a truncated file behind.
+
+    Args:
+        path (Path): The file path where the JSON data will be saved.
+        data (Any): The data to be serialized and saved as JSON.
+        fmt (str, optional): The file format, see `dump_json`. Defaults to `config.json_format`.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = dump_json(data, fmt)
+    temp_path = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return len(content)
+
+
+# Background writer lifecycle
+def start_writer(delay=None):
+    """
+    Start performing full-file writes on a background thread.
+
+    Registered with `app.on_startup`, so handlers return without waiting for the data files to be
+    rewritten. Until the writer is started, and after it is stopped, writes happen immediately.
+
+    Args:
+        delay (float, optional): Seconds to wait for further changes to a file before writing it.
+                                 Defaults to `config.write_delay`.
+
+    Returns:
+        BackgroundWriter: The running writer.
+    """
+    global _writer
+    if _writer is None:
+        _writer = BackgroundWriter(config.write_delay if delay is None else delay)
+    return _writer
+
+
+def flush_writes(path=None):
+    """
+    Perform the pending background writes now.
+
+    Args:
+        path (Path, optional): Only flush the pending write of this data file.
+
+    Returns:
+        None
+    """
+    if _writer is not None:
+        _writer.flush(path)
+
+
+def hold_writes():
+    """
+    Return a context manager that holds back the background writer while it is entered.
+
+    Returns:
+        ContextManager: Pauses the writer, or does nothing if no writer is running.
+    """
+    return _writer.paused() if _writer is not None else nullcontext()
+
+
+def stop_writer():
+    """
+    Flush all pending writes and stop the background writer.
+
+    Called on shutdown, so no change is lost when the server stops.
+
+    Returns:
+        dict | None: The write statistics, see `write_statistics`, or None if no writer was running.
+
+    Raises:
+        Exception: The error of a pending write that failed. The writer is then kept with the
+                   failed writes still queued, so `flush_writes` can retry them.
+    """
+    global _writer
+    if _writer is None:
+        return None
+    _writer.stop()
+    _writer = None
+    return write_statistics()
+
+
+# Helpers for the append-only change journal
+def record_key(value):
+    """
+    Normalise a record ID so that IDs read from JSON (int) and from the UI (str) compare equal.
+
+    Args:
+        value (Any): The raw ID value.
+
+    Returns:
+        str: The ID as a trimmed string.
+    """
+    return str(value).strip()
+
+
+def journal_path(path):
+    """
+    Return the path of the JSON Lines journal that belongs to a JSON snapshot file.
+
+    Args:
+        path (Path): The snapshot JSON file, e.g. `flights.json`.
+
+    Returns:
+        Path: The journal file, e.g. `flights.jsonl`.
+    """
+    return Path(path).with_suffix('.jsonl')
+
+
+def journal_entry(op, record=None, key=None, version=None):
+    """
+    Build a single journal entry.
+
+    Args:
+        op (str): One of 'insert', 'update' or 'delete'.
+        record (dict): The full record after the change. Not needed for 'delete'.
+        key (Any): The ID the record had before the change. Not needed for 'insert'.
+        version (int, optional): For an 'update', the version the record must still have when
+                                 the change is stored, see `_sqlite_write`.
+
+    Returns:
+        dict: The journal entry.
+    """
+    entry = {'op': op}
+    if key is not None:
+        entry['key'] = key
+    if record is not None:
+        entry['record'] = to_dict(record)
+    if version is not None:
+        entry['version'] = version
+    return entry
+
+
+def replay_journal(records, path, key_field):
+    """
+    Apply the entries of a collection's journal on top of its snapshot.
+
+    Replaying is idempotent: inserts of an existing ID replace the record and deletes of a
+    missing ID are ignored. A journal that was already folded into the snapshot, for example
+    after a crash in the middle of a compaction, can therefore be replayed safely.
+
+    Args:
+        records (list): The records loaded from the snapshot.
+        path (Path): The snapshot JSON file of the collection.
+        key_field (str): The primary key field of the records, e.g. 'ID' or 'Booking_ID'.
+
+    Returns:
+        tuple: The updated list of records and the number of journal entries applied.
+    """
+    journal = journal_path(path)
+    if not journal.exists():
+        return records, 0
+
+    by_key = {record_key(r.get(key_field, '')): r for r in records}
+    applied = 0
+    with jsonlines.open(journal) as reader:
+        for entry in reader.iter(skip_invalid=True):
+            op = entry.get('op')
+            record = entry.get('record')
+            if op == 'insert':
+                by_key[record_key(record.get(key_field, ''))] = record
+            elif op == 'update':
+                old_key = record_key(entry.get('key'))
+                new_key = record_key(record.get(key_field, ''))
+                if old_key != new_key:
+                    by_key.pop(old_key, None)
+                by_key[new_key] = record
+            elif op == 'delete':
+                by_key.pop(record_key(entry.get('key')), None)
+            applied += 1
+    return list(by_key.values()), applied
+
+
+def compact_journal(path, records):
+    """
+    Fold a collection's journal into a fresh snapshot.
+
+    The full collection is written to the snapshot first and the journal is removed afterwards,
+    so a crash in between leaves a journal that replays harmlessly over the new snapshot.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+        records (Iterable[dict]): The full, current in-memory collection.
+
+    Returns:
+        None
+    """
+    written = save_json(path, [to_dict(r) for r in records])
+    journal_path(path).unlink(missing_ok=True)
+    _journal_sizes[path] = 0
+    with _stats_lock:
+        _write_stats['writes'] += 1
+        _write_stats['bytes_written'] += written
+
+
+# Dirty tracking of the collections
+def is_dirty(path):
+    """
+    Return whether a collection has changes that have not been saved to its snapshot yet.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+
+    Returns:
+        bool: True if the collection changed since it was last saved.
+    """
+    return _versions.get(path, 0) != _saved_versions.get(path, 0)
+
+
+def skip_write(path):
+    """
+    Count a write of a collection that was avoided because it was not needed.
+
+    In 'json' storage mode every avoided write would have rewritten the whole snapshot, so its
+    current size is counted as bytes avoided. In the other modes only an entry or a row would
+    have been written, so just the write is counted.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+
+    Returns:
+        None
+    """
+    size = path.stat().st_size if config.storage_mode == 'json' and path.exists() else 0
+    with _stats_lock:
+        _write_stats['writes_avoided'] += 1
+        _write_stats['bytes_avoided'] += size
+
+
+def write_statistics():
+    """
+    Return the counters of snapshot writes performed and avoided since the application started.
+
+    Writes are avoided when a change turns out to change nothing, when a cascade has nothing to
+    remove from a collection, when the background writer coalesces a burst of changes and when
+    a collection is saved that has not changed since it was last saved.
+
+    Returns:
+        dict: 'writes', 'bytes_written', 'writes_avoided' and 'bytes_avoided'.
+    """
+    with _stats_lock:
+        return dict(_write_stats)
+
+
+def save_snapshot(path, records):
+    """
+    Write a collection to its snapshot, unless it has not changed since it was last saved.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+        records (Iterable[dict]): The full, current in-memory collection.
+
+    Returns:
+        bool: True if the snapshot was written.
+    """
+    version = _versions.get(path, 0)
+    if path.exists() and _saved_versions.get(path, 0) == version:
+        skip_write(path)
+        return False
+    compact_journal(path, records)
+    _saved_versions[path] = version
+    return True
+
+
+def load_records(path, key_field, snapshot=None, versions=None):
+    """
+    Load a collection from the configured storage backend.
+
+    In 'json' and 'journal' mode the JSON snapshot is loaded and any pending journal entries are
+    replayed. In 'sqlite' mode the records are read from the collection's table; a table that has
+    never been filled is imported from the JSON snapshot first.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+        key_field (str): The primary key field of the records, e.g. 'ID' or 'Booking_ID'.
+        snapshot (list, optional): The already parsed JSON snapshot, e.g. parsed by another
+                                   process. Ignored in 'sqlite' mode.
+        versions (dict, optional): In 'sqlite' mode, filled with the stored version of every
+                                   record that has been updated, see `sqlite_load`.
+
+    Returns:
+        list: The current records of the collection.
+    """
+    if config.storage_mode == 'sqlite':
+        return sqlite_load(path, key_field, versions)
+
+    recover_transaction(Path(path).parent)
+    flush_writes(path)
+    if snapshot is None:
+        snapshot = load_json(path)
+    records, applied = replay_journal(snapshot, path, key_field)
+    _journal_sizes[path] = applied
+    return records
+
+
+def persist_changes(path, key_field, records, changes):
+    """
+    Persist a batch of changes made to an in-memory collection.
+
+    In 'json' storage mode the whole collection is rewritten; while the background writer runs
+    the rewrite is queued, so a burst of changes to a collection is written once. In 'journal'
+    mode each change is appended to the collection's journal as one JSON Lines entry, so the cost
+    of a write depends on the size of the change rather than the size of the collection. Once the
+    journal holds more than `config.journal_compact_threshold` entries it is compacted into a new
+    snapshot.
+    In 'sqlite' mode the changes are applied to the collection's table in one transaction.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+        key_field (str): The primary key field of the records, e.g. 'ID' or 'Booking_ID'.
+        records (Iterable[dict]): The full, already updated, in-memory collection. It is only
+                                  read when the whole collection has to be written out.
+        changes (list): Journal entries describing the change, built with `journal_entry`.
+
+    Returns:
+        None
+    """
+    _versions[path] = _versions.get(path, 0) + 1
+    if config.storage_mode == 'sqlite':
+        sqlite_apply(path, key_field, changes)
+        return
+
+    if config.storage_mode != 'journal':
+        if _writer is None:
+            save_snapshot(path, records)
+        elif _writer.schedule(path, lambda: save_snapshot(path, records)):
+            # The queued write replaced a pending one, which is never performed
+            skip_write(path)
+        return
+
+    append_journal(path, records, changes)
+
+
+def append_journal(path, records, changes, sync=False):
+    """
+    Append journal entries to a collection's journal, compacting it once it is long enough.
+
+    Entries that would make the journal long enough to be compacted, e.g. those of a bulk import,
+    are not appended at all: the snapshot written by the compaction already holds them.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+        records (Iterable[dict]): The full, already updated, in-memory collection.
+        changes (list): Journal entries built with `journal_entry`.
+        sync (bool): Whether to sync the journal to disk before returning, as the compacted
+                     snapshot always is.
+
+    Returns:
+        None
+    """
+    if not changes:
+        return
+    size = _journal_sizes.get(path, 0) + len(changes)
+    if config.storage_mode == 'journal' and size >= config.journal_compact_threshold:
+        compact_journal(path, records)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write_journal(journal_path(path), changes, sync)
+    _journal_sizes[path] = size
+
+
+def _write_journal(journal, changes, sync):
+    """Append journal entries to a journal file, synced to disk if `sync` is set."""
+    with open(journal, 'a', encoding='utf-8') as f:
+        jsonlines.Writer(f).write_all(changes)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# Transactions spanning several collections
+def commit_changes(batches):
+    """
+    Persist the changes of several collections as one atomic unit.
+
+    In 'sqlite' mode the changes of all collections are applied in a single SQLite transaction.
+    In the other modes the changes are first written, as one commit record, to the transaction
+    log of the data directory; this is the commit point. The changes are then appended to the
+    journals of the collections, which are synced to disk before the log is removed: until
+    then the log is the only durable copy of the changes. If the process dies before the log is
+    removed, `recover_transaction` appends the changes again when the data is next loaded, so a
+    transaction is either found in all of its collections or in none. In 'json' mode the snapshots are rewritten from the journals as usual, by the
+    background writer or right away if it is not running.
+
+    A change of a single collection needs no commit record and is persisted with
+    `persist_changes`.
+
+    Args:
+        batches (list): A (path, key_field, records, changes) tuple per collection, with the
+                        arguments of `persist_changes`.
+
+    Returns:
+        None
+    """
+    batches = [batch for batch in batches if batch[3]]
+    if len(batches) <= 1:
+        for batch in batches:
+            persist_changes(*batch)
+        return
+
+    for path, _, _, _ in batches:
+        _versions[path] = _versions.get(path, 0) + 1
+    if config.storage_mode == 'sqlite':
+        sqlite_apply_all([(path, key_field, changes) for path, key_field, _, changes in batches])
+        return
+
+    log = Path(batches[0][0]).parent / transaction_log_name
+    with _transaction_lock:
+        save_json(log, {Path(path).name: changes for path, _, _, changes in batches}, fmt='compact')
+        for path, _, records, changes in batches:
+            append_journal(path, records, changes, sync=True)
+            if config.storage_mode != 'journal':
+                if _writer is None:
+                    save_snapshot(path, records)
+                elif _writer.schedule(path, lambda path=path, records=records: save_snapshot(path, records)):
+                    skip_write(path)
+        log.unlink()
+
+
+def recover_transaction(directory):
+    """
+    Finish a transaction that was committed but not fully applied, e.g. because of a crash.
+
+    The changes of the commit record left in the transaction log are appended to the journals
+    of their collections, where they are replayed on load like any other change, and synced to
+    disk before the log is removed. Appending
+    changes that had already been appended before the crash does no harm, since nothing was
+    appended to those journals after them. A missing log means there is nothing to recover.
+
+    Args:
+        directory (Path): The data directory.
+
+    Returns:
+        list: The names of the snapshot files of the collections the changes were recovered for.
+    """
+    log = Path(directory) / transaction_log_name
+    with _transaction_lock:
+        if not log.exists():
+            return []
+        try:
+            committed = load_json(log)
+        except ValueError:
+            # The log is written to a temporary file and renamed, so this is not a commit record
+            committed = {}
+        for name, changes in committed.items():
+            _write_journal(journal_path(Path(directory) / name), changes, sync=True)
+        log.unlink()
+        return list(committed)
+
+
+# SQLite storage backend
+def sqlite_connection(path):
+    """
+    Return the shared SQLite connection for the database a collection is stored in.
+
+    The database lives next to the JSON files (`config.sqlite_database`) and is opened once
+    in WAL mode, so readers are not blocked while a change is committed.
+
+    Args:
+        path (Path): The snapshot JSON file of any collection in the database.
+
+    Returns:
+        sqlite3.Connection: The open connection.
+    """
+    database = Path(path).parent / config.sqlite_database
+    with _sqlite_lock:
+        connection = _connections.get(database)
+        if connection is None:
+            database.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(database, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS imports (name TEXT PRIMARY KEY)')
+            connection.execute('CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            connection.execute('CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                               'origin INTEGER, name TEXT, key TEXT, created REAL)')
+            _connections[database] = connection
+        return connection
+
+
+def sqlite_table(path):
+    """
+    Return the name of the SQLite table a collection is stored in, creating it if needed.
+
+    Each table stores the record as JSON next to indexed columns for its ID and the
+    'Client_ID' and 'Airline_ID' foreign keys, and the version of the record, which every
+    update increments, see `_sqlite_write`. Rows are returned in insertion order. A table
+    created before the version column existed is given it, with every record at version 0.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection, e.g. `flights.json`.
+
+    Returns:
+        str: The table name, e.g. 'flights'.
+    """
+    table = Path(path).stem
+    connection = sqlite_connection(path)
+    with _sqlite_lock, connection:
+        connection.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (id TEXT PRIMARY KEY, client_id TEXT, '
+                           f'airline_id TEXT, data TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 0)')
+        if 'version' not in {row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')}:
+            connection.execute(f'ALTER TABLE "{table}" ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        for column in _sqlite_columns:
+            connection.execute(f'CREATE INDEX IF NOT EXISTS "{table}_{column}" ON "{table}" ({column})')
+    return table
+
+
+def _sqlite_insert(table):
+    """Return the statement storing a record, given as `_sqlite_row`, as a new row at version 0."""
+    return f'INSERT OR REPLACE INTO "{table}" (id, client_id, airline_id, data) VALUES (?, ?, ?, ?)'
+
+
+def _sqlite_row(record, key_field):
+    """Return the column values a record is stored with."""
+    row = [record_key(record.get(key_field, ''))]
+    for field in _sqlite_columns.values():
+        row.append(record_key(record[field]) if record.get(field) is not None else None)
+    row.append(json.dumps(to_dict(record)))
+    return row
+
+
+def sqlite_import(path, key_field):
+    """
+    Replace the contents of a collection's table with its JSON snapshot and journal.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+        key_field (str): The primary key field of the records.
+
+    Returns:
+        int: The number of imported records.
+    """
+    records, _ = replay_journal(load_json(path), path, key_field)
+    table = sqlite_table(path)
+    connection = sqlite_connection(path)
+    with _sqlite_lock, connection:
+        connection.execute(f'DELETE FROM "{table}"')
+        connection.executemany(_sqlite_insert(table), (_sqlite_row(r, key_field) for r in records))
+        connection.execute('INSERT OR IGNORE INTO imports VALUES (?)', (table,))
+    return len(records)
+
+
+def sqlite_export(path):
+    """
+    Write the contents of a collection's table back to its JSON snapshot.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+
+    Returns:
+        int: The number of exported records.
+    """
+    table = sqlite_table(path)
+    with _sqlite_lock:
+        rows = sqlite_connection(path).execute(f'SELECT data FROM "{table}" ORDER BY rowid').fetchall()
+    compact_journal(path, (json.loads(data) for (data,) in rows))
+    return len(rows)
+
+
+def sqlite_prepare(path, key_field):
+    """
+    Import a collection's JSON snapshot into its SQLite table, unless that already happened.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+        key_field (str): The primary key field of the records.
+
+    Returns:
+        str: The table name.
+    """
+    table = sqlite_table(path)
+    with _sqlite_lock:
+        imported = sqlite_connection(path).execute('SELECT 1 FROM imports WHERE name = ?', (table,)).fetchone()
+    if not imported:
+        sqlite_import(path, key_field)
+    return table
+
+
+def sqlite_load(path, key_field, versions=None):
+    """
+    Load a collection from its SQLite table, importing the JSON snapshot on first use.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+        key_field (str): The primary key field of the records.
+        versions (dict, optional): Filled with the stored version of every record that has been
+                                   updated, by primary key, read together with the records.
+
+    Returns:
+        list: The records of the collection, in insertion order.
+    """
+    table = sqlite_prepare(path, key_field)
+    connection = sqlite_connection(path)
+    with _sqlite_lock:
+        rows = connection.execute(f'SELECT id, data, version FROM "{table}" ORDER BY rowid').fetchall()
+    if versions is not None:
+        versions.update((key, version) for key, _, version in rows if version)
+    return [json.loads(data) for _, data, _ in rows]
+
+
+def sqlite_apply(path, key_field, changes):
+    """
+    Apply journal entries to a collection's SQLite table in a single transaction.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+        key_field (str): The primary key field of the records.
+        changes (list): Journal entries built with `journal_entry`.
+
+    Returns:
+        None
+    """
+    sqlite_apply_all([(path, key_field, changes)])
+
+
+def sqlite_apply_all(batches):
+    """
+    Apply journal entries to the SQLite tables of several collections in a single transaction.
+
+    Args:
+        batches (list): A (path, key_field, changes) tuple per collection, see `sqlite_apply`.
+
+    Returns:
+        None
+    """
+    tables = [sqlite_table(path) for path, _, _ in batches]
+    connection = sqlite_connection(batches[0][0])
+    with _sqlite_lock, connection:
+        for table, (_, key_field, changes) in zip(tables, batches):
+            _sqlite_write(connection, table, key_field, changes)
+
+
+def _sqlite_write(connection, table, key_field, changes):
+    """
+    Apply journal entries to a table within the caller's transaction.
+
+    An update increments the version of the record. An update with a version, see
+    `journal_entry`, is only stored if the record still has that version; otherwise another
+    worker has updated or deleted it since, and `ConflictError` is raised, which rolls the
+    caller's transaction back.
+    """
+    for entry in changes:
+        op = entry['op']
+        if op == 'insert':
+            connection.execute(_sqlite_insert(table), _sqlite_row(entry['record'], key_field))
+        elif op == 'update':
+            # Updating in place keeps the rowid, and with it the position of the record
+            row = _sqlite_row(entry['record'], key_field)
+            key = record_key(entry['key'])
+            checked = 'version' in entry
+            updated = connection.execute(
+                f'UPDATE "{table}" SET id = ?, client_id = ?, airline_id = ?, data = ?, version = version + 1 '
+                f'WHERE id = ?{" AND version = ?" if checked else ""}',
+                row + [key] + ([entry['version']] if checked else [])).rowcount
+            if updated:
+                continue
+            if checked:
+                raise ConflictError(f'{key_field} {key} was changed since version {entry["version"]}')
+            connection.execute(_sqlite_insert(table), row)
+        elif op == 'delete':
+            connection.execute(f'DELETE FROM "{table}" WHERE id = ?', (record_key(entry['key']),))
+    if config.workers > 1:
+        # Tell the other workers which records changed, in the same transaction as the change
+        now = time.time()
+        connection.executemany('INSERT INTO changes (origin, name, key, created) VALUES (?, ?, ?, ?)',
+                               ((os.getpid(), table, key, now) for key in _changed_keys(changes, key_field)))
+
+
+def _changed_keys(changes, key_field):
+    """Yield the primary keys touched by journal entries; an update that changes the ID touches two."""
+    for entry in changes:
+        if 'key' in entry:
+            yield record_key(entry['key'])
+        if 'record' in entry:
+            key = record_key(entry['record'].get(key_field, ''))
+            if 'key' not in entry or key != record_key(entry['key']):
+                yield key
+
+
+def sqlite_fetch(path, keys, versions=None):
+    """
+    Read the stored version of some records of a collection.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+        keys (Iterable[str]): The primary keys of the records.
+        versions (dict, optional): Filled with the version number of every record found.
+
+    Returns:
+        dict: The record stored under each key, or None if there is none.
+    """
+    table = sqlite_table(path)
+    connection = sqlite_connection(path)
+    found = dict.fromkeys(record_key(k) for k in keys)
+    keys = list(found)
+    with _sqlite_lock:
+        # Stay below SQLite's limit on the number of parameters of a statement
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = connection.execute(f'SELECT id, data, version FROM "{table}" '
+                                      f'WHERE id IN ({", ".join("?" * len(chunk))})', chunk).fetchall()
+            for key, data, version in rows:
+                found[key] = json.loads(data)
+                if versions is not None:
+                    versions[key] = version
+    return found
+
+
+def sqlite_next_id(path, start=0, count=1):
+    """
+    Allocate the next IDs of a collection from a sequence shared by every process using the database.
+
+    Args:
+        path (Path): The snapshot JSON file of the collection.
+        start (int): The highest ID known to be in use; the sequence resumes after it if it is behind.
+        count (int): The number of consecutive IDs to allocate.
+
+    Returns:
+        int: The last allocated ID.
+    """
+    name = sqlite_table(path)
+    connection = sqlite_connection(path)
+    with _sqlite_lock, connection:
+        # The upsert takes the write lock, so no other process can allocate the same IDs
+        connection.execute('INSERT INTO sequences VALUES (?, ?) '
+                           'ON CONFLICT (name) DO UPDATE SET value = max(value, ?) + ?',
+                           (name, start + count, start, count))
+        return connection.execute('SELECT value FROM sequences WHERE name = ?', (name,)).fetchone()[0]
+
+
+def sqlite_change_position(path):
+    """
+    Return the sequence number of the last change recorded in the database.
+
+    Args:
+        path (Path): The snapshot JSON file of any collection in the database.
+
+    Returns:
+        int: The sequence number, 0 if no change was recorded yet.
+    """
+    connection = sqlite_connection(path)
+    with _sqlite_lock:
+        last = connection.execute('SELECT max(seq) FROM changes').fetchone()[0]
+        if last is None:
+            # Every change was forgotten; their sequence numbers are not handed out again
+            row = connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+            last = row[0] if row else 0
+        return last
+
+
+def sqlite_changes(path, after=0, own=False):
+    """
+    Return the changes other processes recorded in the database after a given one.
+
+    Args:
+        path (Path): The snapshot JSON file of any collection in the database.
+        after (int): The sequence number of the last change already seen.
+        own (bool): Whether to return the changes of this process too.
+
+    Returns:
+        tuple: The changed primary keys grouped by table name, and the sequence number of the
+               last recorded change.
+    """
+    with _sqlite_lock:
+        rows = sqlite_connection(path).execute(
+            'SELECT seq, origin, name, key FROM changes WHERE seq > ? ORDER BY seq', (after,)).fetchall()
+    keys = {}
+    for seq, origin, name, key in rows:
+        after = seq
+        if own or origin != os.getpid():
+            keys.setdefault(name, {})[key] = None
+    return {name: list(names) for name, names in keys.items()}, after
+
+
+def sqlite_changes_missed(path, after):
+    """
+    Tell whether changes recorded after a given one were forgotten before they were read.
+
+    Changes are forgotten oldest first by `sqlite_prune_changes`, and their sequence numbers are
+    never reused, so a change was missed if the oldest one kept, or the next one to be recorded,
+    comes later than the one following `after`.
+
+    Args:
+        path (Path): The snapshot JSON file of any collection in the database.
+        after (int): The sequence number of the last change already seen.
+
+    Returns:
+        bool: True if some of the changes following `after` are no longer recorded.
+    """
+    connection = sqlite_connection(path)
+    with _sqlite_lock:
+        oldest = connection.execute('SELECT min(seq) FROM changes').fetchone()[0]
+        if oldest is None:
+            last = connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+            oldest = (last[0] if last else 0) + 1
+    return oldest > after + 1
+
+
+def sqlite_prune_changes(path, age):
+    """
+    Forget the recorded changes that are older than a number of seconds.
+
+    Args:
+        path (Path): The snapshot JSON file of any collection in the database.
+        age (float): The age in seconds after which a change is forgotten.
+
+    Returns:
+        int: The number of forgotten changes.
+    """
+    connection = sqlite_connection(path)
+    with _sqlite_lock, connection:
+        return connection.execute('DELETE FROM changes WHERE created < ?', (time.time() - age,)).rowcount
@@ -0,0 +1,1035 @@
+import asyncio
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import islice
+
+from app import config
+from app.storage import (ConflictError, load_json, load_records, persist_changes, journal_entry, record_key,
+                         skip_write, sqlite_fetch, sqlite_next_id, commit_changes, hold_writes)
+
+# The transaction running on the current thread, see `Transaction`
+_local = threading.local()
+
+
+def index_value(record, fields):
+    """
+    Return the value a record is filed under in a secondary index.
+
+    Args:
+        record (dict): The record.
+        fields (str | tuple): The indexed field, or a tuple of fields for a composite index.
+
+    Returns:
+        str | tuple: The normalised field value, or a tuple of them for a composite index.
+    """
+    if isinstance(fields, tuple):
+        return tuple(record_key(record.get(field, '')) for field in fields)
+    return record_key(record.get(fields, ''))
+
+
+def search_words(record, fields):
+    """
+    Return the words a record is found by with `Collection.search`.
+
+    Args:
+        record (dict): The record.
+        fields (tuple): The searchable fields.
+
+    Returns:
+        set: The distinct words of the fields, in lower case.
+    """
+    return {word for field in fields for word in str(record.get(field) or '').lower().split()}
+
+
+class Sequence:
+    """
+    A persisted, monotonically increasing ID sequence.
+
+    The last allocated ID is stored in a small file next to the collection's JSON file, so
+    allocating an ID costs O(1) instead of a scan for the current maximum, and IDs of deleted
+    records are never handed out again. Allocation is guarded by a lock, so concurrent callers
+    always receive distinct IDs. When several workers share an SQLite database, IDs are allocated
+    from a sequence in the database instead, so the workers never hand out the same ID.
+    """
+
+    def __init__(self, path, start=0):
+        """
+        Args:
+            path (Path): The file the last allocated ID is stored in.
+            start (int): The highest ID known to be in use. The sequence resumes after whichever
+                         is higher, this or the stored value, so a missing or stale sequence
+                         file never causes an ID to be reused.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            stored = int(path.read_text())
+        except (FileNotFoundError, ValueError):
+            stored = 0
+        self.value = max(stored, start)
+
+    def next(self):
+        """
+        Allocate the next ID and persist it before handing it out.
+
+        Returns:
+            int: The allocated ID.
+        """
+        return self.reserve()[0]
+
+    def reserve(self, count=1, start=0):
+        """
+        Allocate a block of consecutive IDs, persisting the sequence once for the whole block.
+
+        Args:
+            count (int): The number of IDs to allocate; 0 only moves the sequence past `start`.
+            start (int): An ID that is about to be used, e.g. one given by an import; the block
+                         starts after it if the sequence is behind.
+
+        Returns:
+            range: The allocated IDs.
+        """
+        with self._lock:
+            if config.workers > 1 and config.storage_mode == 'sqlite':
+                self.value = sqlite_next_id(self.path.with_suffix('.json'), max(self.value, start), count)
+                return range(self.value - count + 1, self.value + 1)
+            first = max(self.value, start) + 1
+            self.value = first + count - 1
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(str(self.value))
+            return range(first, self.value + 1)
+
+
+class Collection:
+    """
+    An in-memory collection of records that is kept in sync with its JSON file.
+
+    Records are dicts, or compact `Record` objects when a record type is given, kept in
+    insertion order and indexed by their primary key, so
+    finding a record by ID is a single dict lookup instead of a scan over every record.
+    Optional secondary indexes map the value of another field, such as a booking's 'Client_ID',
+    to the records holding that value, so `find` costs O(matches) instead of O(records).
+    A secondary index can also be composite, e.g. ('Client_ID', 'Airline_ID'), in which case
+    it is looked up with a tuple of values. The words of searchable fields, such as a client's
+    'Name', are indexed too, so `search` finds records by the start of their words without a scan.
+    All changes go through `insert`, `update` and `delete`, which keep every index up to date
+    and persist the change with `persist_changes`.
+
+    New IDs are allocated with `next_id` from a persisted `Sequence`. Changes are serialised
+    with a lock, so records can be created from several threads at once.
+
+    Every update gives the record a new `version`. An edit passes the version it started from
+    to `update`, which refuses the change with a `ConflictError` if the record was changed in
+    the meantime, so concurrent edits of the same record cannot silently overwrite each other,
+    also not edits made by different workers sharing the SQLite database, which stores the
+    versions. Versions are only kept for records that have been updated; the others are at version 0.
+
+    Iterating over a collection yields its records, so read-only code can treat it like the
+    list it replaces.
+
+    Listeners registered with `subscribe` are told about every insert, update and delete once
+    it has been persisted, so views of the collection can apply the change instead of
+    reloading the whole collection. Changes made by other worker processes sharing the SQLite
+    database are applied with `refresh`, which tells the listeners about them in the same way.
+
+    A collection created without records is loaded from storage on first access (or by an
+    explicit `ensure_loaded`), so creating one costs nothing regardless of the dataset size.
+    """
+
+    def __init__(self, path, key_field, records=None, indexes=(), record_type=None, search_fields=()):
+        """
+        Args:
+            path (Path): The JSON file the collection is persisted to.
+            key_field (str): The primary key field of the records, e.g. 'ID' or 'Booking_ID'.
+            records (Iterable[dict] | None): The initial records, or None to load them from
+                                             storage on first access.
+            indexes (Iterable[str | tuple]): Fields to maintain a secondary index for, e.g. 'Client_ID'
+                                             or ('Client_ID', 'Airline_ID').
+            record_type (type, optional): A `Record` type the records are stored as, e.g.
+                                          `Booking`. By default they are kept as plain dicts.
+            search_fields (Iterable[str]): Fields whose words are indexed for `search`, e.g. 'Name'.
+        """
+        self.path = path
+        self.key_field = key_field
+        self.record_type = record_type
+        self.index_fields = tuple(indexes)
+        self.search_fields = tuple(search_fields)
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._listeners = []
+        if records is not None:
+            self._build(records)
+
+    @classmethod
+    def load(cls, path, key_field, indexes=(), record_type=None, search_fields=()):
+        """
+        Load a collection from its JSON file, including any pending journal entries.
+
+        Args:
+            path (Path): The JSON file the collection is persisted to.
+            key_field (str): The primary key field of the records.
+            indexes (Iterable[str | tuple]): Fields to maintain a secondary index for.
+            record_type (type, optional): A `Record` type the records are stored as.
+            search_fields (Iterable[str]): Fields whose words are indexed for `search`.
+
+        Returns:
+            Collection: The loaded collection.
+        """
+        return cls(path, key_field, indexes=indexes, record_type=record_type,
+                   search_fields=search_fields).ensure_loaded()
+
+    def ensure_loaded(self, snapshot=None):
+        """
+        Load the records from storage if that has not happened yet.
+
+        Args:
+            snapshot (list, optional): The already parsed JSON snapshot of the collection.
+
+        Returns:
+            Collection: The collection itself.
+        """
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    versions = {}
+                    self._build(load_records(self.path, self.key_field, snapshot, versions), versions)
+        return self
+
+    def _build(self, records, versions=None):
+        """Build the primary key index, the secondary indexes and the ID sequence, with the stored versions if any."""
+        if self.record_type is not None:
+            records = map(self.record_type.from_dict, records)
+        self.by_key = {record_key(r.get(self.key_field, '')): r for r in records}
+        # field -> field value -> primary key -> record
+        self.indexes = {field: {} for field in self.index_fields}
+        # word of a searchable field -> primary key -> record, and the words in sorted order,
+        # which are sorted once after the records are indexed
+        self.words = {}
+        self.sorted_words = None
+        for key, record in self.by_key.items():
+            self._index_add(key, record)
+        self.sorted_words = sorted(self.words)
+        self.sequence = Sequence(self.path.with_suffix('.seq'),
+                                 start=max((int(k) for k in self.by_key if k.isdigit()), default=0))
+        # primary key -> version, the number of updates, for the records that have been updated;
+        # in 'sqlite' mode it is the version stored in the database, see `update`
+        self.versions = dict(versions or {})
+        self.loaded = True
+
+    def _index_add(self, key, record, fields=None):
+        """Add a record to the secondary indexes of the given fields, or to every index and the word index."""
+        for field in self.indexes if fields is None else fields:
+            self.indexes[field].setdefault(index_value(record, field), {})[key] = record
+        if fields is None and self.search_fields:
+            self._words_add(key, record, search_words(record, self.search_fields))
+
+    def _index_remove(self, key, record, fields=None):
+        """Remove a record from the secondary indexes of the given fields, or from every index and the word index."""
+        for field in self.indexes if fields is None else fields:
+            value = index_value(record, field)
+            bucket = self.indexes[field].get(value)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self.indexes[field][value]
+        if fields is None and self.search_fields:
+            self._words_remove(key, search_words(record, self.search_fields))
+
+    def _words_add(self, key, record, words):
+        """File a record under some of its words in the word index."""
+        for word in words:
+            bucket = self.words.get(word)
+            if bucket is None:
+                bucket = self.words[word] = {}
+                if self.sorted_words is not None:
+                    bisect.insort(self.sorted_words, word)
+            bucket[key] = record
+
+    def _words_remove(self, key, words):
+        """Remove a record from the buckets of some of its words in the word index."""
+        for word in words:
+            bucket = self.words.get(word)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self.words[word]
+                    del self.sorted_words[bisect.bisect_left(self.sorted_words, word)]
+
+    def __iter__(self):
+        # Iterate over a copy, so the background writer can save the collection while it changes
+        self.ensure_loaded()
+        with self._lock:
+            return iter(list(self.by_key.values()))
+
+    def __getitem__(self, index):
+        """
+        Return a slice of the records in insertion order, like slicing the list it replaces.
+
+        Only the records up to the end of the slice are visited, so the first pages of a large
+        collection are cheap to read.
+
+        Args:
+            index (slice): The slice, e.g. `collection[20:30]`. Steps are not supported.
+
+        Returns:
+            list: The records in the slice.
+        """
+        if not isinstance(index, slice) or index.step not in (None, 1):
+            raise TypeError('Collections only support slices without a step; use get() to find a record by ID')
+        self.ensure_loaded()
+        with self._lock:
+            start, stop, _ = index.indices(len(self.by_key))
+            return list(islice(self.by_key.values(), start, stop))
+
+    def __len__(self):
+        self.ensure_loaded()
+        return len(self.by_key)
+
+    def get(self, key):
+        """
+        Find a record by its primary key.
+
+        Args:
+            key (Any): The ID to look up. Integers and (untrimmed) strings are both accepted.
+
+        Returns:
+            dict | None: The record, or None if no record has that ID.
+        """
+        self.ensure_loaded()
+        return self.by_key.get(record_key(key))
+
+    def lookup(self, key, field, default=''):
+        """
+        Resolve one field of the record with the given ID, e.g. the client name of a booking.
+
+        This is the join used to show related records by name: a single dict lookup instead
+        of a scan over the related collection for every row.
+
+        Args:
+            key (Any): The ID of the related record.
+            field (str): The field to return, e.g. 'Name' or 'Company Name'.
+            default (Any): The value to return if the record or field does not exist.
+
+        Returns:
+            Any: The field value, or `default`.
+        """
+        self.ensure_loaded()
+        record = self.by_key.get(record_key(key))
+        if record is None:
+            return default
+        return record.get(field, default)
+
+    def find(self, field, value):
+        """
+        Find all records whose indexed field has the given value.
+
+        Args:
+            field (str | tuple): A field, or tuple of fields, the collection maintains an index for.
+            value (Any): The value to look up, or a tuple of values for a composite index.
+                         Integers and (untrimmed) strings are both accepted.
+
+        Returns:
+            list: The matching records, in the order they were indexed.
+        """
+        self.ensure_loaded()
+        if isinstance(field, tuple):
+            value = tuple(record_key(v) for v in value)
+        else:
+            value = record_key(value)
+        return list(self.indexes[field].get(value, {}).values())
+
+    def reloaded(self):
+        """
+        Load a new collection with the same file, indexes and record type from storage.
+
+        Returns:
+            Collection: The loaded collection; this one is left as it is.
+        """
+        return Collection.load(self.path, self.key_field, indexes=self.index_fields, record_type=self.record_type,
+                               search_fields=self.search_fields)
+
+    def search(self, text, limit):
+        """
+        Find records with a word starting with every word of a text, ignoring case.
+
+        For example 'ann sm' finds a client named 'Ann Smith'. The candidates are the records
+        filed under the indexed words starting with the most selective word of the text, found
+        by bisecting the sorted words; the other words of the text are checked on those
+        candidates only. The cost grows with the number of candidates read, at most the
+        records filed under that word, not with the size of the collection.
+
+        Args:
+            text (str): The search text.
+            limit (int): The maximum number of records returned.
+
+        Returns:
+            list: The matching records, ordered by the word they were found under.
+        """
+        terms = text.lower().split()
+        if not terms or not self.search_fields:
+            return []
+        self.ensure_loaded()
+        with self._lock:
+            ranges = {}
+            for term in terms:
+                start = bisect.bisect_left(self.sorted_words, term)
+                ranges[term] = (start, bisect.bisect_left(self.sorted_words, term + '\U0010ffff', start))
+
+            def candidates(term):
+                # Sizes are only added up for a few words, more words make a term unselective anyway
+                start, end = ranges[term]
+                if end - start > 64:
+                    return (1, end - start)
+                return (0, sum(len(self.words[word]) for word in self.sorted_words[start:end]))
+
+            term = min(ranges, key=candidates)
+            others = [other for other in ranges if other != term]
+            found = {}
+            start, end = ranges[term]
+            for i in range(start, end):
+                for key, record in self.words[self.sorted_words[i]].items():
+                    if key in found:
+                        continue
+                    if others:
+                        words = search_words(record, self.search_fields)
+                        if not all(any(word.startswith(other) for word in words) for other in others):
+                            continue
+                    found[key] = record
+                    if len(found) >= limit:
+                        return list(found.values())
+            return list(found.values())
+
+    def next_id(self):
+        """
+        Allocate a new, unique ID for a record of this collection.
+
+        Returns:
+            int: The allocated ID.
+        """
+        self.ensure_loaded()
+        return self.sequence.next()
+
+    def reserve_ids(self, count, start=0):
+        """
+        Allocate a block of new, unique IDs for records of this collection, see `Sequence.reserve`.
+
+        Args:
+            count (int): The number of IDs to allocate.
+            start (int): An ID that is about to be used; the block starts after it.
+
+        Returns:
+            range: The allocated IDs.
+        """
+        self.ensure_loaded()
+        return self.sequence.reserve(count, start)
+
+    def insert(self, record):
+        """
+        Add a new record and persist it.
+
+        Args:
+            record (dict): The record to add. Its primary key must not be in use yet.
+
+        Raises:
+            ValueError: If a record with the same ID already exists.
+        """
+        key = record_key(record.get(self.key_field, ''))
+        self.ensure_loaded()
+        with self._lock:
+            if key in self.by_key:
+                raise ValueError(f'{self.key_field} {key} already exists')
+            if self.record_type is not None:
+                record = self.record_type.from_dict(record)
+            transaction = Transaction.running(self)
+            if transaction is not None:
+                transaction.touch(self, key)
+            self.by_key[key] = record
+            self._index_add(key, record)
+            self._persist(transaction, [journal_entry('insert', record)])
+        self._publish(transaction, 'insert', [record], [key])
+
+    def insert_many(self, records):
+        """
+        Add many new records and persist them with a single write.
+
+        Either all records are added or, if any of their primary keys is in use, none.
+
+        Args:
+            records (list[dict]): The records to add. Their primary keys must not be in use yet.
+
+        Returns:
+            int: The number of records added.
+
+        Raises:
+            ValueError: If a record's ID already exists or appears twice among the records.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            keys = [record_key(record.get(self.key_field, '')) for record in records]
+            seen = set()
+            for key in keys:
+                if key in self.by_key or key in seen:
+                    raise ValueError(f'{self.key_field} {key} already exists')
+                seen.add(key)
+            if self.record_type is not None:
+                records = [self.record_type.from_dict(record) for record in records]
+            transaction = Transaction.running(self)
+            # New words are sorted into the word index once, instead of one insertion per word
+            sorted_words, self.sorted_words = self.sorted_words, None
+            words = len(self.words)
+            try:
+                for key, record in zip(keys, records):
+                    if transaction is not None:
+                        transaction.touch(self, key)
+                    self.by_key[key] = record
+                    self._index_add(key, record)
+            finally:
+                if len(self.words) > words:
+                    # The new words are the last ones added to the dict
+                    sorted_words = sorted(sorted_words + list(islice(reversed(self.words), len(self.words) - words)))
+                self.sorted_words = sorted_words
+            if records:
+                self._persist(transaction, [journal_entry('insert', record) for record in records])
+        if records:
+            self._publish(transaction, 'insert', records, keys)
+        return len(records)
+
+    def version(self, key):
+        """
+        Return the current version of a record, to be passed to `update` when saving an edit.
+
+        Args:
+            key (Any): The ID of the record.
+
+        Returns:
+            int: The version, counting the updates of the record; 0 if it has never been updated.
+        """
+        self.ensure_loaded()
+        return self.versions.get(record_key(key), 0)
+
+    def update(self, key, changes, version=None):
+        """
+        Apply changes to an existing record and persist it.
+
+        The record keeps its position in the collection, even if its ID is changed. If the
+        changes leave the record as it is, nothing is written.
+
+        In 'sqlite' mode, several workers share the stored records, and the version is checked
+        once more when the change is stored: a worker that has not yet applied another worker's
+        update of the record, see `refresh`, is refused as well, and its change is undone.
+
+        Args:
+            key (Any): The current ID of the record.
+            changes (dict): The fields to overwrite.
+            version (int, optional): The version the changes were made to, as returned by
+                                     `version` before the record was read. If the record has
+                                     been updated since, the changes are refused.
+
+        Returns:
+            dict: The updated record.
+
+        Raises:
+            KeyError: If no record has the given ID, e.g. because it was deleted.
+            ConflictError: If `version` is given and the record has a different version.
+            ValueError: If the ID is changed to one that is already in use.
+        """
+        if (version is not None and config.storage_mode == 'sqlite'
+                and getattr(_local, 'transaction', None) is None):
+            # Storing the change may still find a newer version, which must undo it in memory
+            with Transaction(self):
+                return self.update(key, changes, version)
+
+        old_key = record_key(key)
+        self.ensure_loaded()
+        with self._lock:
+            record = self.by_key[old_key]
+            if version is not None and self.versions.get(old_key, 0) != version:
+                raise ConflictError(f'{self.key_field} {old_key} was changed since version {version}')
+            new_key = record_key(changes.get(self.key_field, record.get(self.key_field, '')))
+            if new_key != old_key and new_key in self.by_key:
+                raise ValueError(f'{self.key_field} {new_key} already exists')
+
+            if all(field in record and record[field] == value for field, value in changes.items()):
+                skip_write(self.path)
+                return record
+
+            transaction = Transaction.running(self)
+            if transaction is not None:
+                transaction.touch(self, old_key, copy=True, reorder=new_key != old_key)
+                transaction.touch(self, new_key)
+            old_id = record.get(self.key_field)
+            old_values = {field: index_value(record, field) for field in self.indexes}
+            old_words = search_words(record, self.search_fields)
+            record.update(changes)
+            if new_key != old_key:
+                # Re-keying is rare, so rebuilding the index to preserve the order is acceptable
+                self.by_key = {(new_key if k == old_key else k): r for k, r in self.by_key.items()}
+
+            # Only move the record between buckets of the secondary indexes that actually changed
+            moved = [field for field, value in old_values.items()
+                     if new_key != old_key or value != index_value(record, field)]
+            for field in moved:
+                bucket = self.indexes[field][old_values[field]]
+                del bucket[old_key]
+                if not bucket:
+                    del self.indexes[field][old_values[field]]
+            self._index_add(new_key, record, moved)
+            new_words = search_words(record, self.search_fields)
+            if new_key != old_key:
+                self._words_remove(old_key, old_words)
+                self._words_add(new_key, record, new_words)
+            else:
+                self._words_remove(old_key, old_words - new_words)
+                self._words_add(new_key, record, new_words - old_words)
+            self.versions[new_key] = self.versions.pop(old_key, 0) + 1
+            self._persist(transaction, [journal_entry('update', record, key=old_id, version=version)])
+        self._publish(transaction, 'update', [record], [old_key])
+        return record
+
+    def delete(self, keys):
+        """
+        Remove one or more records and persist the removal as a single write.
+
+        IDs that do not exist are ignored. If no record is removed, nothing is written, so a
+        cascade that finds nothing to remove does not rewrite the collection.
+
+        Args:
+            keys (Iterable[Any]): The IDs of the records to remove.
+
+        Returns:
+            list: The removed records.
+        """
+        removed = []
+        removed_keys = []
+        self.ensure_loaded()
+        with self._lock:
+            transaction = Transaction.running(self)
+            for key in keys:
+                key = record_key(key)
+                record = self.by_key.get(key)
+                if record is None:
+                    continue
+                if transaction is not None:
+                    transaction.touch(self, key, reorder=True)
+                del self.by_key[key]
+                self._index_remove(key, record)
+                self.versions.pop(key, None)
+                removed.append(record)
+                removed_keys.append(key)
+            if removed:
+                self._persist(transaction, [journal_entry('delete', key=r.get(self.key_field)) for r in removed])
+            else:
+                skip_write(self.path)
+        if removed:
+            self._publish(transaction, 'delete', removed, removed_keys)
+        return removed
+
+    def refresh(self, keys):
+        """
+        Bring records changed by another process up to date with their stored version.
+
+        Only the given records are read from storage, and only their entries in the indexes are
+        touched: records missing from storage are removed, new ones are appended and changed
+        ones are updated in place, and take the stored version. Nothing is written, and listeners
+        are told about the changes like about local ones. Only the 'sqlite' storage mode can be
+        refreshed.
+
+        Args:
+            keys (Iterable[Any]): The IDs of the changed records.
+
+        Returns:
+            int: The number of records that were inserted, updated or removed.
+        """
+        versions = {}
+        stored = sqlite_fetch(self.path, keys, versions)
+        changes = {'insert': ([], []), 'update': ([], []), 'delete': ([], [])}
+        self.ensure_loaded()
+        with self._lock:
+            for key, data in stored.items():
+                record = self.by_key.get(key)
+                if data is None:
+                    if record is None:
+                        continue
+                    del self.by_key[key]
+                    self._index_remove(key, record)
+                    self.versions.pop(key, None)
+                    op = 'delete'
+                elif record is None:
+                    record = self.record_type.from_dict(data) if self.record_type is not None else data
+                    self.by_key[key] = record
+                    self._index_add(key, record)
+                    self._set_version(key, versions[key])
+                    op = 'insert'
+                elif record == data:
+                    self._set_version(key, versions[key])
+                    continue
+                else:
+                    self._index_remove(key, record)
+                    for field in [f for f in record if f not in data]:
+                        del record[field]
+                    record.update(data)
+                    self._index_add(key, record)
+                    self._set_version(key, versions[key])
+                    op = 'update'
+                changes[op][0].append(record)
+                changes[op][1].append(key)
+        for op, (records, keys) in changes.items():
+            if records:
+                self._notify(op, records, keys)
+        return sum(len(records) for records, _ in changes.values())
+
+    def _set_version(self, key, version):
+        """Record the version of a record, leaving out records that were never updated."""
+        if version:
+            self.versions[key] = version
+        else:
+            self.versions.pop(key, None)
+
+    def subscribe(self, listener, loop=None):
+        """
+        Register a listener that is called after every change of the collection.
+
+        The listener is called as `listener(op, records, keys)` with `op` one of 'insert',
+        'update' or 'delete', the affected records and their primary keys before the change.
+        A delete of many records is reported with a single call.
+
+        Listeners that update the UI must run on its event loop. If `loop` is given, a change
+        made in another thread, e.g. a delete offloaded to a worker thread, is handed to the
+        loop instead of calling the listener in that thread.
+
+        Args:
+            listener (Callable): The listener.
+            loop (asyncio.AbstractEventLoop, optional): The event loop to call the listener on.
+
+        Returns:
+            Callable: The listener, so it can later be passed to `unsubscribe`.
+        """
+        self._listeners.append((listener, loop))
+        return listener
+
+    def unsubscribe(self, listener):
+        """
+        Remove a listener registered with `subscribe`; unknown listeners are ignored.
+
+        Args:
+            listener (Callable): The listener.
+
+        Returns:
+            None
+        """
+        self._listeners = [entry for entry in self._listeners if entry[0] != listener]
+
+    def _persist(self, transaction, changes):
+        """Persist a change now, or when the running transaction is committed."""
+        if transaction is None:
+            persist_changes(self.path, self.key_field, self, changes)
+        else:
+            transaction.changes.setdefault(self, []).extend(changes)
+
+    def _publish(self, transaction, op, records, keys):
+        """Tell the listeners about a change now, or once the running transaction is committed."""
+        if transaction is None:
+            self._notify(op, records, keys)
+        else:
+            transaction.notifications.append((self, op, records, keys))
+
+    def _notify(self, op, records, keys, listeners=None):
+        """Tell every listener, or the given (listener, loop) pairs, about a change, on its event loop if it has one."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for listener, loop in list(self._listeners if listeners is None else listeners):
+            if loop is None or loop is running:
+                listener(op, records, keys)
+            elif loop.is_closed():
+                self.unsubscribe(listener)
+            else:
+                loop.call_soon_threadsafe(listener, op, records, keys)
+
+
+class Transaction:
+    """
+    A unit of work spanning several collections, which is committed all at once or not at all.
+
+    Changes made to the given collections inside the `with` block are applied in memory right
+    away, so the block sees its own changes, but they are persisted together when the block
+    ends, with `commit_changes`: a crash never leaves the files with only some of them. If the
+    block raises, the changes are undone in memory instead and nothing is written. Listeners
+    are told about the changes only after the commit.
+
+    Usage:
+        with Transaction(flights, clients):
+            flights.delete(booking_ids)
+            clients.delete([client_id])
+
+    While the block runs, it holds the locks of its collections, so changes from other threads
+    wait for the commit, and it holds back the background writer. Transactions cannot be nested.
+    Undoing keeps the records that were changed or deleted, and the order of the index buckets
+    they were in; restoring the order of the records after a delete costs one copy of the
+    collection's keys, taken at the first delete.
+    """
+
+    def __init__(self, *collections):
+        """
+        Args:
+            *collections (Collection): The collections changed by the transaction.
+        """
+        self.collections = collections
+        # collection -> journal entries, and the (collection, op, records, keys) of every change
+        self.changes = {}
+        self.notifications = []
+        # collection -> primary key -> (record, copy of its fields or None, version) before the transaction
+        self._undo = {}
+        # collection -> order of the primary keys before the transaction
+        self._order = {}
+        # collection -> (field, value) -> order of the keys in that index bucket before the transaction
+        self._buckets = {}
+        self._held = None
+
+    @staticmethod
+    def running(collection):
+        """
+        Return the transaction of the current thread, if it covers a collection.
+
+        Args:
+            collection (Collection): The collection.
+
+        Returns:
+            Transaction | None: The transaction, or None.
+        """
+        transaction = getattr(_local, 'transaction', None)
+        if transaction is not None and collection in transaction.collections:
+            return transaction
+        return None
+
+    def touch(self, collection, key, copy=False, reorder=False):
+        """
+        Remember the state of a record before the transaction first changes it.
+
+        Args:
+            collection (Collection): The collection of the record.
+            key (str): The primary key; it does not need to be in use yet.
+            copy (bool): Whether the record is about to be changed in place, so its fields must be copied.
+            reorder (bool): Whether the change moves or removes the record, so the order must be kept.
+
+        Returns:
+            None
+        """
+        undo = self._undo.setdefault(collection, {})
+        if key not in undo:
+            record = collection.by_key.get(key)
+            fields = record.copy() if copy and record is not None else None
+            undo[key] = (record, fields, collection.versions.get(key))
+            if record is not None:
+                buckets = self._buckets.setdefault(collection, {})
+                for field, index in collection.indexes.items():
+                    value = index_value(record, field)
+                    if (field, value) not in buckets:
+                        buckets[field, value] = list(index.get(value, {}))
+        elif copy and undo[key][0] is not None and undo[key][1] is None:
+            record, _, version = undo[key]
+            undo[key] = (record, record.copy(), version)
+        if reorder and collection not in self._order:
+            self._order[collection] = list(collection.by_key)
+
+    def __enter__(self):
+        if getattr(_local, 'transaction', None) is not None:
+            raise RuntimeError('Transactions cannot be nested')
+        for collection in self.collections:
+            collection.ensure_loaded()
+        self._held = hold_writes()
+        self._held.__enter__()
+        # Locked in a fixed order, so two transactions never wait for each other
+        for collection in sorted(self.collections, key=lambda c: str(c.path)):
+            collection._lock.acquire()
+        _local.transaction = self
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        committed = False
+        try:
+            if exc_type is None:
+                try:
+                    commit_changes([(c.path, c.key_field, c, entries) for c, entries in self.changes.items()])
+                    committed = True
+                except BaseException:
+                    self.rollback()
+                    raise
+            else:
+                self.rollback()
+        finally:
+            _local.transaction = None
+            for collection in self.collections:
+                collection._lock.release()
+            self._held.__exit__(None, None, None)
+        if committed:
+            for collection, op, records, keys in self.notifications:
+                collection._notify(op, records, keys)
+        return False
+
+    def rollback(self):
+        """
+        Undo the changes of the transaction in memory.
+
+        Returns:
+            None
+        """
+        for collection, undo in self._undo.items():
+            for key in undo:
+                record = collection.by_key.pop(key, None)
+                if record is not None:
+                    collection._index_remove(key, record)
+            for key, (record, fields, version) in undo.items():
+                if version is None:
+                    collection.versions.pop(key, None)
+                else:
+                    collection.versions[key] = version
+                if record is None:
+                    continue
+                if fields is not None:
+                    for field in [f for f in record if f not in fields]:
+                        del record[field]
+                    record.update(fields)
+                collection.by_key[key] = record
+                collection._index_add(key, record)
+            order = self._order.get(collection)
+            if order is not None:
+                by_key = collection.by_key
+                collection.by_key = {key: by_key[key] for key in order if key in by_key}
+            for (field, value), keys in self._buckets.get(collection, {}).items():
+                bucket = collection.indexes[field].get(value)
+                if bucket is not None:
+                    collection.indexes[field][value] = {key: bucket[key] for key in keys if key in bucket}
+        self.changes.clear()
+        self.notifications.clear()
+
+
+class Store:
+    """
+    The collections of the application, shared by every page, handler and background job.
+
+    Code reaches a collection through the store at the moment it needs it, e.g. `store.flights`,
+    instead of keeping a reference taken when its page was built, so every reader works on the
+    collection the store currently holds. Changes are made in place by the collections, and a
+    collection swapped in with `replace` takes over at once: the store drops the replaced one,
+    which is freed as soon as the readers still using it are done.
+
+    Collections are replaced when a worker reloads them, see `app.cluster`. Readers that outlive
+    a replacement, such as the tables and selectors of an open page, follow a collection by its
+    name with `subscribe`: they are moved over to the new collection and told with a 'replace'
+    change, so none of them keeps the replaced one alive.
+    """
+
+    def __init__(self, **collections):
+        """
+        Args:
+            **collections (Collection): The collections by name, e.g. `clients=Collection(...)`.
+        """
+        self.names = tuple(collections)
+        self._lock = threading.Lock()
+        # name -> (listener, loop) pairs following the collection of that name, see `subscribe`
+        self._followers = {name: [] for name in collections}
+        for name, collection in collections.items():
+            setattr(self, name, collection)
+
+    def collections(self):
+        """
+        Return the collections currently held by the store.
+
+        Returns:
+            list: The collections, in the order they were given.
+        """
+        return [getattr(self, name) for name in self.names]
+
+    def replace(self, name, collection):
+        """
+        Swap in a new collection, e.g. one reloaded from storage.
+
+        Args:
+            name (str): The name of the collection, e.g. 'flights'.
+            collection (Collection): The collection taking its place.
+
+        Returns:
+            Collection: The replaced collection.
+        """
+        if name not in self.names:
+            raise KeyError(name)
+        with self._lock:
+            old = getattr(self, name)
+            followers = list(self._followers[name])
+            for listener, loop in followers:
+                old.unsubscribe(listener)
+                collection.subscribe(listener, loop=loop)
+            setattr(self, name, collection)
+        collection._notify('replace', [], [], followers)
+        return old
+
+    def subscribe(self, name, listener, loop=None):
+        """
+        Register a listener for the changes of the collection of a name, whichever it currently is.
+
+        The listener is subscribed to the collection like with `Collection.subscribe`. When the
+        collection is replaced, it is moved over to the new one and called with the 'replace'
+        change and no records; it then finds the new collection in the store.
+
+        Args:
+            name (str): The name of the collection, e.g. 'flights'.
+            listener (Callable): The listener.
+            loop (asyncio.AbstractEventLoop, optional): The event loop to call the listener on.
+
+        Returns:
+            Callable: The listener, so it can later be passed to `unsubscribe`.
+        """
+        with self._lock:
+            self._followers[name].append((listener, loop))
+            return getattr(self, name).subscribe(listener, loop=loop)
+
+    def unsubscribe(self, name, listener):
+        """
+        Remove a listener registered with `subscribe`; unknown listeners are ignored.
+
+        Args:
+            name (str): The name of the collection.
+            listener (Callable): The listener.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._followers[name] = [entry for entry in self._followers[name] if entry[0] != listener]
+            getattr(self, name).unsubscribe(listener)
+
+
+def load_parallel(collections, processes=0):
+    """
+    Load several collections concurrently.
+
+    Every collection is loaded on its own thread, so reading the files overlaps. With `processes`
+    set, the JSON snapshots are additionally parsed in a pool of worker processes, which lets
+    large files be parsed on several cores at once; journal replay and indexing still happen in
+    this process. Parsing in processes is skipped in 'sqlite' mode, where nothing is parsed.
+
+    Args:
+        collections (list): The collections to load.
+        processes (int): Number of worker processes for parsing; 0 parses on the loading threads.
+
+    Returns:
+        dict: The load time in seconds of every collection, keyed by its file name.
+    """
+    pool = ProcessPoolExecutor(processes) if processes and config.storage_mode != 'sqlite' else None
+
+    def load(collection):
+        start = time.perf_counter()
+        snapshot = pool.submit(load_json, collection.path).result() if pool and not collection.loaded else None
+        collection.ensure_loaded(snapshot)
+        return collection.path.name, time.perf_counter() - start
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(collections) or 1) as threads:
+            return dict(threads.map(load, collections))
+    finally:
+        if pool:
+            pool.shutdown()
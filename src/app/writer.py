@@ -0,0 +1,175 @@
+"""
+Debounced background writer for the data files.
+
+Rewriting a whole JSON file after every edit blocks the caller for the duration of the write
+and repeats the work for every edit of a burst. The writer instead queues the write of a file
+and performs it on a worker thread once no further write has been queued for that file for a
+short delay. Writes queued in the meantime replace the pending one, so a burst of edits costs
+a single write. `flush` performs every pending write immediately and is called on shutdown.
+A write that fails is queued again, so it is retried rather than lost, and `flush` raises its error.
+"""
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+
+class BackgroundWriter:
+    """
+    Coalesces writes per key and performs them on a worker thread.
+
+    A write is a callable that produces the complete, current content of its target, so only
+    the most recent write queued for a key has to run.
+    """
+
+    def __init__(self, delay, max_delay=None):
+        """
+        Args:
+            delay (float): Seconds a key must be left alone before its pending write runs.
+            max_delay (float, optional): Seconds after which a pending write runs even while
+                                         writes for its key keep being queued. Defaults to
+                                         ten times `delay`.
+        """
+        self.delay = delay
+        self.max_delay = max_delay if max_delay is not None else delay * 10
+        self.writes = 0
+        self.coalesced = 0
+        # key -> [due time, write, time the first write of the burst was queued]
+        self._pending = {}
+        self._condition = threading.Condition()
+        # Held while writes run, so flush() also waits for a write the worker is performing
+        self._write_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='background-writer', daemon=True)
+        self._thread.start()
+
+    def schedule(self, key, write):
+        """
+        Queue a write, replacing any write still pending for the same key.
+
+        Args:
+            key (Hashable): Identifies the target of the write, e.g. the file path.
+            write (Callable): Performs the write when called without arguments.
+
+        Returns:
+            bool: True if the write replaced a write that was still pending.
+        """
+        with self._condition:
+            now = time.monotonic()
+            first = now
+            replaced = key in self._pending
+            if replaced:
+                self.coalesced += 1
+                first = self._pending[key][2]
+            self._pending[key] = [min(now + self.delay, first + self.max_delay), write, first]
+            self._condition.notify()
+            return replaced
+
+    def pending(self, key=None):
+        """
+        Return whether a write is pending, for the given key or for any key.
+
+        Args:
+            key (Hashable, optional): The key to check.
+
+        Returns:
+            bool: True if a write has been queued but not performed yet.
+        """
+        with self._condition:
+            return key in self._pending if key is not None else bool(self._pending)
+
+    def flush(self, key=None):
+        """
+        Perform pending writes immediately on the calling thread.
+
+        Also waits for a write that the worker thread is performing at the time of the call.
+
+        Args:
+            key (Hashable, optional): Only flush the write pending for this key.
+
+        Returns:
+            None
+
+        Raises:
+            Exception: The error of the first write that failed, once every write was tried. The
+                       failed writes stay queued, so a later flush retries them.
+        """
+        with self._write_lock:
+            with self._condition:
+                if key is None:
+                    keys = list(self._pending)
+                else:
+                    keys = [key] if key in self._pending else []
+                writes = [(k, self._pending.pop(k)[1]) for k in keys]
+            errors = self._perform(writes)
+        if errors:
+            raise errors[0]
+
+    @contextmanager
+    def paused(self):
+        """
+        Hold back all writes while the block runs, after waiting for a write in progress.
+
+        Writes queued in the meantime are performed once the block has finished.
+        """
+        with self._write_lock:
+            yield
+
+    def stop(self):
+        """
+        Flush all pending writes and stop the worker thread.
+
+        Returns:
+            None
+
+        Raises:
+            Exception: The error of the first write that failed, see `flush`.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
+
+    def _perform(self, writes):
+        """
+        Run (key, write) pairs, queueing every write that fails again to be retried after `max_delay`.
+
+        Returns:
+            list: The errors of the failed writes.
+        """
+        errors = []
+        for key, write in writes:
+            try:
+                write()
+                self.writes += 1
+            except Exception as e:
+                traceback.print_exc()
+                errors.append(e)
+                with self._condition:
+                    # A write queued in the meantime replaces the failed one
+                    if key not in self._pending:
+                        now = time.monotonic()
+                        self._pending[key] = [now + self.max_delay, write, now]
+                        self._condition.notify()
+        return errors
+
+    def _run(self):
+        """Worker loop performing writes whose delay has elapsed."""
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    now = time.monotonic()
+                    due = min((due for due, _, _ in self._pending.values()), default=None)
+                    if due is not None and due <= now:
+                        break
+                    self._condition.wait(None if due is None else due - now)
+                if self._stopped:
+                    return
+
+            with self._write_lock:
+                with self._condition:
+                    now = time.monotonic()
+                    keys = [key for key, (due, _, _) in self._pending.items() if due <= now]
+                    writes = [(key, self._pending.pop(key)[1]) for key in keys]
+                self._perform(writes)
@@ -1,6 +1,32 @@
 from nicegui import ui, app
-from app.startup import startup
+from app import config
+from app.startup import startup, warm_up, freeze_loaded_records, store
+from app.storage import start_writer, stop_writer
+from app.jobs import job_queue
+from app.cluster import ChangeFeed, run_workers
 
-app.on_startup(startup)
 
-ui.run()
+def stop_writing():
+    """Write the pending changes on shutdown and report the writes performed and avoided."""
+    stats = stop_writer()
+    if stats is not None:
+        print(f"Wrote {stats['writes']} snapshot(s) ({stats['bytes_written'] / 1024:.0f} KB), "
+              f"avoided {stats['writes_avoided']} ({stats['bytes_avoided'] / 1024:.0f} KB)")
+
+
+if config.workers > 1 and config.worker is None:
+    run_workers(store, config.workers, config.port)
+else:
+    if config.workers > 1:
+        # Started before the collections are loaded, so no change of another worker is missed
+        change_feed = ChangeFeed(store)
+        app.on_startup(change_feed.start)
+        app.on_shutdown(change_feed.stop)
+    app.on_startup(warm_up)
+    app.on_startup(freeze_loaded_records)
+    app.on_startup(start_writer)
+    app.on_startup(startup)
+    app.on_shutdown(job_queue.stop)
+    app.on_shutdown(stop_writing)
+
+    ui.run(port=config.port)
@@ -0,0 +1,218 @@
+import pytest
+import os
+import sys
+import json
+import sqlite3
+import subprocess
+from pathlib import Path
+from app import config
+from app.cluster import ChangeFeed
+from app.storage import sqlite_prune_changes
+from app.store import Collection, ConflictError, Store
+
+# Runs the code of another worker process against the data directory given as first argument
+worker_script = """
+import sys
+from pathlib import Path
+from app.store import Collection
+
+flights = Collection.load(Path(sys.argv[1]) / 'flights.json', 'Booking_ID', indexes=('Client_ID',))
+exec(sys.argv[2])
+"""
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """
+    Switch the storage layer to the setup of several workers sharing an SQLite database.
+
+    Args:
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+
+    Returns:
+        Callable: Starts Python code as another worker, with `flights` loaded from a data directory,
+                  and returns the process.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'sqlite')
+    monkeypatch.setattr('app.config.workers', 2)
+    env = {**os.environ, 'FLYGUY_STORAGE_MODE': 'sqlite', 'FLYGUY_WORKERS': '2',
+           'PYTHONPATH': str(Path(__file__).parent.parent)}
+
+    def start(data_dir, code):
+        return subprocess.Popen([sys.executable, '-c', worker_script, str(data_dir), code],
+                                env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+    return start
+
+
+@pytest.mark.order(79)
+def test_worker_follows_changes_of_other_workers(tmp_path, workers):
+    """
+    Test that a worker applies the changes another worker process stores in the shared database.
+
+    This test verifies that:
+        - Inserts, updates and deletes of the other worker reach the collection and its indexes
+        - Listeners are told about each change, and unchanged records are not touched
+        - The worker does not apply its own changes a second time
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        workers (Callable): Fixture starting code as another worker.
+    """
+    path = tmp_path / 'flights.json'
+    path.write_text(json.dumps([{'Booking_ID': i, 'Client_ID': 1} for i in range(1, 4)]))
+    flights = Collection.load(path, 'Booking_ID', indexes=('Client_ID',))
+    untouched = flights.get(3)
+    feed = ChangeFeed(Store(flights=flights))
+    assert feed.poll() == 0
+    changes = []
+    flights.subscribe(lambda op, records, keys: changes.append((op, keys)))
+
+    worker = workers(tmp_path, "flights.insert({'Booking_ID': flights.next_id(), 'Client_ID': 3})\n"
+                               "flights.update(1, {'Client_ID': 2})\n"
+                               "flights.delete([2])")
+    worker.communicate()
+    assert worker.returncode == 0
+
+    assert feed.poll() == 3
+    assert sorted(changes) == [('delete', ['2']), ('insert', ['4']), ('update', ['1'])]
+    assert [f['Booking_ID'] for f in flights] == [1, 3, 4]
+    assert [f['Booking_ID'] for f in flights.find('Client_ID', 2)] == [1]
+    assert [f['Booking_ID'] for f in flights.find('Client_ID', 3)] == [4]
+    assert flights.get(3) is untouched
+
+    flights.update(3, {'Client_ID': 5})
+    assert feed.poll() == 0
+    assert len(changes) == 4
+
+
+@pytest.mark.order(80)
+def test_workers_allocate_distinct_ids(tmp_path, workers):
+    """
+    Test that workers allocating IDs at the same time never hand out the same ID.
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        workers (Callable): Fixture starting code as another worker.
+    """
+    path = tmp_path / 'flights.json'
+    path.write_text(json.dumps([{'Booking_ID': 7, 'Client_ID': 1}]))
+    flights = Collection.load(path, 'Booking_ID')
+
+    worker = workers(tmp_path, "print(*[flights.next_id() for _ in range(300)])")
+    ids = [flights.next_id() for _ in range(300)]
+    output, _ = worker.communicate()
+    ids += [int(i) for i in output.split()]
+
+    assert len(set(ids)) == 600
+    assert min(ids) == 8
+
+
+@pytest.mark.order(95)
+def test_worker_reloads_after_missed_changes(tmp_path, workers):
+    """
+    Test that a worker that missed changes of another worker loads its collections again.
+
+    This test verifies that:
+        - Changes forgotten before the worker checked are noticed, and the collection is reloaded
+          with them and swapped into the store
+        - Listeners following the collection through the store are told and follow the new one
+        - Later changes are applied to the new collection as usual
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        workers (Callable): Fixture starting code as another worker.
+    """
+    path = tmp_path / 'flights.json'
+    path.write_text(json.dumps([{'Booking_ID': i, 'Client_ID': 1} for i in range(1, 4)]))
+    store = Store(flights=Collection.load(path, 'Booking_ID', indexes=('Client_ID',)))
+    old = store.flights
+    feed = ChangeFeed(store)
+    assert feed.poll() == 0
+    changes = []
+    store.subscribe('flights', lambda op, records, keys: changes.append((op, keys)))
+
+    worker = workers(tmp_path, "flights.update(1, {'Client_ID': 2})\nflights.delete([2])")
+    worker.communicate()
+    assert worker.returncode == 0
+    sqlite_prune_changes(path, -1)
+
+    assert feed.poll() == 2
+    assert store.flights is not old
+    assert [f['Booking_ID'] for f in store.flights.find('Client_ID', 2)] == [1]
+    assert [f['Booking_ID'] for f in old] == [1, 2, 3]
+    assert changes == [('replace', [])]
+
+    worker = workers(tmp_path, "flights.delete([3])")
+    worker.communicate()
+    assert feed.poll() == 1
+    assert [f['Booking_ID'] for f in store.flights] == [1]
+    assert changes == [('replace', []), ('delete', ['3'])]
+
+
+@pytest.mark.order(96)
+def test_workers_cannot_overwrite_each_others_edits(tmp_path, workers):
+    """
+    Test that two workers editing the same records at the same time never overwrite each other.
+
+    Both workers load the records, then save an edit of each of them from version 0, at the
+    same time.
+
+    This test verifies that:
+        - Every edit is stored by exactly one worker; the other gets a ConflictError
+        - A refused edit is undone in the memory of the worker that made it
+        - Once the worker applied the other worker's edit, it has the stored version and can edit again
+        - A table created without a version column is given one
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        workers (Callable): Fixture starting code as another worker.
+    """
+    path = tmp_path / 'flights.json'
+    path.write_text(json.dumps([{'Booking_ID': i, 'Client_ID': 1} for i in range(1, 51)]))
+    connection = sqlite3.connect(tmp_path / config.sqlite_database)
+    with connection:
+        connection.execute('CREATE TABLE flights (id TEXT PRIMARY KEY, client_id TEXT, airline_id TEXT, '
+                           'data TEXT NOT NULL)')
+    connection.close()
+    flights = Collection.load(path, 'Booking_ID', indexes=('Client_ID',))
+    feed = ChangeFeed(Store(flights=flights))
+    assert feed.poll() == 0
+
+    worker = workers(tmp_path, "from app.store import ConflictError\n"
+                               "print('ready', flush=True)\n"
+                               "sys.stdin.readline()\n"
+                               "for key in range(1, 51):\n"
+                               "    try:\n"
+                               "        flights.update(key, {'Client_ID': 3}, version=0)\n"
+                               "        print(key, flush=True)\n"
+                               "    except ConflictError:\n"
+                               "        pass")
+    assert worker.stdout.readline() == 'ready\n'
+    worker.stdin.write('go\n')
+    worker.stdin.flush()
+    won = set()
+    for key in range(1, 51):
+        try:
+            flights.update(key, {'Client_ID': 2}, version=0)
+            won.add(key)
+        except ConflictError:
+            assert flights.get(key)['Client_ID'] == 1
+            assert flights.version(key) == 0
+    output, _ = worker.communicate()
+    assert worker.returncode == 0
+    other = {int(key) for key in output.split()}
+
+    assert won | other == set(range(1, 51))
+    assert not won & other
+    stored = Collection.load(path, 'Booking_ID')
+    assert {f['Booking_ID'] for f in stored if f['Client_ID'] == 2} == won
+    assert {f['Booking_ID'] for f in stored if f['Client_ID'] == 3} == other
+    assert all(stored.version(key) == 1 for key in range(1, 51))
+
+    feed.poll()
+    assert {f['Booking_ID'] for f in flights.find('Client_ID', 3)} == other
+    assert all(flights.version(key) == 1 for key in range(1, 51))
+    for key in range(1, 51):
+        flights.update(key, {'Client_ID': 4}, version=1)
+    assert len(flights.find('Client_ID', 4)) == 50
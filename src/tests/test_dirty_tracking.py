@@ -0,0 +1,102 @@
+import pytest
+from app.storage import write_statistics, is_dirty, save_snapshot, start_writer, stop_writer
+from app.store import Collection
+
+
+@pytest.fixture
+def bookings(tmp_path, monkeypatch):
+    """
+    Pytest fixture that provides a client and a flight collection saved in 'json' mode.
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+
+    Returns:
+        tuple: The client and the flight collection.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'json')
+    clients = Collection(tmp_path / 'clients.json', 'ID', [])
+    flights = Collection(tmp_path / 'flights.json', 'Booking_ID', [], indexes=('Client_ID',))
+    clients.insert({'ID': 1, 'Name': 'Ann'})
+    clients.insert({'ID': 2, 'Name': 'Bob'})
+    flights.insert({'Booking_ID': 1, 'Client_ID': 1, 'End City': 'Paris'})
+    return clients, flights
+
+
+@pytest.mark.order(60)
+def test_cascade_skips_unchanged_collections(bookings):
+    """
+    Test that deleting a client without bookings does not rewrite the flight file.
+
+    This test verifies that:
+        - The client file is rewritten and the flight file is left untouched
+        - The size of the flight file is counted as bytes avoided
+
+    Args:
+        bookings (tuple): The client and the flight collection.
+    """
+    clients, flights = bookings
+    flights_mtime = flights.path.stat().st_mtime_ns
+    before = write_statistics()
+
+    clients.delete([2])
+    flights.delete(flights.find('Client_ID', 2))
+
+    after = write_statistics()
+    assert flights.path.stat().st_mtime_ns == flights_mtime
+    assert after['writes'] - before['writes'] == 1
+    assert after['writes_avoided'] - before['writes_avoided'] == 1
+    assert after['bytes_avoided'] - before['bytes_avoided'] == flights.path.stat().st_size
+
+
+@pytest.mark.order(61)
+def test_unchanged_edit_is_not_written(bookings):
+    """
+    Test that saving a record without changing it does not rewrite its file.
+
+    Args:
+        bookings (tuple): The client and the flight collection.
+    """
+    clients, _ = bookings
+    before = write_statistics()
+
+    clients.update(1, {'ID': 1, 'Name': 'Ann'})
+    assert write_statistics()['writes'] == before['writes']
+
+    clients.update(1, {'Name': 'Ada'})
+    assert write_statistics()['writes'] == before['writes'] + 1
+    assert write_statistics()['writes_avoided'] == before['writes_avoided'] + 1
+
+
+@pytest.mark.order(62)
+def test_persistence_pass_writes_only_dirty_collections(bookings):
+    """
+    Test that a collection is only saved while it has unsaved changes.
+
+    This test verifies that:
+        - A collection is dirty between a change and the write of its snapshot
+        - Saving a clean collection again is skipped
+        - Writes coalesced by the background writer are counted as avoided
+
+    Args:
+        bookings (tuple): The client and the flight collection.
+    """
+    clients, flights = bookings
+    assert not is_dirty(clients.path)
+    assert not save_snapshot(flights.path, flights)
+
+    before = write_statistics()
+    start_writer(60)
+    try:
+        clients.update(1, {'Name': 'Ada'})
+        clients.update(1, {'Name': 'Ann'})
+        assert is_dirty(clients.path)
+        assert not is_dirty(flights.path)
+    finally:
+        stop_writer()
+
+    after = write_statistics()
+    assert not is_dirty(clients.path)
+    assert after['writes'] - before['writes'] == 1
+    assert after['writes_avoided'] - before['writes_avoided'] == 1
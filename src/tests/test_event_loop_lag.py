@@ -0,0 +1,95 @@
+import pytest
+import asyncio
+import gc
+import time
+from nicegui import run
+from app import startup
+from app.records import Client, Booking
+from app.store import Collection
+
+bookings = 100000
+
+
+async def measure_lag(delete):
+    """
+    Run a delete while a ticker measures how late the event loop wakes it up.
+
+    Args:
+        delete (Callable): An async function performing the delete.
+
+    Returns:
+        tuple: The largest lag of the ticker and the duration of the delete, in seconds.
+    """
+    lags = []
+    done = False
+
+    async def tick():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - start - 0.005)
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    await delete()
+    duration = time.perf_counter() - start
+    await asyncio.sleep(0.02)
+    done = True
+    await ticker
+    return max(lags), duration
+
+
+@pytest.mark.order(74)
+def test_cascade_delete_event_loop_lag(tmp_path, monkeypatch):
+    """
+    Performance test for the responsiveness of the event loop during a cascade delete.
+
+    A client with 100k bookings is deleted once on the event loop and once offloaded to a worker
+    thread like the delete handlers do, both after the startup hooks of the server have loaded
+    the collections and frozen them.
+    It verifies that:
+        - Both deletes remove the client's bookings and keep the bookings of other clients
+        - While the offloaded delete runs, the event loop keeps serving other tasks, with a lag
+          far below the duration of the delete
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'json')
+    monkeypatch.setattr('app.config.gc_freeze', True)
+
+    def load():
+        clients = Collection(tmp_path / 'clients.json', 'ID', [{'ID': 1, 'Name': 'Ann'}, {'ID': 2, 'Name': 'Bob'}],
+                             record_type=Client)
+        flights = Collection(tmp_path / 'flights.json', 'Booking_ID',
+                             [{'Booking_ID': i, 'Client_ID': 1 if i <= bookings else 2, 'Airline_ID': 1}
+                              for i in range(1, bookings + 1001)],
+                             indexes=('Client_ID', 'Airline_ID'), record_type=Booking)
+        monkeypatch.setattr(startup.store, 'clients', clients)
+        monkeypatch.setattr(startup.store, 'flights', flights)
+        startup.warm_up()
+        assert startup.freeze_loaded_records()
+
+    async def inline():
+        assert startup.delete_cascade(startup.store.clients, 1, 'Client_ID') == bookings
+
+    async def offloaded():
+        assert await run.io_bound(startup.delete_cascade, startup.store.clients, 1, 'Client_ID') == bookings
+
+    try:
+        load()
+        inline_lag, inline_time = asyncio.run(measure_lag(inline))
+        load()
+        offloaded_lag, offloaded_time = asyncio.run(measure_lag(offloaded))
+    finally:
+        gc.unfreeze()
+
+    print(f"\n{bookings} bookings: inline delete {inline_time * 1000:.0f}ms with {inline_lag * 1000:.0f}ms lag, "
+          f"offloaded delete {offloaded_time * 1000:.0f}ms with {offloaded_lag * 1000:.0f}ms lag")
+
+    assert len(startup.store.flights) == 1000
+    assert startup.store.clients.get(1) is None
+    assert offloaded_lag < offloaded_time / 4
+    assert offloaded_lag < inline_lag / 4
@@ -0,0 +1,55 @@
+import pytest
+import time
+from app.store import Collection
+
+num_bookings = 1000000
+num_clients = 100000
+num_airlines = 100
+searches = 100000
+
+
+@pytest.mark.order(46)
+def test_flight_search_speed(tmp_path):
+    """
+    Performance test for the public flight search against 1M bookings.
+
+    This test benchmarks how many (Client ID, Airline ID) searches per second the composite
+    index can answer, and compares it with the full scan the search used before. It verifies that:
+        - Every search returns exactly the bookings of that client with that airline
+        - The indexed search is orders of magnitude faster than the full scan
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    cities = [f'City {i}' for i in range(50)]
+    bookings = [
+        {
+            'Booking_ID': i,
+            'Client_ID': i % num_clients + 1,
+            'Airline_ID': i % num_airlines + 1,
+            'Flight_ID': i,
+            'Date': '2026-12-01T10:00',
+            'Start City': cities[i % 50],
+            'End City': cities[(i + 7) % 50],
+            'Type': 'Flight'
+        }
+        for i in range(1, num_bookings + 1)
+    ]
+    composite = ('Client_ID', 'Airline_ID')
+    flights = Collection(tmp_path / 'flights.json', 'Booking_ID', bookings, indexes=(composite,))
+    queries = [(str(i % num_clients + 1), str(i % num_airlines + 1)) for i in range(searches)]
+
+    start = time.perf_counter()
+    results = [flights.find(composite, q) for q in queries]
+    indexed_rate = searches / (time.perf_counter() - start)
+
+    # A couple of searches is enough to time the old full scan
+    start = time.perf_counter()
+    for client_q, airline_q in queries[:2]:
+        [f for f in bookings if str(f.get('Client_ID')) == client_q and str(f.get('Airline_ID')) == airline_q]
+    scan_rate = 2 / (time.perf_counter() - start)
+
+    print(f'\n{num_bookings} bookings: indexed {indexed_rate:,.0f} searches/s, full scan {scan_rate:,.2f} searches/s')
+
+    assert all(len(r) == num_bookings // num_clients for r in results)
+    assert indexed_rate > scan_rate * 1000
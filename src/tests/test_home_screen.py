@@ -1,6 +1,7 @@
 from nicegui import ui
 from nicegui.testing import Screen
 import pytest
+from tests.utils import login_as_admin
     
 @pytest.mark.order(4)
 def test_splitter_initial(screen: Screen):
@@ -85,4 +86,30 @@ def test_splitter_click_right(screen: Screen):
     # Check the updated screen width
     width_after = screen.find_by_class('splitter-value-after')
     text_after = width_after.get_attribute('textContent').strip()
-    assert '10' in text_after
\ No newline at end of file
+    assert '10' in text_after
+    
+@pytest.mark.order(73)
+def test_agent_view_built_after_login(screen: Screen):
+    """
+    Verifies that the agent view is only built after a successful login, one panel at a time.
+
+    This test checks that:
+        - The public page holds no part of the agent dashboard's tabs or tables
+        - After login, only the panel of the selected tab is built
+        - Opening another tab builds its panel
+
+    Args:
+        screen (Screen): The NiceGUI testing screen instance.
+    """
+    screen.open('/')
+    screen.should_contain('Flight Search ✈️')
+    screen.should_not_contain('Client Records')
+    screen.should_not_contain('Airline Records')
+
+    login_as_admin(screen)
+    screen.should_contain('Client Records')
+    screen.should_not_contain('Airline Records')
+
+    screen.find('Airlines').click()
+    screen.wait(0.5)
+    screen.should_contain('Airline Records')
@@ -0,0 +1,168 @@
+import pytest
+import json
+from app import startup, importer
+from app.importer import BulkImport
+from app.jobs import JobQueue
+from app.records import Client, Airline, Booking, AvailableFlight
+from app.storage import journal_path
+from app.store import Collection, Store
+
+
+@pytest.fixture
+def import_store(tmp_path, monkeypatch):
+    """
+    Build a store in 'journal' mode with two clients, two airlines and one booking.
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+
+    Returns:
+        Store: The collections.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'journal')
+    monkeypatch.setattr('app.config.journal_compact_threshold', 1000)
+    return Store(
+        clients=Collection(tmp_path / 'clients.json', 'ID', [{'ID': 1, 'Name': 'Ann'}, {'ID': 4, 'Name': 'Bob'}],
+                           record_type=Client),
+        airlines=Collection(tmp_path / 'airlines.json', 'ID', [{'ID': 1}, {'ID': 2}], record_type=Airline),
+        flights=Collection(tmp_path / 'flights.json', 'Booking_ID', [{'Booking_ID': 9, 'Client_ID': 1, 'Airline_ID': 1}],
+                           indexes=('Client_ID', 'Airline_ID'), record_type=Booking),
+        available_flights=Collection(tmp_path / 'available_flights.json', 'Flight_ID', [], record_type=AvailableFlight),
+    )
+
+
+@pytest.mark.order(86)
+def test_import_csv(tmp_path, monkeypatch, import_store):
+    """
+    Test that a CSV file of bookings is imported in batches and written once.
+
+    This test verifies that:
+        - Rows without an ID get consecutive IDs after the highest ID in use, allocated once per batch
+        - Zero-padded IDs are read as numbers, and rows without a type get the collection's type
+        - Each distinct client is looked up once while checking the rows, not once per row or batch,
+          and once more before writing
+        - The records are persisted with a single write and the progress is reported
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+        import_store (Store): Fixture building the collections.
+    """
+    path = tmp_path / 'bookings.csv'
+    path.write_text('Booking_ID,Client_ID,Airline_ID,End City\n'
+                    ',000000001,1,Paris\n,4,2,Rome\n20,1,2,Oslo\n,4,1,Bern\n,1,1,Riga\n')
+    flights = import_store.flights
+    writes, reservations, lookups = [], [], []
+    monkeypatch.setattr('app.storage.persist_changes', lambda *args: writes.append(args[3]))
+    reserve = flights.sequence.reserve
+    monkeypatch.setattr(flights.sequence, 'reserve', lambda *args: reservations.append(args) or reserve(*args))
+    get = import_store.clients.get
+    monkeypatch.setattr(import_store.clients, 'get', lambda key: lookups.append(key) or get(key))
+
+    bulk_import = BulkImport(import_store, 'flights', path, batch_size=2)
+    counts = list(bulk_import.steps())
+
+    assert counts == [2, 2, 1]
+    assert [(f['Booking_ID'], f['Client_ID'], f.get('Type')) for f in flights] == [
+        (9, 1, None), (10, 1, 'Flight'), (11, 4, 'Flight'), (20, 1, 'Flight'), (21, 4, 'Flight'), (22, 1, 'Flight')]
+    assert len(reservations) == 3
+    assert sorted(lookups) == [1, 1, 4, 4]
+    assert len(writes) == 1 and len(writes[0]) == 5
+    assert (bulk_import.rows, bulk_import.imported) == (5, 5)
+    assert bulk_import.rows_per_second > 0
+    assert 'Imported 5 of 5 rows into flights' in bulk_import.summary()
+
+
+@pytest.mark.order(87)
+def test_import_refuses_invalid_rows(tmp_path, import_store):
+    """
+    Test that a file with invalid rows is not imported at all.
+
+    This test verifies that:
+        - Missing required fields, unknown clients or airlines, IDs in use and lines that are
+          not JSON objects are reported with their line numbers
+        - Nothing is added or written, and the valid rows are not imported either
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        import_store (Store): Fixture building the collections.
+    """
+    path = tmp_path / 'bookings.jsonl'
+    rows = [{'Client_ID': 1, 'Airline_ID': 1}, {'Client_ID': 7, 'Airline_ID': 1}, {'Client_ID': 1},
+            {'Booking_ID': 9, 'Client_ID': 1, 'Airline_ID': 2}, {'Client_ID': 4, 'Airline_ID': 3}]
+    path.write_text('\n'.join(json.dumps(row) for row in rows) + '\n[1, 2]\n')
+
+    with pytest.raises(ValueError) as error:
+        BulkImport(import_store, 'flights', path, batch_size=4).run()
+
+    assert str(error.value) == (
+        '5 invalid row(s) in bookings.jsonl, nothing imported: line 3: Airline_ID missing; '
+        'line 4: Booking_ID 9 already exists; line 2: Client_ID 7 does not exist; '
+        'line 6: not a JSON object; line 5: Airline_ID 3 does not exist')
+    assert [f['Booking_ID'] for f in import_store.flights] == [9]
+    assert not journal_path(import_store.flights.path).exists()
+
+
+@pytest.mark.order(88)
+def test_import_job_and_command(tmp_path, monkeypatch, capsys, import_store):
+    """
+    Test that imports run as background jobs and from the command line.
+
+    This test verifies that:
+        - A job imports the file, reports the rows per second and removes an uploaded file with its directory
+        - A cancelled import job writes nothing, and an uploaded file is removed even if the job never started
+        - The command prints the progress and outcome, and exits with 1 if the import is refused
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+        capsys (CaptureFixture): Pytest fixture capturing the printed output.
+        import_store (Store): Fixture building the collections.
+    """
+    for name in import_store.names:
+        monkeypatch.setattr(startup.store, name, getattr(import_store, name))
+    jobs = JobQueue()
+    monkeypatch.setattr(startup, 'job_queue', jobs)
+    upload = tmp_path / 'upload' / 'airlines.csv'
+    upload.parent.mkdir()
+    upload.write_text('Company Name\n' + ''.join(f'Airline {i}\n' for i in range(500)))
+
+    job = startup.submit_import('airlines', upload, 'Import airlines.csv', remove=True)
+    assert jobs.wait(job, 30)
+    assert (job.state, job.done, job.total) == ('done', 500, 500)
+    assert job.rate > 0
+    assert len(import_store.airlines) == 502
+    assert not upload.parent.exists()
+
+    upload = tmp_path / 'airlines.csv'
+    upload.write_text('Company Name\n' + ''.join(f'Airline {i}\n' for i in range(500)))
+    monkeypatch.setattr('app.config.import_batch_size', 100)
+    job = startup.submit_import('airlines', upload, 'Import airlines.csv')
+    job.cancel()
+    assert jobs.wait(job, 30)
+    assert job.state == 'cancelled'
+    assert len(import_store.airlines) == 502
+    assert upload.exists()
+
+    upload = tmp_path / 'queued' / 'airlines.csv'
+    upload.parent.mkdir()
+    upload.write_text('Company Name\nQueued Air\n')
+    job = startup.submit_import('airlines', upload, 'Import airlines.csv', remove=True)
+    job.cancel()
+    assert jobs.wait(job, 30)
+    jobs.stop()
+    assert job.state == 'cancelled'
+    assert not upload.parent.exists()
+
+    path = tmp_path / 'clients.csv'
+    path.write_text('Name,Address Line 1,City,Zip Code,Country,Phone Number\n'
+                    'Cid,1 Road,Leeds,LS1,England,0113\n')
+    assert importer.main(['clients', str(path)]) == 0
+    assert import_store.clients.get(5)['Name'] == 'Cid'
+    assert 'Imported 1 of 1 rows into clients' in capsys.readouterr().out
+
+    path.write_text('Name\nDan\n')
+    assert importer.main(['clients', str(path)]) == 1
+    assert 'Address Line 1, City, Zip Code, Country, Phone Number missing' in capsys.readouterr().err
+    assert len(import_store.clients) == 3
@@ -0,0 +1,46 @@
+import pytest
+import random
+import time
+from app.store import Collection
+from tests.utils import generate_test_records
+
+parameters = [1000, 10000, 100000, 1000000]
+lookups = 10000
+lookup_results = {}
+
+
+@pytest.mark.order(44)
+@pytest.mark.parametrize('size', parameters)
+def test_index_lookup_speed(size, tmp_path):
+    """
+    Performance test for looking up records by ID through the primary key index.
+
+    This test benchmarks the average latency of a lookup by ID in collections of 1k to 1M
+    airline records and compares it with the linear scan the handlers used before. It verifies that:
+        - Every looked up ID is found
+        - The indexed lookup latency stays flat as the collection grows
+
+    Args:
+        size (int): Number of records in the collection.
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    airlines = Collection(tmp_path / 'airlines.json', 'ID', generate_test_records(size, 'airlines'))
+    keys = [str(random.randint(1, size)) for _ in range(lookups)]
+
+    start = time.perf_counter()
+    found = [airlines.get(q) for q in keys]
+    indexed = (time.perf_counter() - start) / lookups
+
+    # A handful of lookups is enough to time the old linear scan
+    start = time.perf_counter()
+    for q in keys[:5]:
+        next((a for a in airlines if str(a.get('ID', '')).strip() == q), None)
+    scanned = (time.perf_counter() - start) / 5
+
+    assert all(found)
+    lookup_results[size] = indexed
+    print(f'\n{size:>8} records: indexed {indexed * 1e6:.2f}us, linear scan {scanned * 1e6:.2f}us')
+
+    if size == max(parameters):
+        # Lookup latency should not grow with the size of the collection
+        assert lookup_results[size] < lookup_results[min(parameters)] * 20
@@ -0,0 +1,181 @@
+import pytest
+import threading
+from app import startup
+from app.jobs import JobQueue, run_steps
+from app.records import Airline, Booking
+from app.store import Collection
+
+
+def counting_steps(chunks, started=None, release=None):
+    """
+    Job steps that yield the given chunk sizes, optionally pausing after the first chunk.
+
+    Args:
+        chunks (list): The number of items processed by each chunk.
+        started (threading.Event, optional): Set once the first chunk is done.
+        release (threading.Event, optional): Waited for before the second chunk.
+
+    Yields:
+        int: The number of items processed by each chunk.
+    """
+    for i, count in enumerate(chunks):
+        if i == 1 and started is not None:
+            started.set()
+            release.wait(5)
+        yield count
+
+
+@pytest.mark.order(76)
+def test_job_queue():
+    """
+    Test that jobs run in order, chunk by chunk, and can be cancelled.
+
+    This test verifies that:
+        - A job reports the items done by every chunk and finishes as 'done'
+        - A running job that is cancelled stops at the end of its current chunk
+        - A queued job that is cancelled never starts, and a failing job reports its error
+        - Only the most recent finished jobs are kept, besides the active ones
+    """
+    jobs = JobQueue(keep=3)
+
+    job = jobs.submit('Count', counting_steps([2, 3, 5]), total=10)
+    assert jobs.wait(job, 5)
+    assert (job.state, job.done, job.progress) == ('done', 10, 1.0)
+
+    started, release = threading.Event(), threading.Event()
+    running = jobs.submit('Cancelled while running', counting_steps([1, 1, 1], started, release), total=3)
+    queued = jobs.submit('Cancelled while queued', counting_steps([1]), total=1)
+    assert started.wait(5)
+    running.cancel()
+    queued.cancel()
+    release.set()
+    assert jobs.wait(queued, 5)
+    assert (running.state, running.done) == ('cancelled', 2)
+    assert (queued.state, queued.done) == ('cancelled', 0)
+
+    def failing():
+        yield 1
+        raise ValueError('broken file')
+
+    failed = jobs.submit('Fail', failing())
+    assert jobs.wait(failed, 5)
+    assert (failed.state, failed.done, failed.error) == ('failed', 1, 'broken file')
+
+    jobs.submit('Last', counting_steps([1]))
+    jobs.stop()
+    assert [j.title for j in jobs.jobs()] == ['Cancelled while running', 'Cancelled while queued', 'Fail', 'Last']
+
+
+@pytest.mark.order(77)
+def test_cascade_job(tmp_path, monkeypatch):
+    """
+    Test that deleting an airline as a background job runs in chunks and stays consistent.
+
+    This test verifies that:
+        - The job deletes the bookings chunk by chunk, then the airline, and reports its progress
+        - A cancelled cascade stops between two chunks, keeping the airline and no booking of a
+          deleted airline is left behind
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'json')
+    monkeypatch.setattr('app.config.job_chunk_size', 1000)
+    airlines = Collection(tmp_path / 'airlines.json', 'ID', [{'ID': 1}, {'ID': 2}], record_type=Airline)
+    flights = Collection(tmp_path / 'flights.json', 'Booking_ID',
+                         [{'Booking_ID': i, 'Client_ID': 1, 'Airline_ID': 1 + i % 2} for i in range(10000)],
+                         indexes=('Client_ID', 'Airline_ID'), record_type=Booking)
+    monkeypatch.setattr(startup.store, 'flights', flights)
+    jobs = JobQueue()
+    monkeypatch.setattr(startup, 'job_queue', jobs)
+
+    job = startup.submit_cascade(airlines, 1, 'Airline_ID', 'Delete airline 1')
+    assert job.total == 5000
+    assert jobs.wait(job, 30)
+    assert (job.state, job.done) == ('done', 5000)
+    assert airlines.get(1) is None
+    assert len(flights) == 5000 and not flights.find('Airline_ID', 1)
+
+    chunks = []
+    flights.subscribe(lambda op, records, keys: chunks.append(len(records)))
+    job = startup.submit_cascade(airlines, 2, 'Airline_ID', 'Delete airline 2')
+    flights.subscribe(lambda op, records, keys: job.cancel())
+    assert jobs.wait(job, 30)
+    jobs.stop()
+
+    assert (job.state, job.done, chunks) == ('cancelled', 1000, [1000])
+    assert airlines.get(2) is not None
+    assert len(flights.find('Airline_ID', 2)) == 4000
+
+
+@pytest.mark.order(90)
+def test_cascade_reads_matches_once(tmp_path, monkeypatch):
+    """
+    Test that a chunked cascade takes the matching bookings once instead of once per chunk.
+
+    This test verifies that:
+        - The bookings index is read once up front and once by the final step, however many chunks
+        - A booking moved to another airline during the cascade is kept
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'json')
+    airlines = Collection(tmp_path / 'airlines.json', 'ID', [{'ID': 1}, {'ID': 2}], record_type=Airline)
+    flights = Collection(tmp_path / 'flights.json', 'Booking_ID',
+                         [{'Booking_ID': i, 'Client_ID': 1, 'Airline_ID': 1} for i in range(1, 10001)],
+                         indexes=('Client_ID', 'Airline_ID'), record_type=Booking)
+    monkeypatch.setattr(startup.store, 'flights', flights)
+    finds = []
+    find = flights.find
+    monkeypatch.setattr(flights, 'find', lambda *args: finds.append(args) or find(*args))
+
+    steps = startup.cascade_steps(airlines, 1, 'Airline_ID', 100)
+    assert next(steps) == 100
+    flights.update(500, {'Airline_ID': 2})
+    assert run_steps(steps) == 9899
+
+    assert len(finds) == 2
+    assert [f['Booking_ID'] for f in flights] == [500]
+    assert airlines.get(1) is None
+
+
+@pytest.mark.order(91)
+def test_job_last_chunk_and_cleanup():
+    """
+    Test that a job's last chunk is not reported as cancelled and that jobs are cleaned up.
+
+    This test verifies that:
+        - A cancel arriving while the last chunk runs leaves the job 'done' with all items counted
+        - The cleanup of a job runs when it finishes, also if it was cancelled while queued or
+          was still queued when the queue stopped
+    """
+    jobs = JobQueue()
+    ready = threading.Event()
+    cleaned = []
+
+    def committing_steps():
+        ready.wait(5)
+        yield 1
+        committing.cancel()
+        return 2
+
+    committing = jobs.submit('Commit', committing_steps(), cleanup=lambda: cleaned.append('Commit'))
+    ready.set()
+    assert jobs.wait(committing, 5)
+    assert (committing.state, committing.done, cleaned) == ('done', 3, ['Commit'])
+
+    started, release = threading.Event(), threading.Event()
+    blocking = jobs.submit('Block', counting_steps([1, 1], started, release))
+    queued = jobs.submit('Cancelled while queued', counting_steps([1]), cleanup=lambda: cleaned.append('Queued'))
+    pending = jobs.submit('Pending at stop', counting_steps([1]), cleanup=lambda: cleaned.append('Pending'))
+    assert started.wait(5)
+    queued.cancel()
+    blocking.cancel()
+    release.set()
+    jobs.stop()
+
+    assert [j.state for j in (blocking, queued, pending)] == ['cancelled'] * 3
+    assert cleaned == ['Commit', 'Queued', 'Pending']
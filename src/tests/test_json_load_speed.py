@@ -1,6 +1,7 @@
 import pytest
 import json
-from tests.utils import test_json_file
+from tests.utils import test_json_file, generate_test_records
+from app.storage import load_json, save_json
 import time
 import matplotlib.pyplot as plt
 from pathlib import Path
@@ -15,6 +16,16 @@ perf_results = {
     }
     for t in template_types
 }
+formats = ['pretty', 'compact', 'gzip', 'lzma']
+format_results = {
+    f: {
+        "sizes": [],
+        "load_durations": [],
+        "save_durations": [],
+        "file_sizes": []
+    }
+    for f in formats
+}
 
 @pytest.mark.order(31)
 @pytest.mark.parametrize(
@@ -195,6 +206,48 @@ def test_loading_speed_available_flights(test_json_file):
             'available_flights'
         )
 
+@pytest.mark.order(56)
+@pytest.mark.parametrize('fmt', formats)
+@pytest.mark.parametrize('size', parameters)
+def test_save_load_speed_formats(size, fmt, tmp_path):
+    """
+    Performance test comparing the file formats of save_json on the booking file.
+
+    This test saves and loads a varying number of flight records in every format. It verifies that:
+        - The records are loaded back unchanged
+        - The save time, load time and file size are recorded and printed
+
+    After the last test case (largest dataset, last format), a comparison graph is generated.
+
+    Args:
+        size (int): Number of flight records.
+        fmt (str): The save_json format under test.
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    records = generate_test_records(size, 'flights')
+    path = tmp_path / 'flights.json'
+
+    start = time.perf_counter()
+    save_json(path, records, fmt)
+    save_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = load_json(path)
+    load_duration = time.perf_counter() - start
+
+    assert data == records
+
+    file_size_mb = path.stat().st_size / (1024 * 1024)
+    print(f"\n{fmt:>7} {size:>6} records: save {save_duration:.3f}s, load {load_duration:.3f}s, {file_size_mb:.2f}MB")
+
+    format_results[fmt]['sizes'].append(size)
+    format_results[fmt]['save_durations'].append(save_duration)
+    format_results[fmt]['load_durations'].append(load_duration)
+    format_results[fmt]['file_sizes'].append(file_size_mb)
+
+    if size == max(parameters) and fmt == formats[-1]:
+        generate_format_comparison_plot(format_results)
+
 def generate_dual_axis_plot(size_data, durations, file_sizes, template_type: str):
     """
     Generate and save a dual-axis plot: Load time (s) and file size (MB) vs number of records,
@@ -243,3 +296,35 @@ def generate_dual_axis_plot(size_data, durations, file_sizes, template_type: str
     plot_filename = screenshots_dir / f"{template_type}_dual_axis_performance.png"
     plt.savefig(plot_filename, dpi=150)
     plt.close()
+
+def generate_format_comparison_plot(results):
+    """
+    Generate and save a plot comparing file size, save time and load time of the JSON formats.
+
+    Args:
+        results (Dict[str, Dict[str, List]]): Measurements per format, with the number of records,
+                                              save and load times in seconds and file sizes in MB.
+    """
+    fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+    panels = [
+        ('file_sizes', 'File Size (MB)'),
+        ('save_durations', 'Save Time (seconds)'),
+        ('load_durations', 'Load Time (seconds)'),
+    ]
+
+    for ax, (key, label) in zip(axes, panels):
+        for fmt, data in results.items():
+            ax.plot(data['sizes'], data[key], marker='o', label=fmt, linewidth=2)
+        ax.set_xlabel('Number of Records', fontsize=12)
+        ax.set_ylabel(label, fontsize=12)
+        ax.grid(True, linestyle='--', alpha=0.6)
+        ax.legend()
+
+    fig.suptitle("Flights JSON Format Performance", fontsize=14, weight='bold')
+
+    # Save the plot
+    plt.tight_layout()
+    screenshots_dir = Path(__file__).resolve().parent.parent.parent / 'screenshots'
+    screenshots_dir.mkdir(parents=True, exist_ok=True)
+    plt.savefig(screenshots_dir / "flights_format_performance.png", dpi=150)
+    plt.close()
@@ -70,4 +70,31 @@ def test_save_json(tmp_path, monkeypatch):
     
     # Load the function and test the output
     assert path.exists()
-    assert json.loads(path.read_text()) == data
\ No newline at end of file
+    assert json.loads(path.read_text()) == data
+    
+@pytest.mark.order(55)
+@pytest.mark.parametrize('fmt', ['pretty', 'compact', 'gzip', 'lzma'])
+def test_save_json_formats(tmp_path, monkeypatch, fmt):
+    """
+    Test that every save_json format is loaded back by load_json without being told the format.
+
+    This test verifies that:
+        - The format configured in `app.config.json_format` is used by default
+        - load_json detects the format from the file content
+        - The compact and compressed formats are smaller than the pretty format
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+        fmt (str): The file format under test.
+    """
+    monkeypatch.setattr('app.config.json_format', fmt)
+    path = tmp_path / "data.json"
+    data = [{'Booking_ID': i, 'Client_ID': i % 7, 'End City': 'Paris'} for i in range(100)]
+
+    save_json(path, data)
+    assert load_json(path) == data
+
+    if fmt != 'pretty':
+        save_json(tmp_path / "pretty.json", data, 'pretty')
+        assert path.stat().st_size < (tmp_path / "pretty.json").stat().st_size
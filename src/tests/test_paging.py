@@ -0,0 +1,222 @@
+import asyncio
+import pytest
+import time
+from nicegui import core
+import app.paging as paging
+from app.paging import TablePager, query_rows
+from app.store import Collection, Store
+from tests.utils import generate_test_records
+
+parameters = [10000, 100000, 1000000]
+first_page_times = {}
+
+
+def row(record):
+    """Build a table row from a booking, like the bookings table does."""
+    return {'Booking ID': record['Booking_ID'], 'Client ID': record['Client_ID'], 'End City': record['End City']}
+
+
+@pytest.mark.order(68)
+def test_query_rows(tmp_path):
+    """
+    Test that a page of rows is sliced, sorted and filtered on the server.
+
+    This test verifies that:
+        - Pages are sliced from the collection in insertion order
+        - Sorting orders numbers numerically and text case-insensitively, in both directions
+        - The filter matches any value of a row and the total counts the matching rows only
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    records = [{'Booking_ID': i, 'Client_ID': i % 3, 'End City': city}
+               for i, city in enumerate(['Rome', 'paris', 'Oslo', 'Paris', 'Berlin', 'Rome', 'Lima'] * 3, start=1)]
+    flights = Collection(tmp_path / 'flights.json', 'Booking_ID', records)
+
+    rows, total = query_rows(flights, row, page=2, rows_per_page=5)
+    assert total == 21
+    assert [r['Booking ID'] for r in rows] == [6, 7, 8, 9, 10]
+
+    rows, total = query_rows(flights, row, page=1, rows_per_page=4, sort_by='Booking ID', descending=True)
+    assert [r['Booking ID'] for r in rows] == [21, 20, 19, 18]
+
+    rows, total = query_rows(flights, row, page=1, rows_per_page=3, sort_by='End City')
+    assert [r['End City'] for r in rows] == ['Berlin', 'Berlin', 'Berlin']
+
+    rows, total = query_rows(flights, row, page=2, rows_per_page=4, filter_text='PARIS')
+    assert total == 6
+    assert [r['Booking ID'] for r in rows] == [16, 18]
+
+    rows, total = query_rows([], row, page=3)
+    assert (rows, total) == ([], 0)
+
+
+@pytest.mark.order(69)
+@pytest.mark.parametrize('size', parameters)
+def test_first_page_speed(size, tmp_path):
+    """
+    Performance test for serving the first page of the bookings table.
+
+    This test verifies that:
+        - The first page holds one page of rows regardless of the number of bookings
+        - The time to build it stays flat as the collection grows from 10k to 1M bookings
+
+    Args:
+        size (int): Number of bookings in the collection.
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    flights = Collection(tmp_path / 'flights.json', 'Booking_ID', generate_test_records(size, 'flights'))
+
+    start = time.perf_counter()
+    for _ in range(100):
+        rows, total = query_rows(flights, row, page=1, rows_per_page=10)
+    first_page_times[size] = (time.perf_counter() - start) / 100
+
+    print(f"\n{size:>7} bookings: first page in {first_page_times[size] * 1000:.3f}ms")
+
+    assert len(rows) == 10
+    assert total == size
+    if size == max(parameters):
+        assert first_page_times[size] < first_page_times[min(parameters)] * 5 + 0.001
+
+
+@pytest.mark.order(93)
+def test_sort_keys_build_page_rows_only(tmp_path):
+    """
+    Test that sorting by a column with a sort key builds only the rows of the page.
+
+    This test verifies that:
+        - The page and total are the same as when sorting the rows, in both directions
+        - Only the rows of the requested page are built
+        - A filter, or a column without a sort key, still builds every row
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    records = [{'Booking_ID': i, 'Client_ID': i % 3, 'End City': city}
+               for i, city in enumerate(['Rome', 'paris', 'Oslo', 'Paris', 'Berlin', 'Rome', 'Lima'] * 3, start=1)]
+    flights = Collection(tmp_path / 'flights.json', 'Booking_ID', records)
+    sort_keys = {'Booking ID': lambda r: r['Booking_ID'], 'End City': lambda r: r['End City']}
+    built = []
+
+    def counting_row(record):
+        built.append(record['Booking_ID'])
+        return row(record)
+
+    for sort_by, descending in [('End City', False), ('Booking ID', True)]:
+        built.clear()
+        page = query_rows(flights, counting_row, 2, 4, sort_by, descending, sort_keys=sort_keys)
+        assert len(built) == 4
+        assert page == query_rows(flights, row, 2, 4, sort_by, descending)
+
+    built.clear()
+    query_rows(flights, counting_row, 1, 4, 'Client ID', sort_keys=sort_keys)
+    assert len(built) == 21
+    built.clear()
+    query_rows(flights, counting_row, 1, 4, 'End City', filter_text='rome', sort_keys=sort_keys)
+    assert len(built) == 21
+
+
+class StubTable:
+    """A stand-in for `ui.table` holding just what `TablePager` reads and writes."""
+
+    def __init__(self):
+        self.pagination = {}
+        self.filter = ''
+        self.rows = []
+        self.is_deleted = False
+        self.updates = 0
+
+    def props(self, *args, **kwargs):
+        pass
+
+    def on(self, *args, **kwargs):
+        pass
+
+    def update(self):
+        self.updates += 1
+
+
+@pytest.mark.order(96)
+def test_pager_follows_changes(tmp_path, monkeypatch):
+    """
+    Test that a followed table rebuilds only its visible page, and only as often as needed.
+
+    This test verifies that:
+        - A burst of inserts into a sorted collection causes one rebuild of the page, off the event loop
+        - The rebuild builds the rows of the current page only
+        - Changes made while a page is being built cause one more rebuild, `refresh_delay` later
+        - Renaming a client rebuilds only the visible rows of that client's bookings
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture for patching the pager's delay and page builder.
+    """
+    clients = Collection(tmp_path / 'clients.json', 'ID', [{'ID': i, 'Name': f'Client {i}'} for i in (1, 2, 3)])
+    flights = Collection(tmp_path / 'flights.json', 'Booking_ID',
+                         [{'Booking_ID': i, 'Client_ID': i % 3 + 1, 'End City': f'City {i:03}'} for i in range(1, 101)])
+    store = Store(clients=clients, flights=flights)
+    sort_keys = {'End City': lambda r: r['End City']}
+    built = []
+    builds = []
+    query_page = paging.query_page
+
+    def counting_row(record):
+        built.append(record['Booking_ID'])
+        return {**row(record), 'Client': store.clients.lookup(record['Client_ID'], 'Name')}
+
+    def slow_query_page(*args):
+        start = time.perf_counter()
+        time.sleep(0.05)
+        builds.append(start)
+        return query_page(*args)
+
+    monkeypatch.setattr(paging, 'refresh_delay', 0.3)
+    monkeypatch.setattr(paging, 'query_page', slow_query_page)
+
+    async def settle(pager):
+        while pager._building:
+            await asyncio.sleep(0.01)
+
+    async def main():
+        monkeypatch.setattr(core, 'loop', asyncio.get_running_loop())
+        table = StubTable()
+        pager = TablePager(table, store, 'flights')
+        pager.follow_related(store, 'clients', 'Client_ID')
+        table.pagination['sortBy'] = 'End City'
+        pager.show(store.flights, counting_row, sort_keys)
+        await settle(pager)
+
+        builds.clear()
+        built.clear()
+        for i in range(101, 121):
+            store.flights.insert({'Booking_ID': i, 'Client_ID': i % 3 + 1, 'End City': 'City 000'})
+        await settle(pager)
+        assert len(builds) == 1
+        assert len(built) == 10
+        assert table.pagination['rowsNumber'] == 120
+        assert [r['Booking ID'] for r in table.rows] == list(range(101, 111))
+
+        builds.clear()
+        pager.refresh()
+        await asyncio.sleep(0.02)
+        assert pager._building
+        for i in range(121, 126):
+            store.flights.insert({'Booking_ID': i, 'Client_ID': 2, 'End City': 'City 000'})
+        await settle(pager)
+        assert len(builds) == 2
+        assert builds[1] - builds[0] >= 0.3
+        assert table.pagination['rowsNumber'] == 125
+
+        built.clear()
+        updates = table.updates
+        rows = list(table.rows)
+        store.clients.update(2, {'Name': 'Renamed'})
+        assert table.updates == updates + 1
+        assert sorted(built) == sorted(r['Booking ID'] for r in rows if r['Client ID'] == 2)
+        assert 0 < len(built) < len(rows)
+        for old, new in zip(rows, table.rows):
+            assert new['Client'] == ('Renamed' if old['Client ID'] == 2 else old['Client'])
+        assert len(builds) == 2
+
+    asyncio.run(main())
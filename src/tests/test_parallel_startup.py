@@ -0,0 +1,88 @@
+import pytest
+import gc
+import time
+import app.startup as startup
+from app.store import Collection, load_parallel
+from tests.utils import generate_test_data
+
+files = {'clients': 'ID', 'airlines': 'ID', 'flights': 'Booking_ID', 'available_flights': 'Flight_ID'}
+
+
+@pytest.mark.order(53)
+@pytest.mark.parametrize('processes', [0, 2])
+def test_load_parallel(processes, tmp_path):
+    """
+    Test that collections loaded concurrently match collections loaded one after another.
+
+    The sequential and parallel wall-clock times are printed; the gain depends on the number of
+    cores of the host, so it is not asserted.
+
+    This test verifies that:
+        - Every collection is loaded, with or without parsing in worker processes
+        - The load time of every file is reported
+
+    Args:
+        processes (int): Number of worker processes used for parsing.
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    for name in files:
+        generate_test_data(tmp_path / f'{name}.json', 50000, name)
+
+    start = time.perf_counter()
+    expected = {name: list(Collection.load(tmp_path / f'{name}.json', key)) for name, key in files.items()}
+    sequential_time = time.perf_counter() - start
+
+    collections = {name: Collection(tmp_path / f'{name}.json', key) for name, key in files.items()}
+    start = time.perf_counter()
+    timings = load_parallel(list(collections.values()), processes)
+    parallel_time = time.perf_counter() - start
+
+    print(f'\nprocesses={processes}: sequential {sequential_time:.3f}s, parallel {parallel_time:.3f}s, '
+          + ', '.join(f'{name} {seconds:.3f}s' for name, seconds in timings.items()))
+
+    assert set(timings) == {f'{name}.json' for name in files}
+    for name, collection in collections.items():
+        assert collection.loaded
+        assert list(collection) == expected[name]
+
+
+@pytest.mark.order(54)
+def test_warm_up_checks_references(tmp_path, monkeypatch):
+    """
+    Test that the warm-up hook reports references to missing clients and airlines.
+
+    This test verifies that:
+        - The references are checked after all four collections are loaded
+        - Bookings and available flights pointing at missing records are reported
+        - Per-file and total load times are returned
+        - The garbage collector is not frozen as a side effect
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr(startup.store, 'clients', Collection(tmp_path / 'clients.json', 'ID', [{'ID': 1}]))
+    monkeypatch.setattr(startup.store, 'airlines', Collection(tmp_path / 'airlines.json', 'ID', [{'ID': 1}]))
+    monkeypatch.setattr(startup.store, 'flights', Collection(tmp_path / 'flights.json', 'Booking_ID', [
+        {'Booking_ID': 1, 'Client_ID': 1, 'Airline_ID': 1},
+        {'Booking_ID': 2, 'Client_ID': 2, 'Airline_ID': 1},
+        {'Booking_ID': 3, 'Client_ID': 2, 'Airline_ID': 3},
+    ], indexes=('Client_ID', 'Airline_ID')))
+    monkeypatch.setattr(startup.store, 'available_flights', Collection(
+        tmp_path / 'available_flights.json', 'Flight_ID', [
+            {'Flight_ID': 1, 'Airline_ID': 1},
+            {'Flight_ID': 2, 'Airline_ID': 4},
+        ]))
+
+    frozen = gc.get_freeze_count()
+    report = startup.warm_up()
+    # Freezing the garbage collector is left to the server, see `freeze_loaded_records`
+    assert gc.get_freeze_count() == frozen
+
+    assert report['problems'] == [
+        '2 booking(s) refer to missing client 2',
+        '1 booking(s) refer to missing airline 3',
+        'Available flight 2 refers to missing airline 4',
+    ]
+    assert len(report['files']) == 4
+    assert report['total'] >= max(report['files'].values())
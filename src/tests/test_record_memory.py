@@ -0,0 +1,56 @@
+import pytest
+import tracemalloc
+from app.records import Client, Airline, Booking, AvailableFlight
+from tests.utils import generate_test_records
+
+record_types = {'clients': Client, 'flights': Booking, 'airlines': Airline, 'available_flights': AvailableFlight}
+size = 100000
+
+
+def measure(build):
+    """
+    Return the memory in bytes that remains allocated by the object built by `build`.
+
+    Args:
+        build (Callable): Builds the object to measure.
+
+    Returns:
+        int: The allocated size in bytes.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return allocated
+
+
+@pytest.mark.order(65)
+@pytest.mark.parametrize('template_type', record_types)
+def test_record_memory(template_type):
+    """
+    Memory benchmark comparing record dicts with slotted records, per 100k records.
+
+    The field values are shared between both variants, so only the cost of the record
+    containers themselves is compared. It verifies that:
+        - The slotted records hold the same data as the dicts
+        - They use considerably less memory than the dicts
+
+    Args:
+        template_type (str): One of 'clients', 'flights', 'airlines' or 'available_flights'.
+    """
+    records = generate_test_records(size, template_type)
+    record_type = record_types[template_type]
+
+    dict_bytes = measure(lambda: [dict(r) for r in records])
+    slotted_bytes = measure(lambda: [record_type.from_dict(r) for r in records])
+
+    print(f"\n{template_type:>17}: dicts {dict_bytes / 1024 ** 2:.1f}MB, "
+          f"records {slotted_bytes / 1024 ** 2:.1f}MB per {size} records "
+          f"({slotted_bytes / dict_bytes:.0%})")
+
+    assert record_type.from_dict(records[-1]) == records[-1]
+    assert slotted_bytes < dict_bytes * 0.6
@@ -0,0 +1,84 @@
+import pytest
+import json
+from app.records import Client, Booking, ValuePool
+from app.store import Collection
+
+
+@pytest.mark.order(63)
+def test_record_behaves_like_dict():
+    """
+    Test that a slotted record can be used wherever a record dict was used.
+
+    This test verifies that:
+        - Fields are read, written and deleted like dict keys
+        - Fields that were never set are missing, and unknown fields are kept
+        - `copy` returns a plain dict, and records compare equal to the equivalent dict
+    """
+    data = {'Name': 'Ann', 'City': 'Paris', 'ID': 1, 'Type': 'Client', 'Nickname': 'A'}
+    client = Client.from_dict(data)
+
+    assert client['Name'] == 'Ann'
+    assert client.get('State', '') == ''
+    assert 'State' not in client
+    assert client == data
+    assert list(client) == ['Name', 'City', 'ID', 'Type', 'Nickname']
+
+    client.update({'City': 'Rome', 'State': None})
+    assert client['State'] is None
+    del client['Nickname']
+    with pytest.raises(KeyError):
+        client['Nickname']
+
+    copy = client.copy()
+    assert type(copy) is dict
+    assert copy == {'Name': 'Ann', 'City': 'Rome', 'State': None, 'ID': 1, 'Type': 'Client'}
+
+
+@pytest.mark.order(64)
+def test_collection_stores_records(tmp_path, monkeypatch):
+    """
+    Test that a collection with a record type converts records at the JSON boundary.
+
+    This test verifies that:
+        - Loaded and inserted records are stored as the record type
+        - The data file is written as plain JSON objects
+        - Indexes and updates work on the stored records
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'json')
+    path = tmp_path / 'flights.json'
+    path.write_text(json.dumps([{'Booking_ID': 1, 'Client_ID': 1, 'Airline_ID': 1, 'End City': 'Paris'}]))
+
+    flights = Collection.load(path, 'Booking_ID', indexes=('Client_ID',), record_type=Booking)
+    flights.insert({'Booking_ID': 2, 'Client_ID': 1, 'Airline_ID': 2, 'End City': 'Rome'})
+    flights.update(1, {'Client_ID': 2})
+
+    assert all(type(f) is Booking for f in flights)
+    assert [f['Booking_ID'] for f in flights.find('Client_ID', 2)] == [1]
+    assert json.loads(path.read_text()) == [
+        {'Booking_ID': 1, 'Client_ID': 2, 'Airline_ID': 1, 'End City': 'Paris'},
+        {'Booking_ID': 2, 'Client_ID': 1, 'Airline_ID': 2, 'End City': 'Rome'},
+    ]
+
+
+@pytest.mark.order(67)
+def test_repeated_values_are_shared():
+    """
+    Test that values of dictionary-encoded fields are shared between records.
+
+    This test verifies that:
+        - Equal cities loaded or edited into different records are the same object
+        - A pool stops taking new values at its limit, without changing any value
+    """
+    first = Booking.from_dict({'Booking_ID': 1, 'End City': ''.join(['Par', 'is'])})
+    second = Booking.from_dict({'Booking_ID': 2, 'End City': 'Rome'})
+    second['End City'] = ''.join(['Pa', 'ris'])
+    assert first['End City'] is second['End City']
+
+    pool = ValuePool(limit=2)
+    values = [pool.share(f'City {i}') for i in range(5)]
+    assert values == [f'City {i}' for i in range(5)]
+    assert len(pool.values) == 2
@@ -0,0 +1,117 @@
+import pytest
+import time
+from app.selectors import search_options
+from app.store import Collection, Transaction
+from tests.utils import generate_test_records
+
+
+def label(client):
+    """Build the option label of a client, like the client selectors do."""
+    return f"{client['Name']} {int(client['ID']):09d}"
+
+
+@pytest.mark.order(71)
+def test_search_options(tmp_path):
+    """
+    Test that the selector options are searched on the server and limited to the top matches.
+
+    This test verifies that:
+        - Without a search text the first records are offered
+        - A typed ID finds its record first, also when typed zero-padded
+        - Names match when each typed word starts one of their words, ignoring case, and the
+          matches stop at the limit
+        - Digits that are not decimal digits, e.g. '²', are searched as text instead of failing
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    clients = Collection(tmp_path / 'clients.json', 'ID', generate_test_records(50, 'clients'), search_fields=('Name',))
+
+    assert list(search_options(clients, label, '', limit=3)) == [1, 2, 3]
+
+    options = search_options(clients, label, '000000042', limit=5)
+    assert list(options) == [42]
+    assert options[42] == 'Test Name 42 000000042'
+
+    assert list(search_options(clients, label, '4', limit=4)) == [4, 40, 41, 42]
+    assert list(search_options(clients, label, 'NAME 1', limit=20)) == [1] + list(range(10, 20))
+    assert list(search_options(clients, label, '2 tes', limit=20)) == [2] + list(range(20, 30))
+    assert search_options(clients, label, 'ame') == {}
+    assert search_options(clients, label, 'nobody') == {}
+    assert search_options(clients, label, '²') == {} and search_options(clients, label, '①') == {}
+
+
+@pytest.mark.order(72)
+def test_search_options_speed(tmp_path):
+    """
+    Performance test for searching the options of a selector over 100k clients.
+
+    This test verifies that:
+        - A search returns at most the limit, however many clients match
+        - Searching a name that matches many clients, or none, is answered from the word index
+          in a few milliseconds, without a scan
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    clients = Collection(tmp_path / 'clients.json', 'ID', generate_test_records(100000, 'clients'),
+                         search_fields=('Name',))
+
+    start = time.perf_counter()
+    options = search_options(clients, label, 'test name')
+    first_match_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    missing = search_options(clients, label, 'zzz')
+    no_match_time = time.perf_counter() - start
+
+    print(f"\n100000 clients: top matches in {first_match_time * 1000:.3f}ms, "
+          f"no match in {no_match_time * 1000:.3f}ms")
+
+    assert len(options) == 20
+    assert missing == {}
+    assert first_match_time < 0.05
+    assert no_match_time < 0.005
+
+
+@pytest.mark.order(94)
+def test_search_index_follows_changes(tmp_path, monkeypatch):
+    """
+    Test that the word index searched by the selectors follows every change of the collection.
+
+    This test verifies that:
+        - Inserted records are found, also when inserted in bulk, and deleted ones no longer are
+        - A renamed record is found by its new name only, also after its ID changed
+        - A rolled back transaction leaves the index as it was
+        - The indexed words stay sorted and hold no empty buckets
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr('app.store.persist_changes', lambda *args: None)
+    clients = Collection(tmp_path / 'clients.json', 'ID', [{'ID': 1, 'Name': 'Ann Smith'}, {'ID': 2, 'Name': 'Bob'}],
+                         search_fields=('Name',))
+
+    def found(text):
+        return [c['ID'] for c in clients.search(text, 10)]
+
+    assert found('SMI') == [1] and found('ann smith') == [1] and found('ann bob') == []
+    clients.insert({'ID': 3, 'Name': 'Annie Hall'})
+    clients.insert_many([{'ID': 4, 'Name': 'Cid Annan'}, {'ID': 5, 'Name': 'Zoe'}])
+    assert found('ann') == [1, 4, 3] and found('zo') == [5]
+
+    clients.update(1, {'Name': 'Ada Smith'})
+    clients.update(2, {'ID': 7})
+    assert found('ann') == [4, 3] and found('ada') == [1] and [c['ID'] for c in clients.search('bob', 10)] == [7]
+    clients.delete([3, 5])
+    assert found('ann') == [4] and found('zoe') == []
+
+    with pytest.raises(ZeroDivisionError):
+        with Transaction(clients):
+            clients.update(4, {'Name': 'Dan'})
+            clients.delete([1])
+            clients.insert_many([{'ID': 8, 'Name': 'Eve'}])
+            1 / 0
+    assert found('ann') == [4] and found('ada') == [1] and found('dan') == [] and found('eve') == []
+    assert clients.sorted_words == sorted(clients.words) and all(clients.words.values())
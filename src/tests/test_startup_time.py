@@ -0,0 +1,57 @@
+import pytest
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from tests.utils import generate_test_data
+
+parameters = [20000, 60000, 100000]
+startup_results = {}
+
+# Imports the app with NiceGUI already loaded, so only the cost of app.startup itself is measured
+measure_script = '''
+import json, time
+import nicegui
+start = time.perf_counter()
+import app.startup
+imported = time.perf_counter()
+app.startup.warm_up()
+warmed_up = time.perf_counter()
+print(json.dumps({'import': imported - start, 'warm_up': warmed_up - imported}))
+'''
+
+
+@pytest.mark.order(52)
+@pytest.mark.parametrize('size', parameters)
+def test_startup_time(size, tmp_path):
+    """
+    Performance test for the import time of the application and the time of the warm-up hook.
+
+    This test generates data files of a varying number of records and imports `app.startup`
+    in a fresh interpreter pointed at them. It verifies that:
+        - Importing the application does not load the data files, so its time stays constant
+        - The data is loaded by the explicit warm-up hook instead
+
+    Args:
+        size (int): Number of clients and bookings in the data files.
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    for template_type in ['clients', 'flights', 'airlines', 'available_flights']:
+        generate_test_data(tmp_path / f'{template_type}.json', size, template_type)
+
+    result = subprocess.run(
+        [sys.executable, '-c', measure_script],
+        cwd=Path(__file__).resolve().parent.parent,
+        env={**os.environ, 'FLYGUY_DATA_DIR': str(tmp_path)},
+        capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    startup_results[size] = timings
+    print(f"\n{size:>6} records: import {timings['import']:.3f}s, warm-up {timings['warm_up']:.3f}s")
+
+    if size == max(parameters):
+        smallest = startup_results[min(parameters)]
+        # Import time must not grow with the dataset, while the warm-up does the loading
+        assert timings['import'] < smallest['import'] * 3 + 0.05
+        assert timings['warm_up'] > timings['import']
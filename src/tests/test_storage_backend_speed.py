@@ -0,0 +1,49 @@
+import pytest
+import time
+from app.store import Collection
+from tests.utils import generate_test_data
+
+backends = ['json', 'sqlite']
+parameters = [20000, 40000, 60000, 80000, 100000]
+writes = 3
+
+
+@pytest.mark.order(51)
+@pytest.mark.parametrize('backend', backends)
+@pytest.mark.parametrize('size', parameters)
+def test_storage_backend_speed(size, backend, tmp_path, monkeypatch):
+    """
+    Performance test comparing the JSON and SQLite storage backends.
+
+    For booking files of 20k to 100k records this test benchmarks, per backend:
+        - The time to load the collection (for SQLite, once the JSON file has been imported)
+        - The average time to persist one insert, one update and one delete
+
+    It verifies that the persisted collection matches the in-memory one after the writes.
+
+    Args:
+        size (int): Number of bookings in the data file.
+        backend (str): The storage mode to benchmark.
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr('app.config.storage_mode', backend)
+    path = tmp_path / 'flights.json'
+    generate_test_data(path, size, 'flights')
+    Collection.load(path, 'Booking_ID')
+
+    start = time.perf_counter()
+    flights = Collection.load(path, 'Booking_ID')
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(writes):
+        booking_id = flights.next_id()
+        flights.insert({'Booking_ID': booking_id, 'Client_ID': 1, 'Airline_ID': 1, 'Type': 'Flight'})
+        flights.update(booking_id, {'End City': 'Paris'})
+        flights.delete([booking_id - size])
+    write_time = (time.perf_counter() - start) / (writes * 3)
+
+    print(f'\n{backend:>6} {size:>6} bookings: load {load_time:.3f}s, write {write_time * 1000:.2f}ms')
+
+    assert list(Collection.load(path, 'Booking_ID')) == list(flights)
@@ -0,0 +1,143 @@
+import pytest
+import json
+from app.storage import (load_records, persist_changes, journal_entry, journal_path, compact_journal)
+
+
+@pytest.fixture
+def journal_mode(monkeypatch):
+    """
+    Switch the storage layer into 'journal' mode for the duration of a test.
+
+    Args:
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'journal')
+    monkeypatch.setattr('app.config.journal_compact_threshold', 1000)
+
+
+@pytest.mark.order(35)
+def test_journal_append_and_replay(tmp_path, journal_mode):
+    """
+    Test that inserts, updates and deletes are appended to the journal and replayed on load.
+
+    This test verifies that:
+        - The snapshot file is not rewritten while changes are journaled
+        - Each change is stored as one JSON Lines entry
+        - Loading the collection applies the journal on top of the snapshot
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        journal_mode: Fixture switching the storage mode to 'journal'.
+    """
+    path = tmp_path / 'flights.json'
+    flights = [{'Booking_ID': 1, 'End City': 'Paris'}, {'Booking_ID': 2, 'End City': 'Rome'}]
+    path.write_text(json.dumps(flights))
+    snapshot = path.read_text()
+
+    new_flight = {'Booking_ID': 3, 'End City': 'Oslo'}
+    flights.append(new_flight)
+    persist_changes(path, 'Booking_ID', flights, [journal_entry('insert', new_flight)])
+
+    flights[0]['End City'] = 'Berlin'
+    persist_changes(path, 'Booking_ID', flights, [journal_entry('update', flights[0], key=1)])
+
+    flights.pop(1)
+    persist_changes(path, 'Booking_ID', flights, [journal_entry('delete', key=2)])
+
+    assert path.read_text() == snapshot
+    assert len(journal_path(path).read_text().splitlines()) == 3
+    assert load_records(path, 'Booking_ID') == [
+        {'Booking_ID': 1, 'End City': 'Berlin'},
+        {'Booking_ID': 3, 'End City': 'Oslo'},
+    ]
+
+
+@pytest.mark.order(36)
+def test_journal_update_with_changed_key(tmp_path, journal_mode):
+    """
+    Test that an update which changes the record ID replaces the record stored under the old ID.
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        journal_mode: Fixture switching the storage mode to 'journal'.
+    """
+    path = tmp_path / 'flights.json'
+    flight = {'Booking_ID': 1, 'End City': 'Paris'}
+    path.write_text(json.dumps([flight]))
+
+    flight['Booking_ID'] = 7
+    persist_changes(path, 'Booking_ID', [flight], [journal_entry('update', flight, key=1)])
+
+    assert load_records(path, 'Booking_ID') == [{'Booking_ID': 7, 'End City': 'Paris'}]
+
+
+@pytest.mark.order(37)
+def test_journal_compaction(tmp_path, monkeypatch, journal_mode):
+    """
+    Test that the journal is compacted into the snapshot once it reaches the threshold.
+
+    This test verifies that:
+        - The journal is removed after compaction
+        - The snapshot contains all changes made so far
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+        journal_mode: Fixture switching the storage mode to 'journal'.
+    """
+    monkeypatch.setattr('app.config.journal_compact_threshold', 5)
+    path = tmp_path / 'clients.json'
+    clients = load_records(path, 'ID')
+
+    for i in range(1, 5):
+        clients.append({'ID': i})
+        persist_changes(path, 'ID', clients, [journal_entry('insert', clients[-1])])
+    assert journal_path(path).exists()
+    assert not path.exists()
+
+    clients.append({'ID': 5})
+    persist_changes(path, 'ID', clients, [journal_entry('insert', clients[-1])])
+    assert not journal_path(path).exists()
+    assert json.loads(path.read_text()) == [{'ID': i} for i in range(1, 6)]
+
+
+@pytest.mark.order(38)
+def test_journal_replay_is_idempotent(tmp_path, journal_mode):
+    """
+    Test that a journal left behind by an interrupted compaction replays harmlessly.
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        journal_mode: Fixture switching the storage mode to 'journal'.
+    """
+    path = tmp_path / 'airlines.json'
+    airlines = [{'ID': 1, 'Company Name': 'Air'}]
+    persist_changes(path, 'ID', airlines, [journal_entry('insert', airlines[0])])
+    journal = journal_path(path).read_text()
+
+    # Simulate a crash after the snapshot was written but before the journal was removed
+    compact_journal(path, airlines)
+    journal_path(path).write_text(journal)
+
+    assert load_records(path, 'ID') == airlines
+
+
+@pytest.mark.order(39)
+def test_json_mode_rewrites_snapshot(tmp_path, monkeypatch):
+    """
+    Test that the default 'json' storage mode rewrites the snapshot and folds any leftover journal.
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'json')
+    path = tmp_path / 'clients.json'
+    journal_path(path).write_text(json.dumps({'op': 'insert', 'record': {'ID': 1}}) + '\n')
+
+    clients = load_records(path, 'ID')
+    clients.append({'ID': 2})
+    persist_changes(path, 'ID', clients, [journal_entry('insert', clients[-1])])
+
+    assert not journal_path(path).exists()
+    assert json.loads(path.read_text()) == [{'ID': 1}, {'ID': 2}]
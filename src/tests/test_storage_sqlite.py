@@ -0,0 +1,77 @@
+import pytest
+import json
+from app.storage import sqlite_connection, sqlite_export
+from app.store import Collection
+
+
+@pytest.fixture
+def sqlite_mode(monkeypatch):
+    """
+    Switch the storage layer to the SQLite backend for the duration of a test.
+
+    Args:
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'sqlite')
+
+
+@pytest.mark.order(49)
+def test_sqlite_imports_json_on_first_load(tmp_path, sqlite_mode):
+    """
+    Test that a collection is imported from its JSON file the first time it is loaded.
+
+    This test verifies that:
+        - The records of the JSON file are loaded in their original order
+        - The table has indexes on the foreign key columns
+        - Later changes to the JSON file are not imported again
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        sqlite_mode: Fixture switching the storage mode to 'sqlite'.
+    """
+    path = tmp_path / 'flights.json'
+    records = [{'Booking_ID': 2, 'Client_ID': 1, 'Airline_ID': 1}, {'Booking_ID': 1, 'Client_ID': 2, 'Airline_ID': 1}]
+    path.write_text(json.dumps(records))
+
+    assert list(Collection.load(path, 'Booking_ID')) == records
+
+    indexes = {row[1] for row in sqlite_connection(path).execute('PRAGMA index_list("flights")')}
+    assert {'flights_client_id', 'flights_airline_id'} <= indexes
+
+    path.write_text('[]')
+    assert list(Collection.load(path, 'Booking_ID')) == records
+
+
+@pytest.mark.order(50)
+def test_sqlite_crud_round_trip(tmp_path, sqlite_mode):
+    """
+    Test that inserts, updates and deletes are stored in SQLite and survive a reload.
+
+    This test verifies that:
+        - The JSON file is not rewritten by changes
+        - An edited record keeps its position, even when its ID changes
+        - Deleting every record does not cause the JSON file to be imported again
+        - The collection can be exported back to JSON
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        sqlite_mode: Fixture switching the storage mode to 'sqlite'.
+    """
+    path = tmp_path / 'clients.json'
+    path.write_text(json.dumps([{'ID': 1, 'Name': 'Ann'}, {'ID': 2, 'Name': 'Bob'}]))
+    snapshot = path.read_text()
+
+    clients = Collection.load(path, 'ID')
+    clients.insert({'ID': 3, 'Name': 'Cid'})
+    clients.update(1, {'ID': 10, 'Name': 'Ada'})
+    clients.delete([2])
+    assert path.read_text() == snapshot
+
+    reloaded = Collection.load(path, 'ID')
+    assert list(reloaded) == [{'ID': 10, 'Name': 'Ada'}, {'ID': 3, 'Name': 'Cid'}]
+
+    assert sqlite_export(path) == 2
+    assert json.loads(path.read_text()) == list(reloaded)
+
+    reloaded.delete([10, 3])
+    assert list(Collection.load(path, 'ID')) == []
@@ -0,0 +1,437 @@
+import pytest
+import json
+import time
+import asyncio
+import threading
+import weakref
+import gc
+from concurrent.futures import ThreadPoolExecutor
+from app.store import Collection, ConflictError, Store
+
+
+@pytest.fixture
+def collection(tmp_path):
+    """
+    Pytest fixture that provides a small flight collection persisted to a temporary file.
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+
+    Returns:
+        Collection: The collection with three bookings.
+    """
+    records = [
+        {'Booking_ID': 1, 'Client_ID': 1, 'Airline_ID': 1, 'End City': 'Paris'},
+        {'Booking_ID': 2, 'Client_ID': 1, 'Airline_ID': 2, 'End City': 'Rome'},
+        {'Booking_ID': 3, 'Client_ID': 2, 'Airline_ID': 2, 'End City': 'Oslo'},
+    ]
+    return Collection(tmp_path / 'flights.json', 'Booking_ID', records, indexes=('Client_ID', 'Airline_ID'))
+
+
+@pytest.mark.order(40)
+def test_collection_lookup(collection):
+    """
+    Test that records are found by ID regardless of whether the ID is given as int or string.
+
+    Args:
+        collection (Collection): The sample collection.
+    """
+    assert collection.get(2)['End City'] == 'Rome'
+    assert collection.get(' 2 ')['End City'] == 'Rome'
+    assert collection.get('4') is None
+    assert len(collection) == 3
+    assert [f['Booking_ID'] for f in collection] == [1, 2, 3]
+
+
+@pytest.mark.order(41)
+def test_collection_insert_update_delete(collection):
+    """
+    Test that the primary key index is maintained and every change is persisted.
+
+    This test verifies that:
+        - Inserted records can be looked up and duplicate IDs are rejected
+        - Updating the ID re-keys the record without changing its position
+        - Deleted records can no longer be looked up
+        - The JSON file matches the in-memory collection after each change
+
+    Args:
+        collection (Collection): The sample collection.
+    """
+    collection.insert({'Booking_ID': 4, 'Client_ID': 3, 'Airline_ID': 1, 'End City': 'Lima'})
+    assert collection.get(4)['End City'] == 'Lima'
+    with pytest.raises(ValueError):
+        collection.insert({'Booking_ID': 4})
+
+    collection.update(1, {'Booking_ID': 10, 'End City': 'Nice'})
+    assert collection.get(1) is None
+    assert collection.get(10)['End City'] == 'Nice'
+    assert [f['Booking_ID'] for f in collection] == [10, 2, 3, 4]
+    with pytest.raises(ValueError):
+        collection.update(10, {'Booking_ID': 2})
+
+    removed = collection.delete([2, 99])
+    assert [f['Booking_ID'] for f in removed] == [2]
+    assert collection.get(2) is None
+
+    assert json.loads(collection.path.read_text()) == list(collection)
+
+
+@pytest.mark.order(42)
+def test_collection_secondary_indexes(collection):
+    """
+    Test that the Client_ID and Airline_ID indexes stay correct through inserts, edits and deletes.
+
+    This test verifies that:
+        - Bookings are found by client and by airline
+        - Changing a booking's Client_ID or Airline_ID moves it to the new index entry
+        - Changing a booking's ID keeps it in its index entries under the new ID
+        - Deleted bookings disappear from the indexes
+
+    Args:
+        collection (Collection): The sample collection.
+    """
+    def ids(records):
+        return sorted(r['Booking_ID'] for r in records)
+
+    assert ids(collection.find('Client_ID', 1)) == [1, 2]
+    assert ids(collection.find('Airline_ID', '2')) == [2, 3]
+
+    collection.insert({'Booking_ID': 4, 'Client_ID': 2, 'Airline_ID': 1})
+    assert ids(collection.find('Client_ID', 2)) == [3, 4]
+
+    collection.update(2, {'Client_ID': 2, 'Airline_ID': 1})
+    assert ids(collection.find('Client_ID', 1)) == [1]
+    assert ids(collection.find('Client_ID', 2)) == [2, 3, 4]
+    assert ids(collection.find('Airline_ID', 2)) == [3]
+
+    collection.update(3, {'Booking_ID': 30})
+    assert ids(collection.find('Client_ID', 2)) == [2, 4, 30]
+
+    collection.delete([f['Booking_ID'] for f in collection.find('Airline_ID', 1)])
+    assert ids(collection) == [30]
+    assert collection.find('Client_ID', 1) == []
+    assert ids(collection.find('Client_ID', 2)) == [30]
+
+
+@pytest.mark.order(43)
+def test_collection_lookup_field(tmp_path):
+    """
+    Test that related records are resolved by ID for display, with a default for missing ones.
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    airlines = Collection(tmp_path / 'airlines.json', 'ID', [{'ID': 1, 'Company Name': 'Air'}, {'ID': '4'}])
+
+    assert airlines.lookup(1, 'Company Name') == 'Air'
+    assert airlines.lookup('1', 'Company Name') == 'Air'
+    assert airlines.lookup(4, 'Company Name', 'N/A') == 'N/A'
+    assert airlines.lookup(9, 'Company Name', 'N/A') == 'N/A'
+
+
+@pytest.mark.order(45)
+def test_collection_composite_index(collection):
+    """
+    Test that a composite (Client_ID, Airline_ID) index finds bookings with a single lookup.
+
+    This test verifies that:
+        - Bookings are found by the combination of client and airline
+        - IDs typed into the UI as strings match the integer IDs stored in the records
+        - The index follows edits of either field
+
+    Args:
+        collection (Collection): The sample collection.
+    """
+    composite = ('Client_ID', 'Airline_ID')
+    collection = Collection(collection.path, 'Booking_ID', list(collection), indexes=(composite,))
+
+    assert [f['Booking_ID'] for f in collection.find(composite, (1, 2))] == [2]
+    assert [f['Booking_ID'] for f in collection.find(composite, ('1', ' 1'))] == [1]
+    assert collection.find(composite, ('2', '1')) == []
+
+    collection.update(3, {'Airline_ID': 1})
+    assert [f['Booking_ID'] for f in collection.find(composite, (2, 1))] == [3]
+    assert collection.find(composite, (2, 2)) == []
+
+
+@pytest.mark.order(47)
+def test_id_sequence_restored_at_startup(tmp_path):
+    """
+    Test that ID sequences are persisted and restored correctly when the collection is reloaded.
+
+    This test verifies that:
+        - A new sequence continues after the highest existing ID
+        - IDs of deleted records are not handed out again after a reload
+        - A missing sequence file falls back to the highest existing ID
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    path = tmp_path / 'clients.json'
+    path.write_text(json.dumps([{'ID': 1}, {'ID': 7}]))
+
+    clients = Collection.load(path, 'ID')
+    assert clients.next_id() == 8
+    new_id = clients.next_id()
+    clients.insert({'ID': new_id})
+    clients.delete([new_id])
+
+    assert Collection.load(path, 'ID').next_id() == 10
+
+    path.with_suffix('.seq').unlink()
+    assert Collection.load(path, 'ID').next_id() == 8
+
+
+@pytest.mark.order(48)
+def test_concurrent_creates_get_unique_ids(tmp_path, monkeypatch):
+    """
+    Test that concurrent creates never receive the same ID.
+
+    Several threads allocate IDs and insert records into the same collection at once.
+    This test verifies that:
+        - Every allocated ID is unique and every insert succeeds
+        - The persisted collection contains every created record
+        - The reloaded sequence continues after the last allocated ID
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'journal')
+    path = tmp_path / 'flights.json'
+    flights = Collection.load(path, 'Booking_ID', indexes=('Client_ID',))
+    threads, creates = 8, 250
+
+    def create_many(client_id):
+        ids = []
+        for _ in range(creates):
+            booking_id = flights.next_id()
+            flights.insert({'Booking_ID': booking_id, 'Client_ID': client_id})
+            ids.append(booking_id)
+        return ids
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        allocated = [i for ids in pool.map(create_many, range(threads)) for i in ids]
+
+    assert len(allocated) == len(set(allocated)) == threads * creates
+    assert all(len(flights.find('Client_ID', c)) == creates for c in range(threads))
+
+    reloaded = Collection.load(path, 'Booking_ID')
+    assert sorted(f['Booking_ID'] for f in reloaded) == sorted(allocated)
+    assert reloaded.next_id() == threads * creates + 1
+
+
+@pytest.mark.order(70)
+def test_collection_change_listeners(collection):
+    """
+    Test that listeners are told about every change, so views can apply it instead of reloading.
+
+    This test verifies that:
+        - Inserts, updates and deletes are reported with the affected records and their keys
+        - An update that changes the ID reports the previous key
+        - A cascade delete of several records is reported with a single call
+        - Unchanged edits and deletes of missing records are not reported
+        - Unsubscribed listeners are no longer called
+
+    Args:
+        collection (Collection): The sample collection.
+    """
+    changes = []
+    listener = collection.subscribe(lambda op, records, keys: changes.append((op, [dict(r) for r in records], keys)))
+
+    collection.insert({'Booking_ID': 4, 'Client_ID': 3})
+    collection.update(4, {'Booking_ID': 5})
+    collection.update(5, {'Booking_ID': 5})
+    collection.delete([1, 2, 99])
+    collection.delete([99])
+
+    assert changes == [
+        ('insert', [{'Booking_ID': 4, 'Client_ID': 3}], ['4']),
+        ('update', [{'Booking_ID': 5, 'Client_ID': 3}], ['4']),
+        ('delete', [
+            {'Booking_ID': 1, 'Client_ID': 1, 'Airline_ID': 1, 'End City': 'Paris'},
+            {'Booking_ID': 2, 'Client_ID': 1, 'Airline_ID': 2, 'End City': 'Rome'},
+        ], ['1', '2']),
+    ]
+
+    collection.unsubscribe(listener)
+    collection.delete([3])
+    assert len(changes) == 3
+
+
+@pytest.mark.order(75)
+def test_listeners_run_on_their_event_loop(collection):
+    """
+    Test that a listener subscribed with an event loop is called on that loop.
+
+    This test verifies that:
+        - A change made in a worker thread is handed to the loop instead of running in the thread
+        - A change made on the loop itself calls the listener directly
+
+    Args:
+        collection (Collection): The sample collection.
+    """
+    calls = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        collection.subscribe(lambda op, records, keys: calls.append((op, keys, threading.current_thread())),
+                             loop=loop)
+        await loop.run_in_executor(None, collection.delete, [1])
+        await asyncio.sleep(0)
+        collection.delete([2])
+
+    asyncio.run(main())
+
+    assert [(op, keys) for op, keys, _ in calls] == [('delete', ['1']), ('delete', ['2'])]
+    assert all(thread is threading.main_thread() for _, _, thread in calls)
+
+
+@pytest.mark.order(78)
+def test_store_serves_current_collections(tmp_path):
+    """
+    Test that the store hands out the collections it currently holds.
+
+    This test verifies that:
+        - A replaced collection is served at once, and is freed once nothing else refers to it
+        - Listeners following a collection by its name are told about the replacement and
+          follow the new collection from then on
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    clients = Collection(tmp_path / 'clients.json', 'ID', [{'ID': 1, 'Name': 'Ann'}])
+    collection = Collection(tmp_path / 'flights.json', 'Booking_ID', [{'Booking_ID': 1}, {'Booking_ID': 2}])
+    store = Store(clients=clients, flights=collection)
+    assert store.collections() == [clients, collection]
+    changes = []
+    store.subscribe('flights', lambda op, records, keys: changes.append((op, keys)))
+
+    store.flights.delete([1])
+
+    reloaded = Collection(tmp_path / 'flights.json', 'Booking_ID', [{'Booking_ID': 9, 'Client_ID': 1}])
+    assert store.replace('flights', reloaded) is collection
+    assert store.flights is reloaded
+    collection.delete([2])
+    reloaded.delete([9])
+    assert changes == [('delete', ['1']), ('replace', []), ('delete', ['9'])]
+
+    replaced = weakref.ref(collection)
+    del collection
+    gc.collect()
+    assert replaced() is None
+
+
+@pytest.mark.order(81)
+def test_update_checks_version(collection):
+    """
+    Test that an update made from an outdated version of a record is refused.
+
+    This test verifies that:
+        - Every update gives the record a new version, also when its ID changes
+        - An update from the current version succeeds, one from an older version raises a
+          ConflictError and leaves the record as it is
+        - Saving a record that was deleted meanwhile raises a KeyError
+
+    Args:
+        collection (Collection): The sample collection.
+    """
+    opened = collection.version(1)
+    assert opened == 0
+    collection.update(1, {'End City': 'Lima'}, version=opened)
+    with pytest.raises(ConflictError):
+        collection.update(1, {'End City': 'Oslo'}, version=opened)
+    assert collection.get(1)['End City'] == 'Lima'
+
+    current = collection.version(1)
+    collection.update(1, {'Booking_ID': 7}, version=current)
+    assert collection.version(7) not in (0, current)
+    with pytest.raises(KeyError):
+        collection.update(1, {'End City': 'Oslo'}, version=current)
+
+    opened = collection.version(2)
+    collection.delete([2])
+    with pytest.raises(KeyError):
+        collection.update(2, {'End City': 'Oslo'}, version=opened)
+
+
+@pytest.mark.order(82)
+def test_concurrent_edits_lose_no_update(collection):
+    """
+    Stress test for concurrent edits of the same record.
+
+    Several threads repeatedly read a counter and save it incremented, retrying after a
+    conflict, like agents saving an edit dialog. It verifies that:
+        - No increment is lost: the counter equals the number of successful saves
+        - Conflicts were actually detected while the threads raced
+        - Reading a version costs a small fraction of an update
+
+    Args:
+        collection (Collection): The sample collection.
+    """
+    collection.update(1, {'Count': 0})
+    saves = 200
+    conflicts = []
+
+    def edit(_):
+        done = 0
+        while done < saves:
+            version = collection.version(1)
+            count = collection.get(1)['Count']
+            time.sleep(0)
+            try:
+                collection.update(1, {'Count': count + 1}, version=version)
+                done += 1
+            except ConflictError:
+                conflicts.append(1)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(edit, range(8)))
+
+    assert collection.get(1)['Count'] == 8 * saves
+    assert conflicts
+
+    start = time.perf_counter()
+    for i in range(200):
+        collection.update(2, {'Count': i})
+    update_time = (time.perf_counter() - start) / 200
+    start = time.perf_counter()
+    for _ in range(10000):
+        collection.version(2)
+    check_time = (time.perf_counter() - start) / 10000
+    print(f"\nupdate {update_time * 1e6:.0f}us, version check {check_time * 1e6:.2f}us")
+    assert check_time < update_time / 20
+
+
+@pytest.mark.order(92)
+def test_unchanged_edit_is_not_saved(tmp_path, monkeypatch):
+    """
+    Test that saving an edit dialog without changes neither writes nor bumps the version.
+
+    This test verifies that:
+        - The read-only ID and Type, and empty inputs of missing fields, are not taken as changes
+        - Saving no changes writes nothing and keeps the version and the numeric ID
+        - A changed field is still saved
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    from app.startup import edited_fields
+    clients = Collection(tmp_path / 'clients.json', 'ID', [{'ID': 7, 'Type': 'Client', 'Name': 'Ann'}])
+    writes = []
+    monkeypatch.setattr('app.store.persist_changes', lambda *args: writes.append(args[3]))
+    original = dict(clients.get(7))
+    version = clients.version(7)
+
+    inputs = {'ID': '7', 'Type': 'Client', 'Name': 'Ann', 'City': ''}
+    changes = edited_fields(original, {field: value for field, value in inputs.items() if field not in ['ID', 'Type']})
+    assert changes == {}
+    clients.update(7, changes, version=version)
+    assert writes == []
+    assert clients.version(7) == version
+    assert clients.get(7)['ID'] == 7
+
+    clients.update(7, edited_fields(original, {'Name': 'Ada', 'City': ''}), version=version)
+    assert clients.get(7)['Name'] == 'Ada' and 'City' not in clients.get(7)
+    assert len(writes) == 1 and clients.version(7) != version
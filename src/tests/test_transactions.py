@@ -0,0 +1,214 @@
+import pytest
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+from app.storage import journal_path, start_writer, stop_writer, transaction_log_name
+from app.store import Collection, Transaction
+
+# Deletes client 1 and its bookings in one transaction, crashing the process at the point given
+# as second argument: 'log' before the commit record is written, a number after that many
+# journals were appended, 'sync' when the first journal is synced, exiting with 4 instead if the
+# commit record is already gone, 'sqlite' halfway through the SQLite transaction
+crash_script = """
+import os
+import sys
+from pathlib import Path
+from app import storage
+from app.store import Collection, Transaction
+
+data_dir, point = Path(sys.argv[1]), sys.argv[2]
+clients = Collection.load(data_dir / 'clients.json', 'ID')
+flights = Collection.load(data_dir / 'flights.json', 'Booking_ID', indexes=('Client_ID',))
+
+if point == 'log':
+    storage.save_json = lambda *args, **kwargs: os._exit(3)
+elif point == 'sqlite':
+    write = storage._sqlite_write
+    storage._sqlite_write = lambda *args: os._exit(3) if args[1] == 'clients' else write(*args)
+elif point == 'sync':
+    fsync = os.fsync
+
+    def crashing_fsync(fd):
+        journals = [storage.journal_path(data_dir / name) for name in ('clients.json', 'flights.json')]
+        if any(j.exists() and os.path.samestat(os.fstat(fd), j.stat()) for j in journals):
+            os._exit(3 if (data_dir / storage.transaction_log_name).exists() else 4)
+        fsync(fd)
+    os.fsync = crashing_fsync
+else:
+    appended = []
+    append_journal = storage.append_journal
+
+    def crashing_append(*args, **kwargs):
+        if len(appended) == int(point):
+            os._exit(3)
+        appended.append(args[0])
+        append_journal(*args, **kwargs)
+        if len(appended) == int(point) == 2:
+            os._exit(3)
+    storage.append_journal = crashing_append
+
+with Transaction(flights, clients):
+    flights.delete([f['Booking_ID'] for f in flights.find('Client_ID', 1)])
+    clients.delete([1])
+"""
+
+
+def write_data(data_dir):
+    """
+    Write two clients, with three bookings for client 1 and one for client 2.
+
+    Args:
+        data_dir (Path): The data directory.
+
+    Returns:
+        tuple: The paths of the clients and flights JSON files.
+    """
+    clients = data_dir / 'clients.json'
+    flights = data_dir / 'flights.json'
+    clients.write_text(json.dumps([{'ID': 1, 'Name': 'Ann'}, {'ID': 2, 'Name': 'Bob'}]))
+    flights.write_text(json.dumps([{'Booking_ID': i, 'Client_ID': 1 if i < 4 else 2} for i in range(1, 5)]))
+    return clients, flights
+
+
+@pytest.mark.order(83)
+def test_transaction_rolls_back(tmp_path, monkeypatch):
+    """
+    Test that a transaction whose block raises leaves no trace in memory or on disk.
+
+    This test verifies that:
+        - Inserted records are removed and deleted or updated records are restored, in their old order
+        - The indexes and versions are restored
+        - Nothing is written and the listeners are not told about the undone changes
+        - Transactions cannot be nested
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'journal')
+    clients_path, flights_path = write_data(tmp_path)
+    clients = Collection.load(clients_path, 'ID')
+    flights = Collection.load(flights_path, 'Booking_ID', indexes=('Client_ID',))
+    clients.update(2, {'Name': 'Bo'})
+    before = ([dict(c) for c in clients], [dict(f) for f in flights], clients.version(2))
+    journal = journal_path(clients_path).read_text()
+    changes = []
+    clients.subscribe(lambda op, records, keys: changes.append(op))
+    flights.subscribe(lambda op, records, keys: changes.append(op))
+
+    with pytest.raises(ZeroDivisionError):
+        with Transaction(flights, clients):
+            flights.delete([2])
+            flights.update(4, {'Client_ID': 1})
+            clients.update(2, {'ID': 7, 'Name': 'Bob'})
+            clients.insert({'ID': 2, 'Name': 'Cid'})
+            flights.delete([1, 4])
+            1 / 0
+
+    assert ([dict(c) for c in clients], [dict(f) for f in flights], clients.version(2)) == before
+    assert clients.get(7) is None
+    assert [f['Booking_ID'] for f in flights.find('Client_ID', 1)] == [1, 2, 3]
+    assert [f['Booking_ID'] for f in flights.find('Client_ID', 2)] == [4]
+    assert journal_path(clients_path).read_text() == journal
+    assert not journal_path(flights_path).exists()
+    assert changes == []
+
+    with Transaction(clients):
+        with pytest.raises(RuntimeError):
+            Transaction(flights).__enter__()
+    clients.update(1, {'Name': 'Ada'})
+    assert changes == ['update']
+
+
+@pytest.mark.order(84)
+@pytest.mark.parametrize('storage_mode', ['journal', 'json'])
+def test_transaction_commit_syncs_journals_before_removing_log(tmp_path, monkeypatch, storage_mode):
+    """
+    Test that a transaction spanning two collections keeps its commit record until its journals are synced.
+
+    This test verifies that:
+        - In 'journal' mode, and in 'json' mode while the background writer runs, the commit
+          syncs the commit record and the journals, once each, and no snapshot
+        - Both journals are synced while the commit record still exists
+        - The listeners are told about the changes after the commit
+        - The transaction log is removed and the changes are found after loading again
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+        storage_mode (str): The storage mode under test.
+    """
+    monkeypatch.setattr('app.config.storage_mode', storage_mode)
+    clients_path, flights_path = write_data(tmp_path)
+    clients = Collection.load(clients_path, 'ID')
+    flights = Collection.load(flights_path, 'Booking_ID', indexes=('Client_ID',))
+    changes = []
+    clients.subscribe(lambda op, records, keys: changes.append((op, keys)))
+    log = tmp_path / transaction_log_name
+    syncs = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, 'fsync', lambda fd: syncs.append((os.fstat(fd), log.exists())) or fsync(fd))
+
+    start_writer(60)
+    try:
+        with Transaction(flights, clients):
+            flights.delete([f['Booking_ID'] for f in flights.find('Client_ID', 1)])
+            clients.delete([1])
+            assert changes == []
+        assert len(syncs) == 3
+        for path in (clients_path, flights_path):
+            journal = journal_path(path).stat()
+            assert [exists for stat, exists in syncs if os.path.samestat(stat, journal)] == [True]
+        assert changes == [('delete', ['1'])]
+    finally:
+        stop_writer()
+
+    assert not (tmp_path / transaction_log_name).exists()
+    assert [c['ID'] for c in Collection.load(clients_path, 'ID')] == [2]
+    assert [f['Booking_ID'] for f in Collection.load(flights_path, 'Booking_ID')] == [4]
+
+
+@pytest.mark.order(85)
+@pytest.mark.parametrize('storage_mode, point, applied', [
+    ('json', 'log', False), ('json', '0', True), ('json', '1', True), ('json', '2', True), ('json', 'sync', True),
+    ('journal', 'log', False), ('journal', '0', True), ('journal', '1', True), ('journal', '2', True),
+    ('journal', 'sync', True),
+    ('sqlite', 'sqlite', False),
+])
+def test_transaction_survives_crash(tmp_path, monkeypatch, storage_mode, point, applied):
+    """
+    Test that a transaction interrupted by a crash is found in all of its collections or in none.
+
+    A process deleting a client and its bookings is killed at different points of the commit,
+    then the data is loaded again.
+
+    This test verifies that:
+        - A crash before the commit record is written keeps the client and all of its bookings
+        - A crash after it, even halfway through updating the files, deletes both on recovery
+        - The commit record is still there when the journals are synced, so unsynced journal
+          writes lost in a crash are recovered from it
+        - SQLite rolls back a transaction interrupted halfway
+        - The other client and its booking are never affected
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+        storage_mode (str): The storage mode under test.
+        point (str): Where the process crashes, see `crash_script`.
+        applied (bool): Whether the deletion must be found after recovery.
+    """
+    monkeypatch.setattr('app.config.storage_mode', storage_mode)
+    clients_path, flights_path = write_data(tmp_path)
+    env = {**os.environ, 'FLYGUY_STORAGE_MODE': storage_mode, 'PYTHONPATH': str(Path(__file__).parent.parent)}
+
+    process = subprocess.run([sys.executable, '-c', crash_script, str(tmp_path), point], env=env)
+    assert process.returncode == 3
+
+    clients = Collection.load(clients_path, 'ID')
+    flights = Collection.load(flights_path, 'Booking_ID', indexes=('Client_ID',))
+    assert [c['ID'] for c in clients] == ([2] if applied else [1, 2])
+    assert [f['Booking_ID'] for f in flights.find('Client_ID', 1)] == ([] if applied else [1, 2, 3])
+    assert [f['Booking_ID'] for f in flights.find('Client_ID', 2)] == [4]
+    assert not (tmp_path / transaction_log_name).exists()
@@ -0,0 +1,67 @@
+import pytest
+import tracemalloc
+from app.records import Client, Airline, Booking, AvailableFlight, record_type
+from app.store import Collection
+from tests.utils import generate_test_data
+
+record_types = {
+    'clients': (Client, 'ID'),
+    'flights': (Booking, 'Booking_ID'),
+    'airlines': (Airline, 'ID'),
+    'available_flights': (AvailableFlight, 'Flight_ID'),
+}
+size = 100000
+
+
+def measure_load(path, key_field, rtype):
+    """
+    Return the memory in bytes held by a collection loaded with the given record type.
+
+    Args:
+        path (Path): The data file.
+        key_field (str): The primary key field of the records.
+        rtype (type): The record type of the collection.
+
+    Returns:
+        int: The allocated size in bytes.
+    """
+    tracemalloc.start()
+    try:
+        collection = Collection.load(path, key_field, record_type=rtype)
+        allocated = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del collection
+    return allocated
+
+
+@pytest.mark.order(66)
+@pytest.mark.parametrize('template_type', record_types)
+def test_value_encoding_memory(template_type, tmp_path):
+    """
+    Memory benchmark of dictionary-encoding the repeated field values, per 100k records.
+
+    This test loads a generated data file once with and once without encoding. It verifies that:
+        - The loaded records are the same either way
+        - Encoding never increases the memory used by the collection
+        - Shared values are the same object in every record
+
+    Args:
+        template_type (str): One of 'clients', 'flights', 'airlines' or 'available_flights'.
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+    """
+    path = tmp_path / f'{template_type}.json'
+    generate_test_data(path, size, template_type)
+    encoded_type, key_field = record_types[template_type]
+    plain_type = record_type(f'Plain{encoded_type.__name__}', list(encoded_type._slots), encode=False)
+
+    plain_bytes = measure_load(path, key_field, plain_type)
+    encoded_bytes = measure_load(path, key_field, encoded_type)
+
+    print(f"\n{template_type:>17}: plain {plain_bytes / 1024 ** 2:.1f}MB, "
+          f"encoded {encoded_bytes / 1024 ** 2:.1f}MB per {size} records ({encoded_bytes / plain_bytes:.0%})")
+
+    encoded = list(Collection.load(path, key_field, record_type=encoded_type))
+    assert encoded == list(Collection.load(path, key_field, record_type=plain_type))
+    assert encoded[0]['Type'] is encoded[-1]['Type']
+    assert encoded_bytes <= plain_bytes
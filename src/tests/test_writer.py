@@ -0,0 +1,146 @@
+import pytest
+import json
+import threading
+import app.storage as storage
+from app.storage import save_json, start_writer, stop_writer, flush_writes
+from app.store import Collection
+
+
+@pytest.fixture
+def background_writer(monkeypatch):
+    """
+    Pytest fixture that runs the background writer for the duration of a test.
+
+    Args:
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+
+    Yields:
+        BackgroundWriter: The running writer, with a delay of 0.2 seconds.
+    """
+    monkeypatch.setattr('app.config.storage_mode', 'json')
+    writer = start_writer(0.2)
+    yield writer
+    stop_writer()
+
+
+@pytest.mark.order(57)
+def test_save_json_is_atomic(tmp_path, monkeypatch):
+    """
+    Test that a failed write leaves the previous file contents in place.
+
+    This test verifies that:
+        - The target file is only replaced once the new contents are fully written
+        - No temporary file is left behind after a failure
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+    """
+    path = tmp_path / 'clients.json'
+    save_json(path, [{'ID': 1}])
+
+    def crash(*args):
+        raise OSError('disk full')
+
+    monkeypatch.setattr('os.replace', crash)
+    with pytest.raises(OSError):
+        save_json(path, [{'ID': 1}, {'ID': 2}])
+
+    assert json.loads(path.read_text()) == [{'ID': 1}]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+@pytest.mark.order(58)
+def test_writer_coalesces_bursts(tmp_path, monkeypatch, background_writer):
+    """
+    Test that a burst of changes to a collection is written once, on the worker thread.
+
+    This test verifies that:
+        - Changes return before the data file is rewritten
+        - Many changes in quick succession cause a single write
+        - The write is performed by the background thread, not the caller
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+        background_writer (BackgroundWriter): The running background writer.
+    """
+    writes = []
+    written = threading.Event()
+    original_save_json = storage.save_json
+
+    def recording_save_json(path, data, fmt=None):
+        size = original_save_json(path, data, fmt)
+        writes.append(threading.current_thread())
+        written.set()
+        return size
+
+    monkeypatch.setattr('app.storage.save_json', recording_save_json)
+
+    clients = Collection(tmp_path / 'clients.json', 'ID', [])
+    for i in range(1, 101):
+        clients.insert({'ID': i, 'Name': f'Client {i}'})
+    assert not clients.path.exists()
+
+    assert written.wait(5)
+    assert len(writes) == 1
+    assert writes[0] is not threading.current_thread()
+    assert background_writer.coalesced == 99
+    assert json.loads(clients.path.read_text()) == list(clients)
+
+
+@pytest.mark.order(59)
+def test_writer_flush_on_shutdown(tmp_path, background_writer):
+    """
+    Test that pending writes are performed when they are flushed and when the writer stops.
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        background_writer (BackgroundWriter): The running background writer.
+    """
+    clients = Collection(tmp_path / 'clients.json', 'ID', [])
+    clients.insert({'ID': 1})
+    flush_writes(clients.path)
+    assert json.loads(clients.path.read_text()) == [{'ID': 1}]
+
+    clients.update(1, {'Name': 'Ann'})
+    assert background_writer.pending(clients.path)
+    stop_writer()
+    assert json.loads(clients.path.read_text()) == [{'ID': 1, 'Name': 'Ann'}]
+
+    # Without a running writer, changes are written immediately again
+    clients.delete([1])
+    assert json.loads(clients.path.read_text()) == []
+
+
+@pytest.mark.order(89)
+def test_writer_keeps_failed_writes(tmp_path, monkeypatch, background_writer):
+    """
+    Test that a write that fails is kept and retried instead of being lost.
+
+    This test verifies that:
+        - Flushing and stopping the writer raise the error of the failed write
+        - The failed write stays queued, and a flush after the failure is resolved performs it
+
+    Args:
+        tmp_path (Path): Pytest fixture for creating a temporary directory.
+        monkeypatch (MonkeyPatch): Pytest fixture to modify module attributes.
+        background_writer (BackgroundWriter): The running background writer.
+    """
+    def crash(*args):
+        raise OSError('disk full')
+
+    clients = Collection(tmp_path / 'clients.json', 'ID', [])
+    clients.insert({'ID': 1})
+    with monkeypatch.context() as patch:
+        patch.setattr('app.storage.save_json', crash)
+        with pytest.raises(OSError):
+            flush_writes(clients.path)
+        assert background_writer.pending(clients.path)
+        with pytest.raises(OSError):
+            stop_writer()
+        assert background_writer.pending(clients.path)
+        assert not clients.path.exists()
+
+    assert stop_writer() is not None
+    assert json.loads(clients.path.read_text()) == [{'ID': 1}]
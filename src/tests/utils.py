@@ -119,16 +119,17 @@ def login_as_admin(screen):
     next(b for b in login_buttons if b.text == 'LOGIN').click()
     screen.wait(0.5)
         
-def generate_test_data(file_path: Path, num_entries: int, template_type: Literal['clients', 'flights', 'airlines', 'available_flights']):
+def generate_test_records(num_entries: int, template_type: Literal['clients', 'flights', 'airlines', 'available_flights']) -> list:
     """
-    Generate a mock JSON file with test data for the specified template type.
+    Generate a list of mock records for the specified template type.
 
     Args:
-        file_path (Path): The path where the JSON file should be saved.
         num_entries (int): Number of entries to generate.
         template_type (str): One of 'clients', 'flights', 'airlines', or 'available_flights'.
+
+    Returns:
+        list: The generated records.
     """
-    file_path.parent.mkdir(parents=True, exist_ok=True)
     data = []
 
     for i in range(1, num_entries + 1):
@@ -175,6 +176,20 @@ def generate_test_data(file_path: Path, num_entries: int, template_type: Literal
         else:
             raise ValueError(f"Unsupported template type: {template_type}")
 
+    return data
+
+def generate_test_data(file_path: Path, num_entries: int, template_type: Literal['clients', 'flights', 'airlines', 'available_flights']):
+    """
+    Generate a mock JSON file with test data for the specified template type.
+
+    Args:
+        file_path (Path): The path where the JSON file should be saved.
+        num_entries (int): Number of entries to generate.
+        template_type (str): One of 'clients', 'flights', 'airlines', or 'available_flights'.
+    """
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    data = generate_test_records(num_entries, template_type)
+
     with file_path.open('w', encoding='utf-8') as f:
         json.dump(data, f, indent=2)
 